@@ -25,22 +25,23 @@ from itertools import combinations, product
 from .graphs import supported_formats as graph_formats
 from .graphs import readGraph,writeGraph
 from .graphs import bipartite_random_left_regular,bipartite_random_regular,bipartite_shift
+from .graphs import gnp_random_graph,bipartite_random_graph
 from .graphs import bipartite_sets
 from .graphs import dag_complete_binary_tree,dag_pyramid
 from .graphs import sample_missing_edges
+from .graphs import GraphCache
+from .randomness import SeedStream
 
 
 
 try: # NetworkX >= 1.10
 
     complete_bipartite_graph    = networkx.bipartite.complete_bipartite_graph
-    bipartite_random_graph      = networkx.bipartite.random_graph
     bipartite_gnmk_random_graph = networkx.bipartite.gnmk_random_graph
 
 except AttributeError: # Networkx < 1.10
     
     from networkx import complete_bipartite_graph
-    from networkx import bipartite_random_graph
     from networkx import bipartite_gnmk_random_graph
 
 
@@ -223,6 +224,66 @@ def positive_int(string):
     return value
 
 
+def cached_graph_construction(args, generator, parameters, construction, randomized=True):
+    """Build a graph, using the on-disk graph cache when enabled
+
+    When the command line enables the graph cache (option
+    ``--graph-cache``) the graph is looked up in the cache before
+    running the construction, and saved there afterwards.
+
+    Randomized constructions are cached only if the seed is fixed
+    on the command line. The state of the random generator after
+    the construction is saved along with the graph, and restored
+    when the graph is taken from the cache: the rest of the
+    computation does not depend on whether the cache has been used.
+
+    Parameters
+    ----------
+    args : command line options
+
+    generator : str
+        name of the construction (e.g. the command line option)
+
+    parameters : tuple
+        parameters of the construction
+
+    construction : callable
+        function with no arguments that builds the graph
+
+    randomized : bool, optional
+        whether the construction uses the random generator (default: True)
+    """
+    directory = getattr(args,'graph_cache',None)
+    seed      = getattr(args,'seed',None)
+
+    if directory is None or (randomized and not seed):
+        return construction()
+
+    max_size = getattr(args,'graph_cache_size',None)
+    if max_size is None:
+        cache = GraphCache(directory)
+    else:
+        cache = GraphCache(directory, max_size*2**20)
+
+    if randomized:
+        key = cache.key(generator, parameters, seed, random.getstate())
+    else:
+        key = cache.key(generator, parameters)
+
+    cached = cache.load(key)
+    if cached is not None:
+        G, random_state = cached
+        if random_state is not None:
+            random.setstate(random_state)
+        return G
+
+    # the graph is used as the cache will give it back, so that runs
+    # that hit the cache produce the same output as the first one
+    G, _ = cache.store_and_load(key, construction(),
+                                random.getstate() if randomized else None)
+    return G
+
+
 class GraphHelper(object):
     """Command Line helper for reading graphs
     """
@@ -303,12 +364,12 @@ class DirectedAcyclicGraphHelper(GraphHelper):
         if getattr(args,'tree'+suffix) is not None:
             assert getattr(args,'tree'+suffix) > 0
 
-            D = dag_complete_binary_tree( getattr(args,'tree'+suffix) )
+            D = dag_complete_binary_tree( getattr(args,'tree'+suffix), integer_labels=True)
 
         elif getattr(args,'pyramid'+suffix) is not None:
             assert getattr(args,'pyramid'+suffix) > 0
 
-            D = dag_pyramid( getattr(args,'pyramid'+suffix))
+            D = dag_pyramid( getattr(args,'pyramid'+suffix), integer_labels=True)
 
         elif getattr(args,'graphformat'+suffix) is not None:
 
@@ -441,25 +502,35 @@ class SimpleGraphHelper(GraphHelper):
             n,d = getattr(args,'gnd'+suffix)
             if (n*d)%2 == 1:
                 raise ValueError("n * d must be even")
-            G=networkx.random_regular_graph(d,n)
+            G=cached_graph_construction(args,'gnd',(n,d),
+                                        lambda : networkx.random_regular_graph(d,n))
 
         elif getattr(args,'gnp'+suffix) is not None:
 
             n,p = getattr(args,'gnp'+suffix)
-            G=networkx.gnp_random_graph(n,p)
+            rng = SeedStream(getattr(args,'seed',None), 'gnp'+suffix).generator()
+            G=cached_graph_construction(args,'gnp',(n,p),
+                                        lambda : gnp_random_graph(n,p,rng=rng))
 
         elif getattr(args,'gnm'+suffix) is not None:
 
             n,m = getattr(args,'gnm'+suffix)
-            G=networkx.gnm_random_graph(n,m)
+            G=cached_graph_construction(args,'gnm',(n,m),
+                                        lambda : networkx.gnm_random_graph(n,m))
 
         elif getattr(args,'grid'+suffix) is not None:
 
-            G=networkx.grid_graph(getattr(args,'grid'+suffix))
+            dims = getattr(args,'grid'+suffix)
+            G=cached_graph_construction(args,'grid',dims,
+                                        lambda : networkx.grid_graph(dims),
+                                        randomized=False)
 
         elif getattr(args,'torus'+suffix) is not None:
-            
-            G=networkx.grid_graph(getattr(args,'torus'+suffix),periodic=True)
+
+            dims = getattr(args,'torus'+suffix)
+            G=cached_graph_construction(args,'torus',dims,
+                                        lambda : networkx.grid_graph(dims,periodic=True),
+                                        randomized=False)
 
         elif getattr(args,'complete'+suffix) is not None:
 
@@ -672,27 +743,34 @@ class BipartiteGraphHelper(GraphHelper):
         if getattr(args,"bp"+suffix) is not None:
 
             l,r,p = getattr(args,"bp"+suffix)
-            G=bipartite_random_graph(l,r,p)
+            rng = SeedStream(getattr(args,'seed',None), 'bp'+suffix).generator()
+            G=cached_graph_construction(args,'bp',(l,r,p),
+                                        lambda : bipartite_random_graph(l,r,p,rng=rng))
 
         elif getattr(args,"bm"+suffix)  is not None:
 
             l,r,m = getattr(args,"bm"+suffix)
-            G=bipartite_gnmk_random_graph(l,r,m)
+            G=cached_graph_construction(args,'bm',(l,r,m),
+                                        lambda : bipartite_gnmk_random_graph(l,r,m))
 
         elif getattr(args,"bd"+suffix) is not None:
 
             l,r,d = getattr(args,"bd"+suffix)
-            G=bipartite_random_left_regular(l,r,d)
+            G=cached_graph_construction(args,'bd',(l,r,d),
+                                        lambda : bipartite_random_left_regular(l,r,d))
 
         elif getattr(args,"bregular"+suffix)  is not None:
 
             l,r,d = getattr(args,"bregular"+suffix)
-            G=bipartite_random_regular(l,r,d)
+            G=cached_graph_construction(args,'bregular',(l,r,d),
+                                        lambda : bipartite_random_regular(l,r,d))
 
         elif getattr(args,"bshift"+suffix) is not None:
 
             N,M,pattern = getattr(args,"bshift"+suffix)
-            G=bipartite_shift(N,M,pattern)
+            G=cached_graph_construction(args,'bshift',[N,M]+pattern,
+                                        lambda : bipartite_shift(N,M,pattern),
+                                        randomized=False)
             
         elif getattr(args,"bcomplete"+suffix) is not None:
             
@@ -20,7 +20,8 @@ https://github.com/MassimoLauria/cnfgen.git
 from __future__ import print_function
 from itertools import product,islice
 from itertools import combinations,combinations_with_replacement
-from collections import Counter
+from collections import Counter, Mapping
+from operator import and_, or_
 import re
 from math import ceil,log
 
@@ -30,6 +31,39 @@ from .graphs import bipartite_sets,neighbors
 _default_header="Generated with `cnfgen`\n(C) {}\n{}\n\n".format(pd.__copyright__,
                                                                  pd.__url__)
 
+
+def _assignment_table(assignments, varindex):
+    """Represent a batch of assignments as a table indexed by literals
+
+    The table is a list of integers of length 2n+1, such that bit `j`
+    of ``T[l]`` is 1 if and only if the j-th assignment satisfies
+    literal `l` (negative literals use negative indexing). The entry
+    ``T[0]`` has the bits of all the assignments set.
+
+    Parameters
+    ----------
+    assignments : list of dict
+        (partial) assignments from variable names to booleans
+
+    varindex : dict
+        map from variable names to variable indices. Names not in the
+        map are ignored.
+
+    >>> T = _assignment_table([{'x': True}, {'x': False, 'y': False}],
+    ...                       {'x': 1, 'y': 2})
+    >>> T[0], T[1], T[-1], T[2], T[-2]
+    (3, 1, 2, 0, 2)
+    """
+    table = [0]*(2*len(varindex)+1)
+    table[0] = (1 << len(assignments)) - 1
+    for j, assignment in enumerate(assignments):
+        bit = 1 << j
+        for name, value in assignment.iteritems():
+            if name in varindex:
+                table[varindex[name] if value else -varindex[name]] |= bit
+    return table
+
+
 class CNF(object):
     """Propositional formulas in conjunctive normal form.
 
@@ -482,6 +516,86 @@ class CNF(object):
         assert self._coherent
         return self.__iter__()
 
+    def evaluate(self, assignment):
+        """Evaluate the formula under one or more assignments
+
+        All the assignments in a list are evaluated together, in
+        a single pass over the clauses.
+
+        Parameters
+        ----------
+        assignment : dict, or list of dict
+            a (partial) assignment from variable names to booleans,
+            or a list of them. Names that are not variables of the
+            formula are ignored.
+
+        Returns
+        -------
+        True if the assignment satisfies all clauses, False if it
+        falsifies some clause, and None otherwise (i.e. the
+        assignment is partial and some clause is undetermined). For
+        a list of assignments, the list of their values.
+
+        Examples
+        --------
+        >>> F=CNF([[(True,'x'),(True,'y')],[(False,'x')]])
+        >>> F.evaluate({'x': False, 'y': True})
+        True
+        >>> F.evaluate({'x': True})
+        False
+        >>> print(F.evaluate({'y': False}))
+        None
+        >>> F.evaluate([{'x': False, 'y': True}, {'x': True}, {'y': False}])
+        [True, False, None]
+        """
+        assert self._coherent
+        single = isinstance(assignment, Mapping)
+        assignments = [assignment] if single else list(assignment)
+
+        table = _assignment_table(assignments, self._name2index)
+        full = table[0]
+        lookup = table.__getitem__
+        negated = table[0:1] + table[:0:-1]
+        lookup_negated = negated.__getitem__
+
+        satisfied = full
+        falsified = 0
+        for cls in self._clauses:
+            satisfied &= reduce(or_, map(lookup, cls), 0)
+            falsified |= reduce(and_, map(lookup_negated, cls), full)
+
+        values = [True if (satisfied >> j) & 1 else
+                  False if (falsified >> j) & 1 else None
+                  for j in range(len(assignments))]
+        return values[0] if single else values
+
+    def falsified_clauses(self, assignment):
+        """The clauses falsified by an assignment
+
+        Parameters
+        ----------
+        assignment : dict
+            a (partial) assignment from variable names to booleans
+
+        Returns
+        -------
+        the list of the clauses whose literals are all false under
+        `assignment`, in the format of :py:meth:`CNF.clauses`.
+
+        Examples
+        --------
+        >>> F=CNF([[(True,'x'),(True,'y')],[(False,'x')],[(False,'y')]])
+        >>> F.falsified_clauses({'x': True, 'y': False})
+        [[(False, 'x')]]
+        >>> F.falsified_clauses({'x': True})
+        [[(False, 'x')]]
+        """
+        assert self._coherent
+        table = _assignment_table([assignment], self._name2index)
+        lookup_negated = (table[0:1] + table[:0:-1]).__getitem__
+        return [self._uncompress_clause(cls) for cls in self._clauses
+                if all(map(lookup_negated, cls))]
+
 
     def dimacs(self, export_header=True, extra_text=None):
         """Produce the dimacs encoding of the formula
@@ -543,6 +657,20 @@ class CNF(object):
         n = len(self._index2name)-1
         m = len(self)
 
+        self._dimacs_dump_header(output, n, m, export_header, extra_text)
+
+        # Clauses
+        for cls in self._clauses:
+            output.write("\n" + " ".join([str(l) for l in cls + (0,)]))
+
+    def _dimacs_dump_header(self, output, n, m, export_header=True, extra_text=None):
+        """Dump the comments and the specification line of a dimacs file
+
+        This is for internal use only. It allows to produce the
+        dimacs output of formulas with `n` variables and `m` clauses
+        that are not stored in memory: each clause must then be
+        written as ``"\\n"`` followed by its literals and by ``0``.
+        """
         # A nice header
         if export_header:
             for line in self.header.split("\n")[:-1]:
@@ -556,13 +684,9 @@ class CNF(object):
         # Formula specification
         output.write("p cnf {0} {1}".format(n, m))
 
-        if len(self._clauses) == 0:
+        if m == 0:
             output.write("\n")   # this newline makes `lingeling` solver happy
 
-        # Clauses
-        for cls in self._clauses:
-            output.write("\n" + " ".join([str(l) for l in cls + (0,)]))
-
     def latex(self, export_header=True, extra_text=None, full_document=False):
         """Output a LaTeX version of the CNF formula
 
@@ -658,7 +782,7 @@ class CNF(object):
             if l>0 :
                 return  "           {"+str(self._index2name[l])+"}"
             else:
-                name = self._index2name[-l]
+                name = str(self._index2name[-l])
                 split_point=name.find("_")
                 return "{\\overline{"+name[:split_point]+"}"+name[split_point:]+"}"
 
@@ -705,7 +829,8 @@ class CNF(object):
         return output.getvalue()
 
 
-    def is_satisfiable(self, cmd=None, sameas=None, verbose=0):
+    def is_satisfiable(self, cmd=None, sameas=None, verbose=0, tmpdir=None,
+                       cache=None, verify=False, raw=False):
         """Determines whether a CNF is satisfiable or not.
 
         The formula is passed to a SAT solver, according to the
@@ -741,6 +866,23 @@ class CNF(object):
             0 or less means no output. 1 shows the command line actually
             run. 2 outputs the solver output. (default: 0)
 
+        tmpdir: string, optional
+            directory for the temporary file with the formula, for the
+            solvers that do not read it from the standard input (e.g.
+            a `tmpfs` mount point).
+
+        cache: cnfformula.utils.solver.ResultCache, optional
+            a persistent cache of solver results, checked before
+            running the solver.
+
+        verify: bool, optional
+            check that the witness satisfies the formula, and raise
+            `RuntimeError` otherwise (default: False)
+
+        raw: bool, optional
+            return the witness as an array of literals instead of
+            a mapping from variable names (default: False)
+
 
         Examples
         --------
@@ -758,12 +900,14 @@ class CNF(object):
             A pair (answer,witness) where answer is either True when
             F is satisfiable, or False otherwise. If F is satisfiable
             the witness is a satisfiable assignment in form of
-            a dictionary, otherwise it is None.
+            a read-only mapping from variable names to truth values,
+            otherwise it is None.
 
         Raises
         ------
         RuntimeError
-           if it is not possible to correctly invoke the solver needed.
+           if it is not possible to correctly invoke the solver needed,
+           or if `verify` is set and the witness is wrong.
 
         ValueError
            if `sameas` is set and is not the name of a supported solver.
@@ -778,7 +922,9 @@ class CNF(object):
 
         """
         from .utils import solver
-        return solver.is_satisfiable(self, cmd=cmd, sameas=sameas, verbose=verbose)
+        return solver.is_satisfiable(self, cmd=cmd, sameas=sameas, verbose=verbose,
+                                     tmpdir=tmpdir, cache=cache, verify=verify,
+                                     raw=raw)
 
     ###
     ### Various utility function for CNFs
@@ -1095,10 +1241,16 @@ class CNF(object):
 
         NonDecreasing = False
 
+        Encoding = 'pairwise'
+
         @staticmethod
         def var_name(i,b):
             return "X_{{{0},{1}}}".format(i,b)
 
+        @staticmethod
+        def aux_name(kind,i,b):
+            return "{0}_{{{1},{2}}}".format(kind,i,b)
+
         def __init__(self, D, R,**kwargs):
             r"""Generator for the clauses of a mapping between to sets
 
@@ -1141,6 +1293,22 @@ class CNF(object):
             nondecreasing: bool, optional
                 the mapping is going to be non decresing, with respect to
                 the order of domain and range (default: false)
+
+            encoding: string, optional
+                the encoding of the functionality, injectivity and
+                monotonicity constraints. With ``'pairwise'`` (the
+                default) they are expressed by binary clauses over
+                pairs of variables. With ``'auxiliary'`` they use
+                sequential counters and an order encoding over
+                auxiliary variables, and their size is linear in the
+                number of variables. The two encodings are equivalent:
+                the assignments to the mapping variables that extend
+                to the auxiliary variables are exactly the ones that
+                satisfy the pairwise encoding.
+
+            aux_name: function, optional
+                given a kind of constraint and two indices the function
+                must produce the name of an auxiliary variable
                 
             """
             self.Domain = list(D)
@@ -1154,8 +1322,13 @@ class CNF(object):
 
             self.NonDecreasing = kwargs.pop('nondecreasing', False)
 
+            self.Encoding = kwargs.pop('encoding', 'pairwise')
+            if self.Encoding not in _mapping_encodings:
+                raise ValueError("Unknown mapping encoding {}".format(self.Encoding))
+
             # variable name scheme 
             self.var_name = kwargs.pop('var_name', self.var_name)
+            self.aux_name = kwargs.pop('aux_name', self.aux_name)
 
             # use a bipartite graph scheme for the mapping?
             self.Pattern  = kwargs.pop('sparsity_pattern', None)
@@ -1224,7 +1397,27 @@ class CNF(object):
                 for r in self.images(d):
                     yield self.var_name(d,r)
 
-            
+            if self.Encoding == 'auxiliary':
+                for v in self.auxiliary_variables():
+                    yield v
+
+        def auxiliary_variables(self):
+            """Auxiliary variables of the encoding, in order"""
+            if self.Encoding != 'auxiliary':
+                return
+            if self.Injective:
+                for r in self.Range:
+                    for d in self.counterimages(r)[:-1]:
+                        yield self.aux_name("Inj",r,d)
+            if self.Functional:
+                for d in self.Domain:
+                    for r in self.images(d)[:-1]:
+                        yield self.aux_name("Fun",d,r)
+            if self.NonDecreasing:
+                for d in self.Domain[:-1]:
+                    for r in self.Range[1:]:
+                        yield self.aux_name("Mon",d,r)
+
         def clauses(self):
 
             # Completeness axioms
@@ -1239,20 +1432,44 @@ class CNF(object):
                     for c in CNF.greater_or_equal_constraint([self.var_name(d,r) for d in self.counterimages(r)], 1):
                         yield c
 
+            auxiliary = self.Encoding == 'auxiliary'
+
             # Injectivity axioms
             if self.Injective:
                 for r in self.Range:
-                    for c in CNF.less_or_equal_constraint([self.var_name(d,r)  for d in self.counterimages(r)],1):
-                        yield c
+                    preimages = self.counterimages(r)
+                    variables = [self.var_name(d,r)  for d in preimages]
+                    if auxiliary:
+                        counter = [self.aux_name("Inj",r,d) for d in preimages[:-1]]
+                        for c in _sequential_at_most_one(variables,counter):
+                            yield c
+                    else:
+                        for c in CNF.less_or_equal_constraint(variables,1):
+                            yield c
 
             # Functionality axioms
             if self.Functional:
                 for d in self.Domain:
-                    for c in CNF.less_or_equal_constraint([self.var_name(d,r) for r in self.images(d)],1):
-                        yield c
+                    images = self.images(d)
+                    variables = [self.var_name(d,r) for r in images]
+                    if auxiliary:
+                        counter = [self.aux_name("Fun",d,r) for r in images[:-1]]
+                        for c in _sequential_at_most_one(variables,counter):
+                            yield c
+                    else:
+                        for c in CNF.less_or_equal_constraint(variables,1):
+                            yield c
 
             # Mapping is monotone non-decreasing
-            if self.NonDecreasing:
+            if self.NonDecreasing and auxiliary:
+
+                rows = [ [(self.RankRange[r]-1, self.var_name(d,r)) for r in self.images(d)]
+                         for d in self.Domain ]
+                ladder = lambda t,p: self.aux_name("Mon",self.Domain[t],self.Range[p])
+                for c in _ladder_nondecreasing(rows,len(self.Range),ladder):
+                    yield c
+
+            elif self.NonDecreasing:
 
                 for (a,b) in combinations(self.Domain,2):
                     for (i,j) in product(self.images(a),self.images(b)):
@@ -1272,14 +1489,39 @@ class CNF(object):
         Injective     = False
         NonDecreasing = False
 
+        Encoding = 'pairwise'
+
         @staticmethod
         def var_name(i,b):
             return "Y_{{{0},{1}}}".format(i,b)
 
+        @staticmethod
+        def aux_name(kind,i,b):
+            return "{0}_{{{1},{2}}}".format(kind,i,b)
         
         def variables(self):
             for v,b in product(self.Domain,xrange(0,self.Bits)):
                 yield self.var_name(v,b)
+
+            for v in self.auxiliary_variables():
+                yield v
+
+        def auxiliary_variables(self):
+            """Auxiliary variables of the encoding, in order"""
+            if self.Encoding != 'auxiliary':
+                return
+            if not (self.Injective or self.NonDecreasing):
+                return
+            for i,j in product(self.Domain,self.Range):
+                yield self.aux_name("Ind",i,j)
+            if self.Injective:
+                for j in self.Range:
+                    for i in self.Domain[:-1]:
+                        yield self.aux_name("Inj",j,i)
+            if self.NonDecreasing:
+                for i in self.Domain[:-1]:
+                    for j in self.Range[1:]:
+                        yield self.aux_name("Mon",i,j)
                 
 
         def __init__(self, D, R, **kwargs):
@@ -1309,6 +1551,23 @@ class CNF(object):
             nondecreasing: bool, optional
                 the mapping must be non decreasing (default: false)
 
+            encoding: string, optional
+                with ``'pairwise'`` (the default) injectivity and
+                monotonicity are expressed by clauses over pairs of
+                bit strings. With ``'auxiliary'`` each pair
+                :math:`(i,j)` gets an indicator variable, forced to be
+                true when :math:`i` is mapped to :math:`j`, and
+                injectivity and monotonicity are expressed on the
+                indicators with sequential counters and an order
+                encoding. The formula has size
+                :math:`O(|D||R|\log |R|)` and it is equivalent to the
+                pairwise one, in the same sense as for
+                :py:class:`CNF.unary_mapping`.
+
+            aux_name: function, optional
+                given a kind of constraint and two indices the function
+                must produce the name of an auxiliary variable
+
             """
             self.Domain = list(D)
             self.Range  = list(R)
@@ -1317,8 +1576,14 @@ class CNF(object):
             # optional parameters of the mapping
             self.Injective     = kwargs.pop('injective', False)
             self.NonDecreasing = kwargs.pop('nondecreasing', False)
+
+            self.Encoding = kwargs.pop('encoding', 'pairwise')
+            if self.Encoding not in _mapping_encodings:
+                raise ValueError("Unknown mapping encoding {}".format(self.Encoding))
+
             # variable name scheme 
             self.var_name = kwargs.pop('var_name', self.var_name)
+            self.aux_name = kwargs.pop('aux_name', self.aux_name)
 
             if kwargs:
                 raise TypeError('Unexpected **kwargs: %r' % kwargs)
@@ -1354,6 +1619,11 @@ class CNF(object):
                                 islice(product([0,1],repeat=self.Bits),len(self.Range),None)):
                 yield self.forbid_bitstring(i,bs) 
 
+            if self.Encoding == 'auxiliary':
+                for c in self._auxiliary_clauses():
+                    yield c
+                return
+
             # Injectivity
             if self.Injective:
                 for j in self.Range:
@@ -1367,3 +1637,147 @@ class CNF(object):
 
                 for (i1,i2),(j1,j2) in pairs_of_maps:
                     yield self.forbid_image(i1,j2) + self.forbid_image(i2,j1)
+
+        def _auxiliary_clauses(self):
+            """Injectivity and monotonicity over indicator variables"""
+            if not (self.Injective or self.NonDecreasing):
+                return
+
+            indicator = lambda i,j: self.aux_name("Ind",i,j)
+
+            # If `i` is mapped to `j` then the indicator is true
+            for i,j in product(self.Domain,self.Range):
+                yield self.forbid_image(i,j) + [(True,indicator(i,j))]
+
+            if self.Injective:
+                for j in self.Range:
+                    variables = [indicator(i,j) for i in self.Domain]
+                    counter   = [self.aux_name("Inj",j,i) for i in self.Domain[:-1]]
+                    for c in _sequential_at_most_one(variables,counter):
+                        yield c
+
+            if self.NonDecreasing:
+                rows = [ list(enumerate(indicator(i,j) for j in self.Range))
+                         for i in self.Domain ]
+                ladder = lambda t,p: self.aux_name("Mon",self.Domain[t],self.Range[p])
+                for c in _ladder_nondecreasing(rows,len(self.Range),ladder):
+                    yield c
+
+
+_mapping_encodings = ('pairwise','auxiliary')
+
+
+def _sequential_at_most_one(variables, counter):
+    """Sequential counter encoding of the at most one constraint
+
+    The auxiliary variable ``counter[i]`` is forced to be true when
+    one of the first :math:`i+1` variables is true (see [1]_). The
+    encoding has :math:`3n-4` clauses on :math:`n` variables.
+
+    >>> for c in _sequential_at_most_one(['a','b','c'],['s1','s2']):
+    ...     print(c)
+    [(False, 'a'), (True, 's1')]
+    [(False, 'b'), (True, 's2')]
+    [(False, 's1'), (True, 's2')]
+    [(False, 'b'), (False, 's1')]
+    [(False, 'c'), (False, 's2')]
+
+    References
+    ----------
+    .. [1] C. Sinz.
+           Towards an optimal CNF encoding of boolean cardinality constraints.
+           CP 2005
+    """
+    n = len(variables)
+    assert len(counter) == max(n-1,0)
+    if n < 2:
+        return
+    yield [(False,variables[0]),(True,counter[0])]
+    for i in xrange(1,n-1):
+        yield [(False,variables[i]),(True,counter[i])]
+        yield [(False,counter[i-1]),(True,counter[i])]
+        yield [(False,variables[i]),(False,counter[i-1])]
+    yield [(False,variables[n-1]),(False,counter[n-2])]
+
+
+def _ladder_nondecreasing(rows, width, ladder):
+    """Order encoding of a non decreasing mapping
+
+    The `t`-th row lists the pairs :math:`(p,x)` where `x` is the
+    variable that claims that the `t`-th element of the domain is
+    mapped to the element at position `p` of the range, which has
+    size `width`.
+
+    The auxiliary variable ``ladder(t,p)``, for :math:`t` smaller
+    than the last row and :math:`1 \\leq p < width`, is forced to be
+    true when some element among the first :math:`t+1` is mapped at
+    position :math:`p` or higher. An element mapped at position
+    :math:`q` is then forbidden if ``ladder(t-1,q+1)`` is true.
+    """
+    n = len(rows)
+    for t,row in enumerate(rows):
+        if t < n-1:
+            for p in xrange(1,width):
+                if t > 0:
+                    yield [(False,ladder(t-1,p)),(True,ladder(t,p))]
+                if p < width-1:
+                    yield [(False,ladder(t,p+1)),(True,ladder(t,p))]
+            for p,x in row:
+                if p >= 1:
+                    yield [(False,x),(True,ladder(t,p))]
+        if t > 0:
+            for p,x in row:
+                if p < width-1:
+                    yield [(False,x),(False,ladder(t-1,p+1))]
+
+
+def _binomial_table(n, k):
+    """Binomial coefficients :math:`C(a,b)` for :math:`a \\leq n` and :math:`b \\leq k`
+
+    Entry ``[a][b]`` is zero when :math:`b > a`.
+    """
+    table = [[0]*(k+1) for _ in xrange(n+1)]
+    for a in xrange(n+1):
+        table[a][0] = 1
+        for b in xrange(1,min(a,k)+1):
+            table[a][b] = table[a-1][b-1] + (table[a-1][b] if b<a else 0)
+    return table
+
+
+def _rank_subset(subset, n, binomials):
+    """Lexicographic rank of a sorted subset of ``range(n)``
+
+    The subsets of size `k` are ordered as in
+    ``itertools.combinations(range(n),k)``, and the rank is computed
+    with the combinatorial number system. `binomials` is a
+    :py:func:`_binomial_table` with at least `n` rows and `k` columns.
+
+    >>> B=_binomial_table(4,2)
+    >>> [_rank_subset(s,4,B) for s in [(0,1),(0,2),(0,3),(1,2),(1,3),(2,3)]]
+    [0, 1, 2, 3, 4, 5]
+    """
+    k = len(subset)
+    return binomials[n][k] - 1 - sum(binomials[n-1-c][k-i] for i,c in enumerate(subset))
+
+
+def _unrank_subset(rank, n, k, binomials):
+    """The `k`-subset of ``range(n)`` of the given lexicographic rank
+
+    This is the inverse of :py:func:`_rank_subset`.
+
+    >>> B=_binomial_table(4,2)
+    >>> [_unrank_subset(r,4,2,B) for r in range(6)]
+    [[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]]
+    """
+    subset=[]
+    x=0
+    for left in xrange(k,0,-1):
+        # skip the subsets that start with x
+        c = binomials[n-x-1][left-1]
+        while rank>=c:
+            rank -= c
+            x += 1
+            c = binomials[n-x-1][left-1]
+        subset.append(x)
+        x += 1
+    return subset
@@ -30,6 +30,7 @@ p cnf 5 3
 
 from __future__ import print_function
 
+import io
 import os
 import sys
 import random
@@ -87,6 +88,27 @@ def setup_command_line_args(parser):
                         help="""Seed for any random process in the
                         program. (default: current time)
                         """)
+    parser.add_argument('--graph-cache',
+                        metavar="<dir>",
+                        default=None,
+                        type=str,
+                        action='store',
+                        help="""Keep the generated graphs in <dir> and
+                        reuse them on later runs with the same
+                        parameters. Random graphs are cached only
+                        when the seed is fixed. (default: the value
+                        of $CNFGEN_GRAPH_CACHE in the environment of
+                        the command, or no cache)
+                        """)
+    parser.add_argument('--graph-cache-size',
+                        metavar="<MB>",
+                        default=256,
+                        type=int,
+                        action='store',
+                        help="""Maximum size of the graph cache. The
+                        least recently used graphs are removed
+                        when the cache grows larger. (default: 256)
+                        """)
     g=parser.add_mutually_exclusive_group()
     g.add_argument('--verbose', '-v',action='store_true',default=True,
                    help="""Output formula header and comments.""")
@@ -122,25 +144,36 @@ def search_cmdline_input_file(list_args):
     return data
 
 ###
-### Main program
+### Command line parsers
 ###
-def command_line_utility(argv=sys.argv):
-    """CNFgen main command line interface
 
-    This function provide the main interface to CNFgen. It sets up the
-    command line, parses the command line arguments, builds the
-    appropriate formula and outputs its representation.
-    
-    It **must not** raise exceptions, but fail with error messages for
-    the user.
+# Parsers already built, indexed by program name
+_parsers = {}
+
+def command_line_parsers(prog):
+    """Parsers for the formula generation and transformation commands
+
+    Building the parsers loads all the formula families and
+    transformations, so they are built once and reused by later
+    command lines.
 
     Parameters
     ----------
-    argv: list, optional
-        The list of token with the command line arguments/options.
+    prog: string
+        the name of the program in the usage messages
+
+    Returns
+    -------
+    a pair `(parser,t_parser)` with the parsers for the formula
+    generation and for the transformations.
     """
+    if prog not in _parsers:
+        _parsers[prog] = _build_command_line_parsers(prog)
+    return _parsers[prog]
 
 
+def _build_command_line_parsers(prog):
+
     # Formula generators cmdline setup 
     import families
     import transformations
@@ -150,7 +183,7 @@ def command_line_utility(argv=sys.argv):
 
     
     # Cmdline parser for formula transformations
-    t_parser = argparse.ArgumentParser(usage=os.path.basename(argv[0]) + " ..."
+    t_parser = argparse.ArgumentParser(usage=prog + " ..."
                                        +" [-T <transformation> <params> -T <transformation> <params> ...]",
                                        epilog="""Each <transformation> has its own command line arguments and options.
                                        For more information type 'cnfgen ... -T <transformation> [--help | -h]'
@@ -167,7 +200,7 @@ def command_line_utility(argv=sys.argv):
         p.set_defaults(transformation=sc)
     
     # Main cmdline setup
-    parser=argparse.ArgumentParser(prog=os.path.basename(argv[0]),
+    parser=argparse.ArgumentParser(prog=prog,
                                    formatter_class=argparse.RawDescriptionHelpFormatter,
                                    epilog=
 """Each <formula type> has its own command line arguments and options.
@@ -190,8 +223,229 @@ a sequence of transformations.
         sc.setup_command_line(p)
         p.set_defaults(generator=sc)
 
-   
-        
+    return parser, t_parser
+
+
+###
+### Server mode
+###
+class _ClientOutput(object):
+    """Output stream which sends the data to a cnfgen client"""
+
+    softspace = 0
+
+    def __init__(self, sock, tag, name, bufsize=1 << 16):
+        self._sock = sock
+        self._tag = tag
+        self._buffer = []
+        self._size = 0
+        self._bufsize = bufsize
+        self.name = name
+        self.mode = 'wb'
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        self._buffer.append(data)
+        self._size += len(data)
+        if self._size >= self._bufsize:
+            self.flush()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        from .utils.cnfgenclient import _send
+        if self._size > 0:
+            _send(self._sock, self._tag, b"".join(self._buffer))
+        self._buffer = []
+        self._size = 0
+
+    def isatty(self):
+        return False
+
+    def close(self):
+        self.flush()
+
+
+class _ClientInput(io.TextIOBase):
+    """Input stream with the standard input of a cnfgen client
+
+    The input is requested to the client only when it is read.
+    """
+
+    def __init__(self, sock):
+        super(_ClientInput, self).__init__()
+        self._sock = sock
+        self._data = None
+        self.name = '<stdin>'
+        self.mode = 'r'
+
+    def _load(self):
+        from cStringIO import StringIO
+        from .utils.cnfgenclient import _send, _recv
+        if self._data is None:
+            _send(self._sock, b'R')
+            chunks = []
+            while True:
+                tag, payload = _recv(self._sock)
+                if tag != b'I' or len(payload) == 0:
+                    break
+                chunks.append(payload)
+            self._data = StringIO(b"".join(chunks))
+        return self._data
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._load().read(size)
+
+    def readline(self, size=-1):
+        return self._load().readline(size)
+
+    def readlines(self, hint=-1):
+        return self._load().readlines(hint)
+
+
+def _serve_request(sock):
+    """Run the command line sent by a client
+
+    The standard streams are connected to the client, and the exit
+    status of the command is sent back at the end. The environment
+    variables forwarded by the client replace the ones of the server.
+    This runs in a forked process, so the command cannot affect the
+    server.
+    """
+    import struct
+    import traceback
+    from .utils.cnfgenclient import _send, _recv, _FORWARDED_ENVIRONMENT
+
+    tag, payload = _recv(sock)
+    if tag == b'V':
+        for name in _FORWARDED_ENVIRONMENT:
+            os.environ.pop(name, None)
+        for variable in (payload.split(b"\0") if payload else []):
+            if not isinstance(variable, str):
+                variable = variable.decode('utf-8')
+            name, _, value = variable.partition("=")
+            if name in _FORWARDED_ENVIRONMENT:
+                os.environ[name] = value
+        tag, payload = _recv(sock)
+    if tag != b'A':
+        return
+    argv = ["cnfgen"] + (payload.split(b"\0") if payload else [])
+
+    # A fresh process would seed the generator from the system
+    random.seed()
+
+    sys.stdin = _ClientInput(sock)
+    sys.stdout = _ClientOutput(sock, b'O', '<stdout>')
+    sys.stderr = _ClientOutput(sock, b'E', '<stderr>', bufsize=0)
+    status = 0
+    try:
+        command_line_utility(argv)
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except Exception:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__
+    _send(sock, b'X', struct.pack('!i', status))
+
+
+def serve(address):
+    """Run cnfgen as a server on a local UNIX socket
+
+    The server loads the formula families and builds the command
+    line parsers once, and then runs the command lines sent by the
+    clients (see :py:mod:`cnfformula.utils.cnfgenclient`), each one in
+    a forked process. This avoids the startup cost of `cnfgen` when
+    it is run many times on small formulas.
+
+    Parameters
+    ----------
+    address: string
+        the path of the socket
+    """
+    import socket
+    import SocketServer
+
+    if os.path.exists(address):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(address)
+        except socket.error:
+            os.unlink(address)   # left by a server that died
+        else:
+            print("A server is already listening on '{}'.".format(address),
+                  file=sys.stderr)
+            sys.exit(os.EX_UNAVAILABLE)
+        finally:
+            probe.close()
+
+    command_line_parsers("cnfgen")
+
+    class RequestHandler(SocketServer.BaseRequestHandler):
+        def handle(self):
+            _serve_request(self.request)
+
+    class Server(SocketServer.ForkingMixIn, SocketServer.UnixStreamServer):
+        pass
+
+    server = Server(address, RequestHandler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    print("cnfgen server listening on '{}'".format(address), file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(address)
+
+
+###
+### Main program
+###
+def command_line_utility(argv=sys.argv):
+    """CNFgen main command line interface
+
+    This function provide the main interface to CNFgen. It sets up the
+    command line, parses the command line arguments, builds the
+    appropriate formula and outputs its representation.
+
+    With ``--serve <socket>`` as the only arguments, it runs as
+    a server for :py:mod:`cnfformula.utils.cnfgenclient` instead (see
+    `serve`).
+    
+    It **must not** raise exceptions, but fail with error messages for
+    the user.
+
+    Parameters
+    ----------
+    argv: list, optional
+        The list of token with the command line arguments/options.
+    """
+
+    if len(argv) > 1 and argv[1] == '--serve':
+        if len(argv) != 3:
+            print("Usage: {} --serve <socket>".format(os.path.basename(argv[0])),
+                  file=sys.stderr)
+            sys.exit(os.EX_USAGE)
+        serve(argv[2])
+        return
+
+    parser, t_parser = command_line_parsers(os.path.basename(argv[0]))
+
     # Split the command line into formula generation and transformation
     # applications
     def splitlist(L,key):
@@ -214,10 +468,31 @@ a sequence of transformations.
     for cmd in transformation_cmds:
         t_args.append(t_parser.parse_args(cmd))
 
+    # The parsers are shared by the commands run by the server, so
+    # the environment is read for each command
+    if args.graph_cache is None:
+        args.graph_cache = os.environ.get('CNFGEN_GRAPH_CACHE')
+
     # If necessary, init the random generator
     if hasattr(args,'seed') and args.seed:
         random.seed(args.seed)
 
+    # Some formulas can be written directly in DIMACS format, without
+    # building them in memory
+    if (args.output_format == 'dimacs' and len(t_args)==0 and
+        hasattr(args.generator,"stream_dimacs")):
+        try:
+            args.generator.stream_dimacs(args, args.output,
+                                         export_header=args.verbose,
+                                         extra_text="COMMAND LINE: cnfgen " + " ".join(argv[1:]) + "\n")
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(os.EX_DATAERR)
+
+        if args.output!=sys.stdout:
+            args.output.close()
+        return
+
     # Generate the formula
     try:
         cnf = args.generator.build_cnf(args)
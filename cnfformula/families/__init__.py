@@ -3,6 +3,8 @@
 """Formula families useful in proof complexity
 """
 
+import itertools
+from collections import deque
 
 __cnf_generator_mark = "_is_cnf_generator" 
 
@@ -45,3 +47,20 @@ def is_cnf_generator(func):
     bool
     """
     return hasattr(func,__cnf_generator_mark)
+
+
+def _pool_imap(pool, func, arguments, window):
+    """Like ``pool.imap(func, arguments)``, with a bounded window
+
+    At most `window` calls are submitted and not yet consumed, so
+    that the workers do not run ahead of the consumer, which may
+    write the results slowly or stop long before the last one.
+    """
+    arguments = iter(arguments)
+    pending = deque(pool.apply_async(func, (a,))
+                    for a in itertools.islice(arguments, window))
+    while pending:
+        result = pending.popleft().get()
+        for a in itertools.islice(arguments, 1):
+            pending.append(pool.apply_async(func, (a,)))
+        yield result
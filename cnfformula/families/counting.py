@@ -4,6 +4,7 @@
 """
 
 from cnfformula.cnf import CNF
+from cnfformula.cnf import _binomial_table,_rank_subset,_sequential_at_most_one
 from cnfformula.cmdline import SimpleGraphHelper
 
 from cnfformula.cmdline  import register_cnfgen_subcommand
@@ -11,10 +12,47 @@ from cnfformula.families import register_cnf_generator
 
 from cnfformula.graphs import enumerate_vertices,neighbors
 from itertools import combinations
+from bisect import bisect_left
+
+
+def _incidence_indices(M,p,el,binomials):
+    """Indices of the variables of the parts which contain `el`
+
+    The variable of a part, i.e. of a `p`-subset of ``range(M)``, has
+    index equal to one plus the rank of the subset in the order of
+    ``combinations(range(M),p)``. The indices are returned in
+    increasing order.
+
+    >>> B=_binomial_table(4,2)
+    >>> _incidence_indices(4,2,2,B)
+    [2, 4, 6]
+    """
+    others = range(el) + range(el+1,M)
+    indices = []
+    for rest in combinations(others,p-1):
+        pos = bisect_left(rest,el)
+        tpl = rest[:pos] + (el,) + rest[pos:]
+        indices.append(1 + _rank_subset(tpl,M,binomials))
+    return indices
+
+
+def _exactly_one_clauses(variables,counter=None):
+    """Compressed clauses claiming that exactly one variable is true
+
+    The at most one part is pairwise, or it is the sequential counter
+    encoding if the indices of `counter` variables are given.
+    """
+    if counter is None:
+        for cls in combinations([-v for v in variables],2):
+            yield cls
+    else:
+        for cls in _sequential_at_most_one(variables,counter):
+            yield tuple(v if p else -v for p,v in cls)
+    yield tuple(variables)
 
 
 @register_cnf_generator
-def CountingPrinciple(M,p):
+def CountingPrinciple(M,p,encoding='pairwise'):
     """Generates the clauses for the counting matching principle.
     
     The principle claims that there is a way to partition M in sets of
@@ -23,8 +61,15 @@ def CountingPrinciple(M,p):
     Arguments:
     - `M`  : size of the domain
     - `p`  : size of each class
+    - `encoding` : how to encode that each element is in at most one
+      part: either ``'pairwise'`` (default) or ``'auxiliary'``, which
+      uses the sequential counter encoding with auxiliary variables
+      ``S_{el,i}``.
 
     """
+    if encoding not in ('pairwise','auxiliary'):
+        raise ValueError("Unknown encoding {}".format(encoding))
+
     cnf=CNF()
 
     # Describe the formula
@@ -34,20 +79,37 @@ def CountingPrinciple(M,p):
     def var_name(tpl):
         return "Y_{{"+",".join("{0}".format(v) for v in tpl)+"}}"
 
-    # Incidence lists
-    incidence=[[] for _ in range(M)]
-    for tpl in combinations(range(M),p):
-        for i in tpl:
-            incidence[i].append(tpl)
-    
+    # Parts are indexed by their rank in lexicographic order
+    if M>0 and p>0:
+        for tpl in combinations(range(M),p):
+            cnf.add_variable(var_name(tpl))
+
+    binomials = _binomial_table(M,p)
+    degree = binomials[M-1][p-1] if M>0 and p>0 else 0
+    offset = binomials[M][p] if p>0 else 0
+
+    if encoding=='auxiliary':
+        for el in range(M):
+            for i in range(1,degree):
+                cnf.add_variable("S_{{{0},{1}}}".format(el,i))
+
     # Each element of the domain is in exactly one part.
     for el in range(M):
 
-        edge_vars = [var_name(tpl) for tpl in incidence[el]]
+        if degree>0:
+            edge_vars = _incidence_indices(M,p,el,binomials)
+        else:
+            edge_vars = []
 
-        for cls in CNF.equal_to_constraint(edge_vars,1):
-            cnf.add_clause(cls)
+        if encoding=='auxiliary':
+            base = offset + el*(degree-1)
+            counter = range(base+1,base+degree)
+        else:
+            counter = None
+
+        cnf._add_compressed_clauses(_exactly_one_clauses(edge_vars,counter))
 
+    cnf._check_coherence(force=True)
     return cnf
 
 
@@ -108,10 +170,13 @@ class ParityCmdHelper(object):
         - `parser`: parser to load with options.
         """
         parser.add_argument('N',metavar='<N>',type=int,help="domain size")
+        parser.add_argument('--encoding',choices=['pairwise','auxiliary'],default='pairwise',
+                            help="""encoding of the at most one constraints:
+                            'auxiliary' uses sequential counters (default: pairwise)""")
 
     @staticmethod
     def build_cnf(args):
-        return CountingPrinciple(args.N,2)
+        return CountingPrinciple(args.N,2,encoding=args.encoding)
 
 
 @register_cnfgen_subcommand
@@ -153,6 +218,9 @@ class CountingCmdHelper:
         """
         parser.add_argument('M',metavar='<M>',type=int,help="domain size")
         parser.add_argument('p',metavar='<p>',type=int,help="size of the parts")
+        parser.add_argument('--encoding',choices=['pairwise','auxiliary'],default='pairwise',
+                            help="""encoding of the at most one constraints:
+                            'auxiliary' uses sequential counters (default: pairwise)""")
 
     @staticmethod
     def build_cnf(args):
@@ -161,6 +229,6 @@ class CountingCmdHelper:
         Arguments:
         - `args`: command line options
         """
-        return CountingPrinciple(args.M,args.p)
+        return CountingPrinciple(args.M,args.p,encoding=args.encoding)
 
     
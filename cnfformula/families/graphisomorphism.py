@@ -10,7 +10,8 @@ from cnfformula.cmdline  import register_cnfgen_subcommand
 from cnfformula.families import register_cnf_generator
 
 from cnfformula.graphs import enumerate_vertices
-from itertools import combinations,product
+from cnfformula.graphs import _split_vertex_pairs
+from itertools import combinations,product,chain
 
 
 
@@ -19,8 +20,69 @@ def _graph_isomorphism_var(u, v):
     """Standard variable name"""
     return "x_{{{0},{1}}}".format(u, v)
 
+
+def _variable_table(F, U, V, allowed):
+    """Add the mapping variables to the formula
+
+    The variables are added in the order of ``product(U,V)``, skipping
+    the pairs which are not allowed.
+
+    Returns
+    -------
+    a list with a row for each vertex in `U`, where ``table[i][j]`` is
+    the index of the variable for the `i`-th vertex of `U` and the
+    `j`-th vertex of `V`, or 0 if the pair is not allowed.
+    """
+    var = _graph_isomorphism_var
+    table = []
+    for u in U:
+        row = [0]*len(V)
+        for j, v in enumerate(V):
+            if allowed(u, v):
+                F.add_variable(var(u, v))
+                row[j] = F._name2index[var(u, v)]
+        table.append(row)
+    return table
+
+
+def _isomorphism_clauses(G1, U, G2, V, table):
+    """Clauses of the graph isomorphism formula, in compressed form
+
+    Clauses mentioning a pruned variable (index 0 in `table`) are
+    omitted, since the variable is implicitly false.
+    """
+    columns = [list(col) for col in zip(*table)] if table else [[] for _ in V]
+
+    # Defined on both side
+    for line in chain(table, columns):
+        yield tuple(x for x in line if x)
+
+    # Injective on both sides
+    for line in chain(table, columns):
+        line = [-x for x in line if x]
+        for cls in combinations(line, 2):
+            yield cls
+
+    # Edge consistency: the pairs of G2 which are non-edges (edges)
+    # are mismatched with the edges (non-edges) of G1.
+    nonedges, edges = _split_vertex_pairs(G2, V, symmetric=True)
+    negtable = [[-x for x in row] for row in table]
+    pruned = any(0 in row for row in table)
+    for i1, i2 in combinations(range(len(U)), 2):
+        J1, J2 = nonedges if G1.has_edge(U[i1], U[i2]) else edges
+        row1 = negtable[i1].__getitem__
+        row2 = negtable[i2].__getitem__
+        straight = zip(map(row1, J1), map(row2, J2))
+        crossed  = zip(map(row1, J2), map(row2, J1))
+        clauses = chain.from_iterable(zip(straight, crossed))
+        if pruned:
+            clauses = (cls for cls in clauses if cls[0] and cls[1])
+        for cls in clauses:
+            yield cls
+
+
 @register_cnf_generator
-def GraphIsomorphism(G1, G2):
+def GraphIsomorphism(G1, G2, degree_pruning=False):
     """Graph Isomorphism formula
 
     The formula is the CNF encoding of the statement that two simple
@@ -32,6 +94,11 @@ def GraphIsomorphism(G1, G2):
         an undirected graph object
     G2 : networkx.Graph
         an undirected graph object
+    degree_pruning : bool, optional
+        omit the variables which map a vertex of G1 to a vertex of G2
+        of different degree, since no isomorphism does that. The
+        resulting formula is smaller, and it is satisfiable if and
+        only if the full one is. (default: False)
 
     Returns
     -------
@@ -45,41 +112,20 @@ def GraphIsomorphism(G1, G2):
 
     U=enumerate_vertices(G1)
     V=enumerate_vertices(G2)
-    var = _graph_isomorphism_var
 
-    for (u, v) in product(U,V):
-        F.add_variable(var(u, v))
+    if degree_pruning:
+        allowed = lambda u, v: len(G1.adj[u]) == len(G2.adj[v])
+    else:
+        allowed = lambda u, v: True
 
-    # Defined on both side
-    for u in U:
-        F.add_clause([(True, var(u, v)) for v in V], strict=True)
-
-    for v in V:
-        F.add_clause([(True, var(u, v)) for u in U], strict=True)
-
-    # Injective on both sides
-    for u in U:
-        for v1, v2 in combinations(V, 2):
-            F.add_clause([(False, var(u, v1)),
-                          (False, var(u, v2))], strict=True)
-    for v in V:
-        for u1, u2 in combinations(U, 2):
-            F.add_clause([(False, var(u1, v)),
-                          (False, var(u2, v))], strict=True)
-
-    # Edge consistency
-    for u1, u2 in combinations(U, 2):
-        for v1, v2 in combinations(V, 2):
-            if G1.has_edge(u1, u2) != G2.has_edge(v1, v2):
-                F.add_clause([(False, var(u1, v1)),
-                              (False, var(u2, v2))], strict=True)
-                F.add_clause([(False, var(u1, v2)),
-                              (False, var(u2, v1))], strict=True)
+    table = _variable_table(F, U, V, allowed)
+    F._add_compressed_clauses(_isomorphism_clauses(G1, U, G2, V, table))
+    F._check_coherence(force=True)
 
     return F
 
 @register_cnf_generator
-def GraphAutomorphism(G):
+def GraphAutomorphism(G, degree_pruning=False):
     """Graph Automorphism formula
 
     The formula is the CNF encoding of the statement that a graph G
@@ -90,6 +136,10 @@ def GraphAutomorphism(G):
     ---------
     G : a simple graph
 
+    degree_pruning : bool, optional
+        omit the variables which map a vertex to a vertex of different
+        degree (see :py:func:`GraphIsomorphism`).
+
     Returns
     -------
     A CNF formula which is satiafiable if and only if graph G has a
@@ -97,7 +147,7 @@ def GraphAutomorphism(G):
     """
     tmp = CNF()
     header = "Graph automorphism formula for graph "+ G.name +"\n"+ tmp.header
-    F = GraphIsomorphism(G, G)
+    F = GraphIsomorphism(G, G, degree_pruning=degree_pruning)
     F.header = header
 
     var = _graph_isomorphism_var
@@ -123,7 +173,8 @@ class GAutoCmdHelper(object):
         - `parser`: parser to load with options.
         """
         SimpleGraphHelper.setup_command_line(parser)
-
+        parser.add_argument('--degree-pruning',action='store_true',
+                            help="omit the variables that map a vertex to a vertex of different degree")
 
     @staticmethod
     def build_cnf(args):
@@ -133,7 +184,7 @@ class GAutoCmdHelper(object):
         - `args`: command line options
         """
         G = SimpleGraphHelper.obtain_graph(args)
-        return GraphAutomorphism(G)
+        return GraphAutomorphism(G,degree_pruning=args.degree_pruning)
 
 
 
@@ -153,6 +204,8 @@ class GIsoCmdHelper(object):
         """
         SimpleGraphHelper.setup_command_line(parser,suffix="1",required=True)
         SimpleGraphHelper.setup_command_line(parser,suffix="2",required=True)
+        parser.add_argument('--degree-pruning',action='store_true',
+                            help="omit the variables that map a vertex to a vertex of different degree")
 
 
     @staticmethod
@@ -164,6 +217,6 @@ class GIsoCmdHelper(object):
         """
         G1 = SimpleGraphHelper.obtain_graph(args,suffix="1")
         G2 = SimpleGraphHelper.obtain_graph(args,suffix="2")
-        return GraphIsomorphism(G1,G2)
+        return GraphIsomorphism(G1,G2,degree_pruning=args.degree_pruning)
 
 
@@ -9,8 +9,9 @@ from cnfformula.cmdline import SimpleGraphHelper
 import cnfformula.cmdline  
 import cnfformula.families
 
-from cnfformula.graphs import enumerate_vertices,neighbors
+from cnfformula.graphs import enumerate_vertices,neighbors,_pair_index_table
 from itertools import combinations,permutations
+from itertools import compress,repeat
 
 import networkx
 
@@ -44,8 +45,59 @@ def GraphOrderingPrinciple(graph,total=False,smart=False,plant=False,knuth=0):
     - `knuth` : Don Knuth variants 2 or 3 of the formula (anything else suppress it)
     """
     gop = CNF()
+    gop.header = _ordering_header(graph,total,smart) + gop.header
 
-    # Describe the formula
+    # Fix the vertex order
+    V = enumerate_vertices(graph)
+
+    # Add variables
+    iterator = combinations if smart else permutations
+    for v1,v2 in iterator(V,2):
+        gop.add_variable(varname(v1,v2))
+
+    for clauses in _ordering_clauses(graph,V,total,smart,plant,knuth):
+        gop._add_compressed_clauses(clauses)
+
+    gop._check_coherence(force=True)
+    return gop
+
+
+def GraphOrderingPrincipleDimacs(graph,output,total=False,smart=False,plant=False,knuth=0,
+                                 export_header=True,extra_text=None):
+    """Write the DIMACS encoding of the graph ordering principle
+
+    The formula is not stored in memory, and the output is identical
+    to the one of ``GraphOrderingPrinciple(graph,...).dimacs()``,
+    followed by a newline.
+
+    Arguments:
+    - `graph` : undirected graph
+    - `output`: file-like object
+    - `total`, `smart`, `plant`, `knuth` : as in `GraphOrderingPrinciple`
+    - `export_header`: output the formula header as comments
+    - `extra_text`: additional text attached to the header
+    """
+    gop = CNF()
+    gop.header = _ordering_header(graph,total,smart) + gop.header
+
+    V = enumerate_vertices(graph)
+    n = len(V)
+    if smart:
+        nvars = n*(n-1)//2
+    else:
+        nvars = n*(n-1)
+    gop._dimacs_dump_header(output, nvars,
+                            _ordering_clauses_count(n,total,smart,plant,knuth),
+                            export_header, extra_text)
+
+    for clauses in _ordering_clauses(graph,V,total,smart,plant,knuth):
+        output.write("".join(["\n" + " ".join(map(str,cls+(0,)))
+                              for cls in clauses]))
+    output.write("\n")
+
+
+def _ordering_header(graph,total,smart):
+    """Description of the graph ordering principle formula"""
     if total or smart:
         name = "Total graph ordering principle"
     else:
@@ -55,18 +107,63 @@ def GraphOrderingPrinciple(graph,total=False,smart=False,plant=False,knuth=0):
         name = name + "(compact representation)"
 
     if hasattr(graph, 'name'):
-        gop.header = name+"\n on graph "+graph.name+".\n\n"+gop.header
+        return name+"\n on graph "+graph.name+".\n\n"
     else:
-        gop.header = name+".\n\n"+gop.header
-
-
-    # Fix the vertex order
-    V = enumerate_vertices(graph)
-
-    # Add variables
-    iterator = combinations if smart else permutations
-    for v1,v2 in iterator(V,2):
-        gop.add_variable(varname(v1,v2))
+        return name+".\n\n"
+
+
+#
+# Compressed clauses of the ordering principle
+#
+# The vertex V[i] is identified by its position i. The variable of
+# the pair (V[i],V[j]) has index
+#
+#     i*n - i*(i+1)/2 + j - i        if `smart` (for i<j)
+#     i*(n-1) + j + 1                if j<i
+#     i*(n-1) + j                    if j>i
+#
+# which is its position in the enumeration of the pairs done by
+# `combinations` or `permutations`, respectively.
+#
+
+def _variable_table(n,smart):
+    """Table of variable indices (zero where there is no variable)"""
+    if smart:
+        return _pair_index_table(n)
+    table = []
+    for i in xrange(n):
+        offset = i*(n-1)
+        table.append(range(offset+1,offset+i+1) + [0] +
+                     range(offset+i+1,offset+n))
+    return table
+
+
+def _interleave(A,B):
+    """Interleave two lists of the same length"""
+    result = [None]*(2*len(A))
+    result[::2]  = A
+    result[1::2] = B
+    return result
+
+
+def _ordering_clauses(graph,V,total=False,smart=False,plant=False,knuth=0):
+    """Clauses of the graph ordering principle, in compressed form
+
+    The clauses are generated in the same order as in
+    `GraphOrderingPrinciple`, in batches. Transitivity clauses are
+    built by zipping rows and columns of the table of variable
+    indices.
+
+    Yields
+    ------
+    lists of clauses
+    """
+    n = len(V)
+    x = _variable_table(n,smart)
+    nx = [ [-v for v in row] for row in x ]
+    if not smart:
+        xt = [ list(column) for column in zip(*x) ]
+        nxt = [ [-v for v in row] for row in xt ]
 
     #
     # Non minimality axioms
@@ -75,84 +172,93 @@ def GraphOrderingPrinciple(graph,total=False,smart=False,plant=False,knuth=0):
     # Clause is generated in such a way that if totality is enforces,
     # every pair occurs with a specific orientation.
     # Allow minimum on last vertex if 'plant' options.
-
-    for med in xrange(len(V) - (plant and 1)):
-        clause = []
-        for lo in xrange(med):
-            if graph.has_edge(V[med], V[lo]):
-                clause += [(True, varname(V[lo], V[med]))]
-        for hi in xrange(med+1, len(V)):
-            if not graph.has_edge(V[med], V[hi]):
-                continue
-            elif smart:
-                clause += [(False, varname(V[med], V[hi]))]
-            else:
-                clause += [(True, varname(V[hi], V[med]))]
-        gop.add_clause(clause, strict=True)
+    clauses = []
+    for med in xrange(n - (plant and 1)):
+        neighbors = graph.adj[V[med]]
+        clause = [ x[lo][med] for lo in xrange(med) if V[lo] in neighbors ]
+        if smart:
+            clause += [ nx[med][hi] for hi in xrange(med+1,n) if V[hi] in neighbors ]
+        else:
+            clause += [ x[hi][med] for hi in xrange(med+1,n) if V[hi] in neighbors ]
+        clauses.append(tuple(clause))
+    yield clauses
 
     #
     # Transitivity axiom
     #
 
-    if len(V) >= 3:
+    if n >= 3:
         if smart:
             # Optimized version if smart representation of totality is used
-            for (v1, v2, v3) in combinations(V, 3):
-
-                gop.add_clause([(True,  varname(v1, v2)),
-                                (True,  varname(v2, v3)),
-                                (False, varname(v1, v3))],
-                               strict=True)
-                
-                gop.add_clause([(False, varname(v1, v2)),
-                                (False, varname(v2, v3)),
-                                (True,  varname(v1, v3))],
-                               strict=True)
+            for a in xrange(n):
+                for b in xrange(a+1,n):
+                    yield _interleave(zip(repeat(x[a][b]), x[b][b+1:], nx[a][b+1:]),
+                                      zip(repeat(-x[a][b]), nx[b][b+1:], x[a][b+1:]))
 
         elif total:
             # With totality we still need just two axiom per triangle
-            for (v1, v2, v3) in combinations(V, 3):
-                
-                gop.add_clause([(False, varname(v1, v2)),
-                                (False, varname(v2, v3)),
-                                (False, varname(v3, v1))],
-                               strict=True)
-
-                gop.add_clause([(False, varname(v1, v3)),
-                                (False, varname(v3, v2)),
-                                (False, varname(v2, v1))],
-                               strict=True)
+            for a in xrange(n):
+                for b in xrange(a+1,n):
+                    yield _interleave(zip(repeat(-x[a][b]), nx[b][b+1:], nxt[a][b+1:]),
+                                      zip(nx[a][b+1:], nxt[b][b+1:], repeat(-x[b][a])))
+
+        elif knuth in (2,3):
+            # knuth variants will reduce the number of transitivity
+            # axioms: the middle (resp. last) element of the chain
+            # must be the largest vertex.
+            rank = dict((v,r) for r,v in enumerate(sorted(V)))
+            r = [ rank[v] for v in V ]
+            smaller = [ bytearray(r[c] < r[t] for c in xrange(n)) for t in xrange(n) ]
+            larger  = [ bytearray(r[c] > r[t] for c in xrange(n)) for t in xrange(n) ]
+            for a in xrange(n):
+                for b in xrange(n):
+                    if a==b:
+                        continue
+                    if knuth == 2:
+                        if r[b] < r[a]:
+                            continue
+                        mask = smaller[b][:]
+                        mask[a] = 0
+                    else:
+                        mask = larger[a if r[a]>r[b] else b]
+                    yield zip(repeat(-x[a][b]),
+                              compress(nx[b],mask),
+                              compress(x[a],mask))
 
         else:
-            for (v1, v2, v3) in permutations(V, 3):
-
-                # knuth variants will reduce the number of
-                # transitivity axioms
-                if knuth == 2 and ((v2 < v1) or (v2 < v3)):
-                    continue
-                if knuth == 3 and ((v3 < v1) or (v3 < v2)):
-                    continue
-
-                gop.add_clause([(False, varname(v1, v2)),
-                                (False, varname(v2, v3)),
-                                (True,  varname(v1, v3))],
-                               strict=True)
+            for a in xrange(n):
+                for b in xrange(n):
+                    if a==b:
+                        continue
+                    lo,hi = min(a,b),max(a,b)
+                    yield (zip(repeat(-x[a][b]), nx[b][:lo], x[a][:lo]) +
+                           zip(repeat(-x[a][b]), nx[b][lo+1:hi], x[a][lo+1:hi]) +
+                           zip(repeat(-x[a][b]), nx[b][hi+1:], x[a][hi+1:]))
 
     if not smart:
         # Antisymmetry axioms (useless for 'smart' representation)
-        for (v1, v2) in combinations(V, 2):
-            gop.add_clause([(False, varname(v1, v2)),
-                            (False, varname(v2, v1))],
-                           strict=True)
+        for a in xrange(n):
+            yield zip(nx[a][a+1:], nxt[a][a+1:])
 
         # Totality axioms (useless for 'smart' representation)
         if total:
-            for (v1, v2) in combinations(V, 2):
-                gop.add_clause([(True, varname(v1, v2)),
-                                (True, varname(v2, v1))],
-                               strict=True)
+            for a in xrange(n):
+                yield zip(x[a][a+1:], xt[a][a+1:])
 
-    return gop
+
+def _ordering_clauses_count(n,total=False,smart=False,plant=False,knuth=0):
+    """Number of clauses of the graph ordering principle on `n` vertices"""
+    count = max(0, n - (plant and 1))
+    if n >= 3:
+        if smart or total or knuth in (2,3):
+            count += n*(n-1)*(n-2)//3
+        else:
+            count += n*(n-1)*(n-2)
+    if not smart:
+        count += n*(n-1)//2
+        if total:
+            count += n*(n-1)//2
+    return count
 
 
 @cnfformula.cmdline.register_cnfgen_subcommand
@@ -188,6 +294,21 @@ class OPCmdHelper(object):
         """
         return OrderingPrinciple(args.N,args.total,args.smart,args.plant,args.knuth)
 
+    @staticmethod
+    def stream_dimacs(args, output, export_header, extra_text):
+        """Write the Ordering principle formula in DIMACS format without storing it
+
+        Arguments:
+        - `args`: command line options
+        - `output`: output file
+        - `export_header`: output the formula header as comments
+        - `extra_text`: additional text attached to the header
+        """
+        GraphOrderingPrincipleDimacs(networkx.complete_graph(args.N),output,
+                                     args.total,args.smart,args.plant,args.knuth,
+                                     export_header=export_header,
+                                     extra_text=extra_text)
+
 
 @cnfformula.cmdline.register_cnfgen_subcommand
 class GOPCmdHelper(object):
@@ -224,4 +345,20 @@ class GOPCmdHelper(object):
         G= SimpleGraphHelper.obtain_graph(args)
         return GraphOrderingPrinciple(G,args.total,args.smart,args.plant,args.knuth)
 
+    @staticmethod
+    def stream_dimacs(args, output, export_header, extra_text):
+        """Write the Graph ordering principle formula in DIMACS format without storing it
+
+        Arguments:
+        - `args`: command line options
+        - `output`: output file
+        - `export_header`: output the formula header as comments
+        - `extra_text`: additional text attached to the header
+        """
+        G= SimpleGraphHelper.obtain_graph(args)
+        GraphOrderingPrincipleDimacs(G,output,
+                                     args.total,args.smart,args.plant,args.knuth,
+                                     export_header=export_header,
+                                     extra_text=extra_text)
+
 
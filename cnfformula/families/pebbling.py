@@ -35,6 +35,123 @@ def _uniqify_list(seq):
     return [x for x in seq if x not in seen and not seen.add(x)]
 
 
+class _StoneClauses(object):
+    """Implication clauses of a stone formula, in compressed form
+
+    The clauses for a vertex are computed from a task
+    ``(images,predecessors,sink)``, where `images` is the list of
+    pairs ``(j,index)`` of the stones allowed on the vertex and of
+    the indices of the corresponding variables, `predecessors` is the
+    same kind of list for each predecessor of the vertex, and `sink`
+    tells whether the vertex is a sink.
+
+    The color part of the clauses only depends on the stones involved.
+    With `memoize` it is computed once for each choice of stones: this
+    pays off when all vertices allow the same stones, since then the
+    choices only depend on the stone and on the in-degree. With sparse
+    stone assignments the choices rarely repeat, and the memo would
+    just grow with the formula.
+    """
+    def __init__(self, colors, memoize=False):
+        self.colors = colors
+        self._suffixes = {} if memoize else None
+
+    def suffixes(self, choices, j):
+        """Color literals for all tuples in ``product(*choices)``"""
+        if self._suffixes is None:
+            return self._color_literals(choices, j)
+        key = (choices, j)
+        if key not in self._suffixes:
+            self._suffixes[key] = self._color_literals(choices, j)
+        return self._suffixes[key]
+
+    def _color_literals(self, choices, j):
+        R = self.colors
+        return [ tuple([-R[s] for s in _uniqify_list(stones_tuple)]) + (R[j],)
+                 for stones_tuple in product(*choices) ]
+
+    def vertex(self, task):
+        images, predecessors, sink = task
+        clauses = []
+        for j,vj in images:
+            choices = [ [(s,p) for (s,p) in pred if s!=j] for pred in predecessors ]
+            stones  = tuple( tuple(s for (s,_) in c) for c in choices )
+            literals = product(*[ [-p for (_,p) in c] for c in choices ])
+            clauses.extend( lits + (-vj,) + suffix
+                            for lits,suffix in zip(literals,self.suffixes(stones,j)) )
+        if sink:
+            clauses.extend( (-vj, -self.colors[j]) for j,vj in images )
+        return clauses
+
+
+def _init_stone_worker(colors, memoize):
+    global _worker_stone_clauses
+    _worker_stone_clauses = _StoneClauses(colors, memoize)
+
+def _stone_worker_vertex(task):
+    return _worker_stone_clauses.vertex(task)
+
+
+def _stone_formula_clauses(F, D, vertices, images, var_name, colors, jobs=1,
+                           memoize=False):
+    """Add the implication and sink clauses of a stone formula to `F`
+
+    The structure of the clauses is validated once per vertex, then
+    the clauses are added in compressed form.
+
+    Parameters
+    ----------
+    F : CNF
+        the formula, which already contains all the variables
+    D : directed acyclic graph
+    vertices : list
+        the vertices of `D` in order
+    images : function
+        the list of stones allowed on a vertex
+    var_name : function
+        the name of the variable for a vertex and a stone
+    colors : dict
+        index of the color variable of each stone
+    jobs : int
+        number of processes that compute the clauses
+    memoize : bool
+        reuse the color part of the clauses across vertices, which
+        is worth it only when all vertices allow the same stones
+    """
+    position = dict((v,i) for (i,v) in enumerate(vertices))
+    index = F._name2index
+
+    def row(v):
+        stones = images(v)
+        if len(set(stones)) != len(stones):
+            raise ValueError("Repeated stones on vertex {}".format(v))
+        return [ (s, index[var_name(v,s)]) for s in stones ]
+
+    tasks = []
+    for v in vertices:
+        pred = sorted(D.predecessors(v),key=lambda x:position[x])
+        if v in pred:
+            raise ValueError("Stone formulas are defined only for directed acyclic graphs.")
+        tasks.append((row(v), [row(p) for p in pred], D.out_degree(v)==0))
+
+    if jobs>1 and len(tasks)>1:
+        from multiprocessing import Pool
+        pool = Pool(jobs, _init_stone_worker, (colors, memoize))
+        try:
+            for clauses in pool.imap(_stone_worker_vertex, tasks, 16):
+                F._add_compressed_clauses(clauses)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    else:
+        engine = _StoneClauses(colors, memoize)
+        for task in tasks:
+            F._add_compressed_clauses(engine.vertex(task))
+
+
 
 @cnfformula.families.register_cnf_generator
 def PebblingFormula(digraph):
@@ -57,29 +174,35 @@ def PebblingFormula(digraph):
     else:
         peb.header="Pebbling formula\n\n"+peb.header
 
-    # add variables in the appropriate order
+    # add variables in the appropriate order: the variables are the
+    # vertices themselves, so that their names are rendered only if
+    # the output needs them
     vertices=enumerate_vertices(digraph)
     position=dict((v,i) for (i,v) in enumerate(vertices))
 
     for v in vertices:
-        peb.add_variable(v,description="There is a pebble on vertex ${}$".format(v))
+        peb.add_variable(v)
 
-    # add the clauses
-    for v in vertices:
+    # add the clauses, using the fact that the variable of the
+    # vertex at position i has index i+1
+    def clauses():
+        for v in vertices:
 
-        # If predecessors are pebbled the vertex must be pebbled
-        pred=sorted(digraph.predecessors(v),key=lambda x:position[x])
-        peb.add_clause_unsafe([(False,p) for p in pred]+[(True,v)])
+            # If predecessors are pebbled the vertex must be pebbled
+            pred=sorted(position[p]+1 for p in digraph.pred[v])
+            yield [-p for p in pred]+[position[v]+1]
 
-        if digraph.out_degree(v)==0: #the sink
-            peb.add_clause_unsafe([(False,v)])
+            if len(digraph.succ[v])==0: #the sink
+                yield [-position[v]-1]
 
+    peb._add_compressed_clauses(clauses())
+    peb._check_coherence(force=True)
     return peb
 
 
 
 
-def stone_formula_helper(F,D,mapping):
+def stone_formula_helper(F,D,mapping,jobs=1):
     """Stones formulas helper
 
     Builds the clauses of a stone formula given the mapping object
@@ -100,6 +223,9 @@ def stone_formula_helper(F,D,mapping):
     mapping : unary_mapping object
        mapping between stones and graph vertices
 
+    jobs : int, optional
+       number of processes that compute the clauses (default: 1)
+
 
     See Also
     --------
@@ -124,27 +250,16 @@ def stone_formula_helper(F,D,mapping):
         F.add_clause_unsafe(cls)
         
     # If predecessors have red stones, the sink must have a red stone
-    for v in vertices:
-        for j in mapping.images(v):
-            pred=sorted(D.predecessors(v),key=lambda x:mapping.RankDomain[x])
-            for stones_tuple in product(*tuple( [s for s in mapping.images(v) if s!=j  ] for v in pred)):
-                F.add_clause([(False, mapping.var_name(p,s)) for (p,s) in zip(pred,stones_tuple)] +
-                               [(False, mapping.var_name(v,j))] +
-                               [(False, "R_{{{0}}}".format(s)) for s in _uniqify_list(stones_tuple)] +
-                               [(True,  "R_{{{0}}}".format(j))],
-                               strict=True)
-        
-        if D.out_degree(v)==0: #the sink
-            for j in mapping.images(v):
-                F.add_clause([ (False, mapping.var_name(v,j)),
-                               (False,"R_{{{0}}}".format(j))],
-                               strict = True)
+    colors = dict((stone,F._name2index["R_{{{0}}}".format(stone)])
+                  for stone in mapping.range())
+    _stone_formula_clauses(F,D,vertices,mapping.images,mapping.var_name,colors,jobs)
+    F._check_coherence(force=True)
 
     return F
 
 
 @cnfformula.families.register_cnf_generator
-def StoneFormula(D,nstones):
+def StoneFormula(D,nstones,jobs=1):
     """Stone formulas
 
     The stone formulas have been introduced in [2]_ and generalized in
@@ -180,6 +295,9 @@ def StoneFormula(D,nstones):
         it should be a directed acyclic graph.
     nstones : int
        the number of stones.
+    jobs : int, optional
+       number of processes that compute the clauses. The formula does
+       not depend on this value. (default: 1)
 
     Raises
     ------
@@ -235,27 +353,20 @@ def StoneFormula(D,nstones):
                          description="Stone ${}$ is red".format(j))
     
     # Each vertex has some stone
-    for v in vertices:
-        cnf.add_clause_unsafe([(True,stone_vn[(v,j)]) for j in stones])
-        
+    cnf._add_compressed_clauses(
+        tuple([cnf._name2index[stone_vn[(v,j)]] for j in stones]) for v in vertices)
+
     # If predecessors have red stones, the sink must have a red stone
-    for v in vertices:
-        for j in stones:
-            pred=sorted(D.predecessors(v),key=lambda x:position[x])
-            for stones_tuple in product([s for s in stones if s!=j],repeat=len(pred)):
-                cnf.add_clause_unsafe([(False, stone_vn[(p,s)]) for (p,s) in zip(pred,stones_tuple)] +
-                                      [(False, stone_vn[(v,j)])] +
-                                      [(False, color_vn[s]) for s in _uniqify_list(stones_tuple)] +
-                                      [(True,  color_vn[j])])
-        
-        if D.out_degree(v)==0: #the sink
-            for j in stones:
-                cnf.add_clause_unsafe([ (False,stone_vn[(v,j)]), (False,color_vn[j])])
+    colors = dict((j,cnf._name2index[color_vn[j]]) for j in stones)
+    _stone_formula_clauses(cnf,D,vertices,lambda v: stones,
+                           lambda v,j: stone_vn[(v,j)],colors,jobs,
+                           memoize=True)
+    cnf._check_coherence(force=True)
 
     return cnf
 
 @cnfformula.families.register_cnf_generator
-def SparseStoneFormula(D,B):
+def SparseStoneFormula(D,B,jobs=1):
     """Sparse Stone formulas
 
     This is a variant of the :py:func:`StoneFormula`. See that for
@@ -289,6 +400,8 @@ def SparseStoneFormula(D,B):
     D : a directed acyclic graph
         it should be a directed acyclic graph.
     B : bipartite graph
+    jobs : int, optional
+       number of processes that compute the clauses (default: 1)
 
     Raises
     ------
@@ -332,7 +445,7 @@ def SparseStoneFormula(D,B):
     
     mapping = cnf.unary_mapping(vertices,stones,sparsity_pattern=B)
 
-    stone_formula_helper(cnf,D,mapping)
+    stone_formula_helper(cnf,D,mapping,jobs)
     return cnf
 
 
@@ -383,6 +496,8 @@ class StoneCmdHelper:
         """
         DirectedAcyclicGraphHelper.setup_command_line(parser)
         parser.add_argument('s',metavar='<s>',type=int,help="number of stones")
+        parser.add_argument('--jobs','-j',metavar='<jobs>',type=int,default=1,
+                            help="Number of processes that generate the clauses (default: 1)")
 
     @staticmethod
     def build_cnf(args):
@@ -393,7 +508,7 @@ class StoneCmdHelper:
         """
         D= DirectedAcyclicGraphHelper.obtain_graph(args)
         try:
-            return StoneFormula(D,args.s)
+            return StoneFormula(D,args.s,jobs=args.jobs)
         except ValueError as e :
             print("\nError: {}".format(e),file=sys.stderr)
             sys.exit(-1)
@@ -415,6 +530,8 @@ class SparseStoneCmdHelper:
         """
         DirectedAcyclicGraphHelper.setup_command_line(parser)
         BipartiteGraphHelper.setup_command_line(parser,suffix="_mapping")
+        parser.add_argument('--jobs','-j',metavar='<jobs>',type=int,default=1,
+                            help="Number of processes that generate the clauses (default: 1)")
 
     @staticmethod
     def build_cnf(args):
@@ -426,7 +543,7 @@ class SparseStoneCmdHelper:
         D= DirectedAcyclicGraphHelper.obtain_graph(args)
         B= BipartiteGraphHelper.obtain_graph(args,suffix="_mapping")
         try:
-            return SparseStoneFormula(D,B)
+            return SparseStoneFormula(D,B,jobs=args.jobs)
         except ValueError as e:
             print("\nError: {}".format(e),file=sys.stderr)
             sys.exit(-1)
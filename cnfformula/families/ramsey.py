@@ -4,13 +4,19 @@
 """
 
 from cnfformula.cnf import CNF
+from cnfformula.cnf import _binomial_table,_unrank_subset
+from cnfformula.graphs import _pair_index_table
 
 import cnfformula.cmdline
 import cnfformula.families
+from cnfformula.families import _pool_imap
 
 from textwrap import dedent
 from itertools import combinations
-from math import sqrt
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
 
 @cnfformula.families.register_cnf_generator
 def PythagoreanTriples(N):
@@ -58,16 +64,45 @@ It is possible to bicolor the numbers from
         ptn.add_variable(V(i))
 
         
-    for x,y in combinations(range(1,N+1),2):
-        z = int(sqrt(x**2 +  y**2))
-        if z <=N and z**2 == x**2 + y**2:
-            ptn.add_clause([ (True, V(x)), (True, V(y)), (True, V(z))],strict=True)
-            ptn.add_clause([ (False,V(x)), (False,V(y)), (False,V(z))],strict=True)
+    for x,y,z in _pythagorean_triples(N):
+        ptn._add_compressed_clauses([(x,y,z),(-x,-y,-z)])
+    ptn._check_coherence(force=True)
 
     return ptn
 
 
 
+def _pythagorean_triples(N):
+    """Pythagorean triples with elements from 1 to N
+
+    The triples are obtained from the primitive ones, given by
+    Euclid's formula :math:`(m^2-n^2,2mn,m^2+n^2)` for coprime
+    :math:`m>n>0` of different parity, and their multiples.
+
+    Returns
+    -------
+    the list of triples :math:`(x,y,z)` with :math:`x<y<z\\leq N` and
+    :math:`x^2+y^2=z^2`, sorted lexicographically.
+
+    >>> _pythagorean_triples(20)
+    [(3, 4, 5), (5, 12, 13), (6, 8, 10), (8, 15, 17), (9, 12, 15), (12, 16, 20)]
+    """
+    triples = []
+    m = 2
+    while m*m + 1 <= N:
+        for n in xrange(1 + m % 2, m, 2):
+            c = m*m + n*n
+            if c > N:
+                break
+            if gcd(m,n) != 1:
+                continue
+            a, b = sorted((m*m - n*n, 2*m*n))
+            triples.extend((k*a, k*b, k*c) for k in xrange(1, N // c + 1))
+        m += 1
+    triples.sort()
+    return triples
+
+
 @cnfformula.families.register_cnf_generator
 def RamseyLowerBoundFormula(s,k,N):
     """Formula claiming that Ramsey number r(s,k) > N
@@ -80,38 +115,146 @@ def RamseyLowerBoundFormula(s,k,N):
 
     ram=CNF()
 
-    ram.header=dedent("""\
-        CNF encoding of the claim that there is a graph of %d vertices
-        with no independent set of size %d and no clique of size %d
-        """ % (N,s,k)) + ram.header
+    ram.header=_ramsey_header(s,k,N) + ram.header
 
     #
     # One variable per edge (indices are ordered)
     #
     for edge in combinations(xrange(1,N+1),2):
         ram.add_variable('e_{{{0},{1}}}'.format(*edge))
-    
-    #
-    # No independent set of size s
-    #
-    for vertex_set in combinations(xrange(1,N+1),s):
-        clause=[]
-        for edge in combinations(vertex_set,2):
-            clause += [(True,'e_{{{0},{1}}}'.format(*edge))]
-        ram.add_clause(clause,strict=True)
 
     #
-    # No clique of size k
+    # No independent set of size s, and no clique of size k
     #
-    for vertex_set in combinations(xrange(1,N+1),k):
-        clause=[]
-        for edge in combinations(vertex_set,2):
-            clause+=[(False,'e_{{{0},{1}}}'.format(*edge))]
-        ram.add_clause(clause,strict=True)
-
+    ram._add_compressed_clauses(_ramsey_clauses(s,k,N))
+    ram._check_coherence(force=True)
     return ram
 
 
+def _ramsey_header(s,k,N):
+    return dedent("""\
+        CNF encoding of the claim that there is a graph of %d vertices
+        with no independent set of size %d and no clique of size %d
+        """ % (N,s,k))
+
+
+#
+# Clauses of the Ramsey formula, computed by rank
+#
+# The clauses of RamseyLowerBoundFormula are indexed by their rank: the
+# first binomial(N,s) clauses correspond to the s-subsets of vertices
+# in lexicographic order, the other binomial(N,k) correspond to the
+# k-subsets. Any range of ranks can be generated independently, which
+# allows to produce the formula in parallel shards.
+#
+
+def _ramsey_binomials(s,k,N):
+    """Binomial table for the clauses, and the number of clauses of each kind"""
+    binomials = _binomial_table(N,max(s,k,0))
+    count = lambda size: binomials[N][size] if size>=0 else 0
+    return binomials,count(s),count(k)
+
+
+def _next_subset(subset,n):
+    """Turn `subset` into its lexicographic successor among subsets of ``range(n)``
+
+    Returns False if `subset` is the last one.
+    """
+    k=len(subset)
+    i=k-1
+    while i>=0 and subset[i]==n-k+i:
+        i-=1
+    if i<0:
+        return False
+    subset[i]+=1
+    for j in xrange(i+1,k):
+        subset[j]=subset[j-1]+1
+    return True
+
+
+def _ramsey_clauses(s,k,N,start=0,stop=None):
+    """Clauses of RamseyLowerBoundFormula(s,k,N) of rank in `[start,stop)`
+
+    The clauses are generated in compressed form.
+    """
+    binomials,boundary,cliques = _ramsey_binomials(s,k,N)
+    total = boundary + cliques
+    if stop is None or stop>total:
+        stop=total
+
+    edge = _pair_index_table(N)
+    nedge = [[-e for e in row] for row in edge]
+
+    for size,table,first,last in [(s,edge,0,boundary),(k,nedge,boundary,total)]:
+
+        lo = max(start,first)
+        hi = min(stop,last)
+        if lo>=hi:
+            continue
+
+        subset = _unrank_subset(lo-first,N,size,binomials)
+        for _ in xrange(hi-lo):
+            yield tuple([table[a][b] for a,b in combinations(subset,2)])
+            _next_subset(subset,N)
+
+
+def _ramsey_dimacs_shard(arguments):
+    """DIMACS text of a range of clauses of RamseyLowerBoundFormula"""
+    s,k,N,start,stop = arguments
+    return "".join(["\n" + " ".join(map(str,cls+(0,)))
+                    for cls in _ramsey_clauses(s,k,N,start,stop)])
+
+
+def RamseyLowerBoundDimacs(s,k,N,output,
+                           export_header=True,extra_text=None,
+                           jobs=1,shard_size=100000):
+    """Write the DIMACS encoding of ``RamseyLowerBoundFormula(s,k,N)``
+
+    The formula is not stored in memory: its clauses are generated in
+    shards of consecutive ranks and written to `output` in the
+    canonical order, so that the output is identical to the one of
+    ``RamseyLowerBoundFormula(s,k,N).dimacs()``, followed by a
+    newline.
+
+    Arguments:
+    - `s`: independent set size
+    - `k`: clique size
+    - `N`: vertices
+    - `output`: file-like object
+    - `export_header`: output the formula header as comments
+    - `extra_text`: additional text attached to the header
+    - `jobs`: number of worker processes generating the shards
+      (at most ``2*jobs`` shards are pending at any time)
+    - `shard_size`: number of clauses in each shard
+    """
+    ram=CNF()
+    ram.header=_ramsey_header(s,k,N) + ram.header
+
+    n = N*(N-1)//2
+    _,independents,cliques = _ramsey_binomials(s,k,N)
+    m = independents + cliques
+    ram._dimacs_dump_header(output,n,m,export_header,extra_text)
+
+    shards = [(s,k,N,i,min(i+shard_size,m)) for i in xrange(0,m,shard_size)]
+
+    if jobs>1 and len(shards)>1:
+        from multiprocessing import Pool
+        pool = Pool(jobs)
+        try:
+            for text in _pool_imap(pool,_ramsey_dimacs_shard,shards,2*jobs):
+                output.write(text)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    else:
+        for shard in shards:
+            output.write(_ramsey_dimacs_shard(shard))
+
+    output.write("\n")
+
 
 ### Formula families
     
@@ -132,6 +275,9 @@ class RamseyCmdHelper(object):
         parser.add_argument('s',metavar='<s>',type=int,help="Forbidden independent set size")
         parser.add_argument('k',metavar='<k>',type=int,help="Forbidden independent clique")
         parser.add_argument('N',metavar='<N>',type=int,help="Graph size")
+        parser.add_argument('--jobs','-j',metavar='<jobs>',type=int,default=1,
+                            help="""Number of processes that generate the
+                            clauses of the DIMACS output (default: 1)""")
 
     @staticmethod
     def build_cnf(args):
@@ -142,6 +288,21 @@ class RamseyCmdHelper(object):
         """
         return RamseyLowerBoundFormula(args.s, args.k, args.N)
 
+    @staticmethod
+    def stream_dimacs(args, output, export_header, extra_text):
+        """Write the Ramsey formula in DIMACS format without storing it
+
+        Arguments:
+        - `args`: command line options
+        - `output`: output file
+        - `export_header`: output the formula header as comments
+        - `extra_text`: additional text attached to the header
+        """
+        RamseyLowerBoundDimacs(args.s, args.k, args.N, output,
+                               export_header=export_header,
+                               extra_text=extra_text,
+                               jobs=args.jobs)
+
 
 @cnfformula.cmdline.register_cnfgen_subcommand
 class PTNCmdHelper(object):
@@ -5,11 +5,14 @@
 
 import itertools
 import random
+from operator import mul, or_
 
-from cnfformula.cnf import CNF
+from cnfformula.cnf import CNF, _assignment_table
+from cnfformula.randomness import SeedStream, resolve_rng
 
 import cnfformula.cmdline
 import cnfformula.families
+from cnfformula.families import _pool_imap
 
 
 
@@ -31,20 +34,11 @@ list assignments.
     return True
 
 def sample_clauses(k, indices, m, planted_assignments):
-    clauses = set()
-    t = 0
-    while len(clauses)<m and t < 10*m:
-        t += 1
-
-        cls = tuple((random.choice([True,False]),'x_{0}'.format(i))
-                    for i in sorted(random.sample(indices,k)))
-
-        if clause_satisfied(cls,planted_assignments):
-            clauses.add(cls)
-        
-    if len(clauses)<m:
-        return sample_clauses_dense(k, indices, m, planted_assignments)
-    return clauses
+    names = ['x_{0}'.format(i) for i in indices]
+    varindex = dict((name,i) for i,name in enumerate(names,start=1))
+    planted = _planted_table(planted_assignments, varindex)
+    return set(tuple((l>0, names[abs(l)-1]) for l in cls)
+               for cls in _sample_compressed_clauses(k, len(indices), m, planted))
 
 def all_clauses(k, indices, planted_assignments):
     for domain in itertools.combinations(indices, k):
@@ -58,8 +52,191 @@ def all_clauses(k, indices, planted_assignments):
 def sample_clauses_dense(k, indices, m, planted_assignments):
     return random.sample(list(all_clauses(k, indices, planted_assignments)), m)
 
+
+#
+# Sampling of clauses in compressed form
+#
+# Clauses are tuples of non-zero integers over variables 1...n, and
+# the planted assignments are represented together as a table `T` of
+# length 2n+1 such that bit `j` of ``T[l]`` is 1 if and only if the
+# j-th assignment satisfies literal `l` (negative literals use
+# negative indexing), and ``T[0]`` has all the bits set (see
+# `cnfformula.cnf._assignment_table`). A clause is satisfied by all
+# the assignments when the bits of its literals cover ``T[0]``.
+#
+
+def _planted_table(planted_assignments, varindex):
+    """Table of the planted assignments, or None if there are none"""
+    planted_assignments = list(planted_assignments)
+    if len(planted_assignments)==0:
+        return None
+    return _assignment_table(planted_assignments, varindex)
+
+
+class _ClauseSampler(object):
+    """Sampler of blocks of random `k`-clauses over variables 1...n
+
+    The clauses in a block are not guaranteed to be distinct, but
+    are all satisfied by the `planted` assignments (represented as
+    a literal table, or None). Each clause is paired with an integer key that
+    packs its variables (base n+1) and its polarities (low k bits).
+    """
+    def __init__(self, k, n, planted):
+        self.k = k
+        self.n = n
+        self.weights = [(n+1)**i for i in xrange(k)]
+        if k <= 16:
+            self.polarities = [ _polarities(bits,k) for bits in xrange(2**k) ]
+        else:
+            self.polarities = _PolarityTable(k)
+        self.planted = planted
+
+    def block(self, size, rng):
+        """Sample `size` clauses with generator `rng`
+
+        Returns
+        -------
+        a list of pairs (key, clause)
+        """
+        k, n = self.k, self.n
+        rand = rng.random
+        getrandbits = rng.getrandbits
+
+        # sets of variables, obtained by rejecting repetitions
+        if k*k <= n:
+            draws = [int(n*rand())+1 for _ in xrange(size*k)]
+            subsets = [sorted(set(draws[i:i+k])) for i in xrange(0,size*k,k)]
+            for i in [i for i,vs in enumerate(subsets) if len(vs)<k]:
+                while len(subsets[i])<k:
+                    subsets[i] = sorted(set([int(n*rand())+1 for _ in xrange(k)]))
+        else:
+            subsets = [sorted(rng.sample(xrange(1,n+1),k)) for _ in xrange(size)]
+
+        signs = [getrandbits(k) for _ in xrange(size)]
+        weights = self.weights
+        polarities = self.polarities
+        packed = [(sum(map(mul, vs, weights)) << k) | bits
+                  for vs,bits in itertools.izip(subsets,signs)]
+        candidates = [tuple(map(mul, polarities[bits], vs))
+                      for vs,bits in itertools.izip(subsets,signs)]
+        sample = itertools.izip(packed,candidates)
+
+        if self.planted is not None:
+            lookup = self.planted.__getitem__
+            everyone = self.planted[0]
+            admissible = [reduce(or_, map(lookup, cls), 0) == everyone
+                          for cls in candidates]
+            sample = itertools.compress(sample,admissible)
+
+        return list(sample)
+
+
+# sampler used by the worker processes
+_worker_sampler = None
+
+def _init_worker(k, n, planted):
+    global _worker_sampler
+    _worker_sampler = _ClauseSampler(k, n, planted)
+
+def _worker_block(arguments):
+    stream, index, size = arguments
+    return _worker_sampler.block(size, stream.generator(index))
+
+def _sample_compressed_clauses(k, n, m, planted, rng=random, jobs=1, blocksize=2**16):
+    """Sample `m` distinct random `k`-clauses over variables 1...n
+
+    The clauses must be satisfied by all the `planted` assignments
+    (which are represented as a literal table, or None). Variables are drawn in
+    blocks, and the clauses are deduplicated through integer keys that
+    pack the variables and the polarities of each clause.
+
+    If `rng` is a :py:class:`cnfformula.randomness.SeedStream`, the
+    i-th block is drawn with the i-th generator of the stream, and the
+    blocks are computed by `jobs` processes. The result does not depend
+    on the number of processes.
+
+    If `m` clauses are not found within `10*m` attempts, then all
+    admissible clauses are enumerated and `m` of them are sampled.
+
+    Raises
+    ------
+    ValueError
+        when there are fewer than `m` admissible clauses
+    """
+    clauses = []
+    keys = set()
+
+    if k>0:
+        sizes = [ min(blocksize, 10*m-i) for i in xrange(0,10*m,blocksize) ]
+    else:
+        sizes = []
+
+    pool = None
+    try:
+        if not isinstance(rng, SeedStream):
+            sampler = _ClauseSampler(k, n, planted)
+            blocks = (sampler.block(size, rng) for size in sizes)
+        elif jobs>1 and len(sizes)>1:
+            from multiprocessing import Pool
+            pool = Pool(jobs, _init_worker, (k, n, planted))
+            # the consumer often stops long before the last block
+            blocks = _pool_imap(pool, _worker_block,
+                                ((rng, i, size) for i,size in enumerate(sizes)),
+                                2*jobs)
+        else:
+            sampler = _ClauseSampler(k, n, planted)
+            blocks = (sampler.block(size, rng.generator(i))
+                      for i,size in enumerate(sizes))
+
+        for block in blocks:
+            for key,cls in block:
+                if key in keys:
+                    continue
+                keys.add(key)
+                clauses.append(cls)
+                if len(clauses)==m:
+                    break
+            if len(clauses)==m:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    if len(clauses)<m:
+        if isinstance(rng, SeedStream):
+            rng = rng.generator('dense')
+        return _sample_compressed_clauses_dense(k, n, m, planted, rng)
+    return clauses
+
+
+def _polarities(bits,k):
+    """Signs of the literals of a clause, encoded in `bits`"""
+    return [ 1 if (bits >> i) & 1 else -1 for i in xrange(k) ]
+
+
+class _PolarityTable(object):
+    """Computes the signs of the literals on demand, for wide clauses"""
+    def __init__(self,k):
+        self.k = k
+
+    def __getitem__(self,bits):
+        return _polarities(bits,self.k)
+
+
+def _sample_compressed_clauses_dense(k, n, m, planted, rng=random):
+    """Sample `m` clauses among all admissible `k`-clauses over 1...n"""
+    admissible = []
+    for domain in itertools.combinations(xrange(1,n+1), k):
+        for polarity in itertools.product([1,-1], repeat=k):
+            cls = tuple([ p*v for p,v in zip(polarity,domain) ])
+            if planted is None or \
+               reduce(or_, [planted[l] for l in cls], 0) == planted[0]:
+                admissible.append(cls)
+    return rng.sample(admissible, m)
+
 @cnfformula.families.register_cnf_generator
-def RandomKCNF(k, n, m, seed=None, planted_assignments=[]):
+def RandomKCNF(k, n, m, seed=None, planted_assignments=[], rng=None, jobs=1):
     """Build a random k-CNF
 
     Sample :math:`m` clauses over :math:`n` variables, each of width
@@ -86,6 +263,17 @@ def RandomKCNF(k, n, m, seed=None, planted_assignments=[]):
        a set of total/partial assigments such that all clauses in the formula 
        will be satisfied by all of them.
 
+    rng : random.Random or SeedStream, optional
+       the source of randomness, used instead of the global random
+       generator (in that case `seed` is ignored). If it is a
+       :py:class:`cnfformula.randomness.SeedStream`, the clauses are
+       sampled in blocks, each with its own generator in the stream.
+
+    jobs : int, optional
+       number of processes that sample the blocks of clauses, when
+       `rng` is a SeedStream. The formula does not depend on this
+       value. (default: 1)
+
     Returns
     -------
     a CNF object
@@ -96,9 +284,7 @@ def RandomKCNF(k, n, m, seed=None, planted_assignments=[]):
         when some paramenter is negative, or when k>n.
 
     """
-    if seed:
-        random.seed(seed)
-
+    rng = resolve_rng(seed, rng)
 
     if n<0 or m<0 or k<0:
         raise ValueError("Parameters must be non-negatives.")
@@ -109,15 +295,17 @@ def RandomKCNF(k, n, m, seed=None, planted_assignments=[]):
     F = CNF()
     F.header = "Random {}-CNF over {} variables and {} clauses\n".format(k,n,m) + F.header
 
-    indices = xrange(1,n+1)
-    for i in indices:
+    for i in xrange(1,n+1):
         F.add_variable('x_{0}'.format(i))
+
+    planted = _planted_table(planted_assignments, F._name2index)
     try:
-        for clause in sample_clauses(k, indices, m, planted_assignments):
-            F.add_clause(list(clause), strict=True)
+        F._add_compressed_clauses(_sample_compressed_clauses(k, n, m, planted,
+                                                             rng=rng, jobs=jobs))
     except ValueError:
         raise ValueError("There are fewer clauses available than the number requested")
 
+    F._check_coherence(force=True)
     return F
 
 
@@ -138,6 +326,11 @@ class RandCmdHelper(object):
         parser.add_argument('k',metavar='<k>',type=int,help="clause width")
         parser.add_argument('n',metavar='<n>',type=int,help="number of variables")
         parser.add_argument('m',metavar='<m>',type=int,help="number of clauses")
+        parser.add_argument('--jobs','-j',metavar='<jobs>',type=int,default=None,
+                            help="""Sample the clauses in blocks, with independent
+                            random generators derived from the seed, using
+                            <jobs> processes. The formula depends only on the
+                            seed, not on the number of processes.""")
 
     @staticmethod
     def build_cnf(args):
@@ -146,4 +339,8 @@ class RandCmdHelper(object):
         Arguments:
         - `args`: command line options
         """
-        return RandomKCNF(args.k, args.n, args.m)
+        if args.jobs is None:
+            return RandomKCNF(args.k, args.n, args.m)
+        return RandomKCNF(args.k, args.n, args.m,
+                          rng=SeedStream(args.seed, 'randkcnf'),
+                          jobs=args.jobs)
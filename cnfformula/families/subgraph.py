@@ -11,8 +11,8 @@ import cnfformula.cmdline
 
 from itertools import combinations
 from itertools import product
-from itertools import permutations
 from cnfformula.graphs import enumerate_vertices
+from cnfformula.graphs import _split_vertex_pairs
 
 from math import log,ceil
 
@@ -22,7 +22,7 @@ from networkx  import empty_graph
 from textwrap import dedent
 
 @cnfformula.families.register_cnf_generator
-def SubgraphFormula(graph,templates, symmetric=False):
+def SubgraphFormula(graph,templates, symmetric=False, encoding='pairwise'):
     """Test whether a graph contains one of the templates.
 
     Given a graph :math:`G` and a sequence of template graphs
@@ -50,6 +50,10 @@ def SubgraphFormula(graph,templates, symmetric=False):
     induce: 
         force the subgraph to be induced (i.e. no additional edges are allowed)
 
+    encoding: 'pairwise' or 'auxiliary'
+        encoding of the mapping constraints, see
+        :py:class:`cnfformula.CNF.unary_mapping`. (default: 'pairwise')
+
 
     Returns
     -------
@@ -98,18 +102,18 @@ def SubgraphFormula(graph,templates, symmetric=False):
     if symmetric:
         mapping = F.unary_mapping(range(k),range(N),var_name=var_name,
                                   functional=True,injective=True,
-                                  nondecreasing=True)
+                                  nondecreasing=True,encoding=encoding)
     else:
         mapping = F.unary_mapping(range(k),range(N),var_name=var_name,
                                   functional=True,injective=True,
-                                  nondecreasing=False)
+                                  nondecreasing=False,encoding=encoding)
 
     for v in mapping.variables():
         F.add_variable( v )
 
-    for cls in mapping.clauses():
-        F.add_clause( cls, strict=True )
-        
+    F._add_compressed_clauses(F._compress_clause(cls)
+                              for cls in mapping.clauses())
+
     # The selectors choose a template subgraph.  A mapping must map
     # edges to edges and non-edges to non-edges for the active
     # template.
@@ -126,42 +130,39 @@ def SubgraphFormula(graph,templates, symmetric=False):
         activation_prefixes = [[(True,v)] for v in selectors]
 
 
-    # maps must preserve the structure of the template graph
-    gV = enumerate_vertices(graph)
+    # maps must preserve the structure of the template graph.  The
+    # pairs of vertices of the host graph are split once into edges
+    # and non-edges, and the variables S_{i,0},...,S_{i,N-1} have
+    # consecutive indices, so the clauses can be built directly in
+    # compressed form.
+    hostpairs = _split_vertex_pairs(graph, enumerate_vertices(graph), symmetric)
 
     for i in range(len(templates)):
 
         k  = templates[i].order()
         tV = enumerate_vertices(templates[i])
+        prefix = F._compress_clause(activation_prefixes[i])
 
-        if symmetric:
-            # Using non-decreasing map to represent a subset
-            localmaps = product(combinations(range(k),2),
-                                combinations(range(N),2))
-        else:
-            localmaps = product(combinations(range(k),2),
-                                permutations(range(N),2))
-       
+        for i1,i2 in combinations(range(k),2):
 
-        for (i1,i2),(j1,j2) in localmaps:
-
-            # check if this mapping is compatible
+            # template edges must not be mapped to host non-edges,
+            # and vice versa.
             tedge=templates[i].has_edge(tV[i1],tV[i2])
-            gedge=graph.has_edge(gV[j1],gV[j2])
-            if tedge == gedge:
+            J1,J2 = hostpairs[not tedge]
+            if len(J1)==0:
                 continue
 
-            # if it is not, add the corresponding
-            F.add_clause(activation_prefixes[i] + \
-                         [(False,var_name(i1,j1)),
-                          (False,var_name(i2,j2)) ],strict=True)
+            base1 = F._name2index[var_name(i1,0)]
+            base2 = F._name2index[var_name(i2,0)]
+            F._add_compressed_clauses(prefix + (-base1-j1,-base2-j2)
+                                      for j1,j2 in zip(J1,J2))
 
+    F._check_coherence(force=True)
     return F
 
 
-
 @cnfformula.families.register_cnf_generator
-def CliqueFormula(G,k):
+def CliqueFormula(G,k,encoding='pairwise'):
     """Test whether a graph has a k-clique.
 
     Given a graph :math:`G` and a non negative value :math:`k`, the
@@ -173,17 +174,20 @@ def CliqueFormula(G,k):
         a simple graph
     k : a non negative integer
         clique size
+    encoding: 'pairwise' or 'auxiliary'
+        encoding of the mapping constraints, see
+        :py:class:`cnfformula.CNF.unary_mapping`. (default: 'pairwise')
 
     Returns
     -------
     a CNF object
 
     """
-    return SubgraphFormula(G,[complete_graph(k)],symmetric=True)
+    return SubgraphFormula(G,[complete_graph(k)],symmetric=True,encoding=encoding)
 
 
 @cnfformula.families.register_cnf_generator
-def BinaryCliqueFormula(G,k):
+def BinaryCliqueFormula(G,k,encoding='pairwise'):
     """Test whether a graph has a k-clique.
 
     Given a graph :math:`G` and a non negative value :math:`k`, the
@@ -197,6 +201,9 @@ def BinaryCliqueFormula(G,k):
         a simple graph
     k : a non negative integer
         clique size
+    encoding: 'pairwise' or 'auxiliary'
+        encoding of the mapping constraints, see
+        :py:class:`cnfformula.CNF.binary_mapping`. (default: 'pairwise')
 
     Returns
     -------
@@ -208,7 +215,8 @@ def BinaryCliqueFormula(G,k):
     
     clauses_gen=F.binary_mapping(xrange(1,k+1), G.nodes(),
                                  injective = True,
-                                 nondecreasing = True)
+                                 nondecreasing = True,
+                                 encoding = encoding)
 
     for v in clauses_gen.variables():
         F.add_variable(v)
@@ -267,6 +275,11 @@ class KCliqueCmdHelper(object):
         """
         parser.add_argument('k',metavar='<k>',type=int,action='store',help="size of the clique to be found")
         SimpleGraphHelper.setup_command_line(parser)
+        parser.add_argument('--encoding',choices=['pairwise','auxiliary'],default='pairwise',
+                            help="""encoding of the injectivity and monotonicity
+                            constraints: 'auxiliary' uses sequential counters
+                            and an order encoding, and has linear size
+                            (default: pairwise)""")
 
 
     @staticmethod
@@ -277,7 +290,7 @@ class KCliqueCmdHelper(object):
         - `args`: command line options
         """
         G = SimpleGraphHelper.obtain_graph(args)
-        return CliqueFormula(G,args.k)
+        return CliqueFormula(G,args.k,encoding=args.encoding)
 
 
 @cnfformula.cmdline.register_cnfgen_subcommand
@@ -296,6 +309,11 @@ class BinaryKCliqueCmdHelper(object):
         """
         parser.add_argument('k',metavar='<k>',type=int,action='store',help="size of the clique to be found")
         SimpleGraphHelper.setup_command_line(parser)
+        parser.add_argument('--encoding',choices=['pairwise','auxiliary'],default='pairwise',
+                            help="""encoding of the injectivity and monotonicity
+                            constraints: 'auxiliary' uses sequential counters
+                            and an order encoding, and has linear size
+                            (default: pairwise)""")
 
 
     @staticmethod
@@ -306,7 +324,7 @@ class BinaryKCliqueCmdHelper(object):
         - `args`: command line options
         """
         G = SimpleGraphHelper.obtain_graph(args)
-        return BinaryCliqueFormula(G,args.k)
+        return BinaryCliqueFormula(G,args.k,encoding=args.encoding)
 
 @cnfformula.cmdline.register_cnfgen_subcommand
 class RWCmdHelper(object):
@@ -7,8 +7,8 @@ from cnfformula.cnf import CNF
 
 from cnfformula.cmdline import SimpleGraphHelper
 from cnfformula.graphs import enumerate_vertices,neighbors
+from cnfformula.randomness import SeedStream, resolve_rng
 
-import random
 import cnfformula.cmdline
 import cnfformula.families
 
@@ -53,6 +53,36 @@ def TseitinFormula(graph,charges=None):
     return tse
 
 
+def random_charges(n,parity=None,seed=None,rng=None):
+    """Random charges for the vertices of a Tseitin formula
+
+    Parameters
+    ----------
+    n : int
+        number of vertices
+    parity : int, optional
+        if given, the sum of the charges is equal to `parity` modulo 2
+    seed : hashable object
+        seed the random generator
+    rng : random.Random, optional
+        random generator to be used instead of the global one
+        (in that case `seed` is ignored)
+
+    Returns
+    -------
+    a list of `n` charges, each either 0 or 1
+    """
+    rng = resolve_rng(seed, rng)
+    if n<1:
+        return []
+    charges=[rng.randint(0,1) for _ in xrange(n-1)]
+    if parity is None:
+        charges.append(rng.randint(0,1))
+    else:
+        charges.append((parity - sum(charges)) % 2)
+    return charges
+
+
 @cnfformula.cmdline.register_cnfgen_subcommand
 class TseitinCmdHelper(object):
     """Command line helper for Tseitin  formulas
@@ -94,17 +124,10 @@ class TseitinCmdHelper(object):
             charge=[1]+[0]*(G.order()-1)
 
         else: # random vector
-            charge=[random.randint(0,1) for _ in xrange(G.order()-1)]
-
-            parity=sum(charge) % 2
-
-            if args.charge=='random':
-                charge.append(random.randint(0,1))
-            elif args.charge=='randomodd':
-                charge.append(1-parity)
-            elif args.charge=='randomeven':
-                charge.append(parity)
-            else:
+            parities={'random':None,'randomodd':1,'randomeven':0}
+            if args.charge not in parities:
                 raise ValueError('Illegal charge specification on command line')
+            rng=SeedStream(getattr(args,'seed',None),'tseitin').generator()
+            charge=random_charges(G.order(),parities[args.charge],rng=rng)
 
         return TseitinFormula(G,charge)
@@ -9,10 +9,12 @@ from __future__ import print_function
 
 __all__ = ["supported_formats",
            "readGraph","writeGraph",
-           "is_dag","has_bipartition","bipartite_sets",
+           "is_dag","check_topological_order","has_bipartition","bipartite_sets",
            "enumerate_vertices","enumerate_edges","neighbors",
+           "gnp_random_graph", "bipartite_random_graph",
            "bipartite_random_left_regular", "bipartite_random_regular",
-           "dag_complete_binary_tree", "dag_pyramid"]
+           "dag_complete_binary_tree", "dag_pyramid",
+           "GraphCache"]
 
 #################################################################
 #          Graph Decoders (first is default)
@@ -41,6 +43,13 @@ import io
 from io import StringIO
 import os
 
+from .randomness import resolve_rng
+
+from array import array
+from collections import OrderedDict
+from itertools import combinations,compress,product,repeat
+from math import log
+
 try:
     import networkx
     import networkx.algorithms
@@ -372,13 +381,137 @@ def writeGraph(G,output_file,graph_type,file_format='autodetect'):
         raise RuntimeError("[Internal error] Format {} not implemented".format(file_format))
 
 #
-# test for dag / with caching
+# test for dag / with certificates
 #
+_MUTATING_METHODS = ['add_node', 'add_nodes_from', 'remove_node', 'remove_nodes_from',
+                     'add_edge', 'add_edges_from', 'add_weighted_edges_from',
+                     'add_path', 'add_cycle', 'add_star',
+                     'remove_edge', 'remove_edges_from', 'clear', 'reverse']
+
+
+def _track_mutations(cls):
+    """Make the graph class count the modifications of its instances
+
+    Each method of `cls` that may change vertices or edges increases
+    the `_stamp` attribute of the graph. Modifications made directly
+    on the adjacency dictionaries are not tracked.
+    """
+    def stamped(method):
+        def wrapper(self, *args, **kwargs):
+            self._stamp += 1
+            return method(self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        return wrapper
+
+    cls._stamp = 0
+    for name in _MUTATING_METHODS:
+        setattr(cls, name, stamped(getattr(cls, name)))
+    return cls
+
+
+@_track_mutations
+class _StampedDiGraph(networkx.DiGraph):
+    """Directed graph whose verified properties can be cached"""
+    pass
+
+
+@_track_mutations
+class _StampedMultiDiGraph(networkx.MultiDiGraph):
+    """Directed multigraph whose verified properties can be cached"""
+    pass
+
+
+def _graph_state(graph):
+    """The vertex order of `graph` and its modification stamp
+
+    Returns None if the graph does not track its modifications.
+    """
+    stamp = getattr(graph, "_stamp", None)
+    if stamp is None:
+        return None
+    return (getattr(graph, "ordered_vertices", None), stamp)
+
+
+def _is_certified(graph, name):
+    """Test whether the certificate `name` of `graph` is still valid
+
+    A certificate is valid if the graph has not been modified since
+    it was issued, and if `ordered_vertices` is the same object.
+    """
+    certificate = getattr(graph, name, None)
+    state = _graph_state(graph)
+    return (certificate is not None and state is not None and
+            certificate[0] is state[0] and certificate[1] == state[1])
+
+
+def _certify(graph, name):
+    """Store the certificate `name` for the current state of `graph`"""
+    state = _graph_state(graph)
+    if state is not None:
+        setattr(graph, name, state)
+
+
+def check_topological_order(digraph, order):
+    """Test that `order` is a topological order of `digraph`
+
+    Checks in a single O(n+m) pass that `order` lists every vertex of
+    `digraph` exactly once, and that every edge goes forward with
+    respect to it. In particular a positive answer certifies that
+    `digraph` is acyclic.
+
+    Parameters
+    ----------
+    digraph : networkx.DiGraph
+        input graph
+
+    order : sequence
+        sequence of vertices
+
+    Returns
+    -------
+    bool
+
+    Examples
+    --------
+    >>> D = networkx.DiGraph([(1,2),(2,3),(1,3)])
+    >>> check_topological_order(D,[1,2,3])
+    True
+    >>> check_topological_order(D,[1,3,2])
+    False
+    >>> check_topological_order(D,[1,2])
+    False
+    """
+    position = {}
+    for i, v in enumerate(order):
+        if v not in digraph or v in position:
+            return False
+        position[v] = i
+
+    if len(position) != len(digraph):
+        return False
+
+    succ = digraph.succ
+    for v in order:
+        pv = position[v]
+        for w in succ[v]:
+            if position[w] <= pv:
+                return False
+    return True
+
+
 def is_dag(digraph):
     """Test is a directed graph is acyclic
 
     if the input graph has a member `topologically_sorted' then assumed that
     there is a member `ordered_vertices' and that it is a topological order.
+    This is verified with a single pass over the edges.
+
+    The graphs built by the DAG generators and readers of this module
+    track their modifications, and store a certificate once they are
+    verified to be acyclic: later calls are answered in constant time
+    until the graph changes or `ordered_vertices` is replaced. Edit
+    the graph with its methods, and assign a new sequence to
+    `ordered_vertices` instead of changing it in place.
 
     Arguments:
     - `digraph`: input graph
@@ -387,16 +520,21 @@ def is_dag(digraph):
     if not isinstance(digraph,(networkx.MultiDiGraph,networkx.DiGraph)):
         return False
 
+    elif _is_certified(digraph,"_dag_certificate"):
+        return True
+
     elif hasattr(digraph,"topologically_sorted"):
 
         assert hasattr(digraph,"ordered_vertices")
-        assert digraph.order()==len(digraph.ordered_vertices)
-        assert set(digraph.nodes())==set(digraph.ordered_vertices)
-        assert networkx.algorithms.is_directed_acyclic_graph(digraph)
-        return True
+        assert check_topological_order(digraph, digraph.ordered_vertices)
+        # a topological order lists each vertex exactly once
+        _certify(digraph,"_vertices_certificate")
 
-    else:
-        return networkx.algorithms.is_directed_acyclic_graph(digraph)
+    elif not networkx.algorithms.is_directed_acyclic_graph(digraph):
+        return False
+
+    _certify(digraph,"_dag_certificate")
+    return True
 
 
 def has_bipartition(G):
@@ -433,13 +571,19 @@ def bipartite_sets(G):
 def enumerate_vertices(graph):
     """Return the ordered list of vertices of `graph`
 
+    The consistency of `ordered_vertices` with the vertices of the
+    graph is checked once, for the graphs that track their
+    modifications (see :py:func:`is_dag`).
+
     Parameters
     ----------
     graph : input graph
     """
     if hasattr(graph,"ordered_vertices"):
-        assert graph.order()==len(graph.ordered_vertices)
-        assert set(graph.nodes())==set(graph.ordered_vertices)
+        if not _is_certified(graph,"_vertices_certificate"):
+            assert graph.order()==len(graph.ordered_vertices)
+            assert set(graph.nodes())==set(graph.ordered_vertices)
+            _certify(graph,"_vertices_certificate")
         return graph.ordered_vertices
     else:
         setattr(graph,"ordered_vertices",sorted(graph.nodes()))
@@ -460,6 +604,46 @@ def enumerate_edges(graph):
         return graph.ordered_edges
 
 
+def _split_vertex_pairs(graph, vertices, symmetric):
+    """Split the pairs of vertices of a graph into non-edges and edges
+
+    The pairs `(j1,j2)` of vertex positions are enumerated as in
+    ``combinations(range(N),2)`` if `symmetric` is true, and as in
+    ``permutations(range(N),2)`` otherwise.
+
+    Returns
+    -------
+    a pair `(nonedges,edges)`, where each element is a pair of
+    arrays `(J1,J2)` with the first and second positions of the
+    pairs of that kind, in enumeration order.
+    """
+    N = len(vertices)
+    position = dict((v,j) for j,v in enumerate(vertices))
+
+    nonedges = (array('l'),array('l'))
+    edges    = (array('l'),array('l'))
+
+    for j1,v in enumerate(vertices):
+
+        # adjacency row of the vertex, and its complement
+        row = bytearray(N)
+        for w in graph.adj[v]:
+            row[position[w]] = 1
+        row[j1] = 0
+        corow = row.translate(_complement_bits)
+        corow[j1] = 0
+
+        start = j1+1 if symmetric else 0
+        for (J1,J2),flags in [(edges,row),(nonedges,corow)]:
+            targets = list(compress(xrange(start,N),flags[start:]))
+            J1.extend(repeat(j1,len(targets)))
+            J2.extend(targets)
+
+    return nonedges,edges
+
+_complement_bits = bytearray([1]+[0]*255)
+
+
 def neighbors(graph,v):
     """Return the ordered list of neighbors ov a vertex
 
@@ -511,7 +695,9 @@ def _read_graph_kthlist_format(inputfile,graph_class=networkx.DiGraph, bipartiti
         raise ValueError("[Internal error] Attempt to use an unsupported class for graph representation.")
 
 
-    G=graph_class()
+    # directed graphs track their modifications (see is_dag)
+    G={networkx.DiGraph: _StampedDiGraph,
+       networkx.MultiDiGraph: _StampedMultiDiGraph}.get(graph_class,graph_class)()
     G.name=''
     G.ordered_vertices=[]
 
@@ -863,7 +1049,103 @@ def _write_graph_matrix_format(G,output_file):
 # Graph generator (missing from networkx)
 #
 
-def bipartite_random_left_regular(l,r,d,seed=None):
+def gnp_random_graph(n,p,seed=None,rng=None):
+    """Returns a random graph according to the :math:`G(n,p)` model
+
+    Each pair of vertices among :math:`0,\\ldots,n-1` is an edge with
+    probability `p`, independently. The graph is the same as the one
+    of ``networkx.gnp_random_graph`` when both use the same state of
+    the global random generator.
+
+    Parameters
+    ----------
+    n : int
+        number of vertices
+    p : float
+        probability of each edge
+    seed : hashable object
+        seed the random generator
+    rng : random.Random, optional
+        random generator to be used instead of the global one
+        (in that case `seed` is ignored)
+
+    Returns
+    -------
+    networkx.Graph
+    """
+    rng = resolve_rng(seed, rng)
+
+    G=networkx.Graph()
+    G.add_nodes_from(range(n))
+    G.name="gnp_random_graph({},{})".format(n,p)
+    if p<=0:
+        return G
+    if p>=1:
+        return networkx.complete_graph(n,create_using=G)
+
+    rand = rng.random
+    G.add_edges_from( e for e in combinations(range(n),2) if rand() < p )
+    return G
+
+
+def bipartite_random_graph(l,r,p,seed=None,rng=None):
+    """Returns a random bipartite graph with independent edges
+
+    Each pair of a vertex on the left side and a vertex on the right
+    side is an edge with probability `p`, independently. The graph is
+    the same as the one of ``networkx.bipartite.random_graph`` when
+    both use the same state of the global random generator.
+
+    Each vertex in the graph has an attribute `bipartite` which is 0
+    for the vertices on the left side and 1 for the vertices on the
+    right side.
+
+    Parameters
+    ----------
+    l : int
+        vertices on the left side
+    r : int
+        vertices on the right side
+    p : float
+        probability of each edge
+    seed : hashable object
+        seed the random generator
+    rng : random.Random, optional
+        random generator to be used instead of the global one
+        (in that case `seed` is ignored)
+
+    Returns
+    -------
+    networkx.Graph
+    """
+    rng = resolve_rng(seed, rng)
+
+    G=networkx.Graph()
+    G.name="fast_gnp_random_graph({},{},{})".format(l,r,p)
+    G.add_nodes_from(range(0,l),bipartite=0)
+    G.add_nodes_from(range(l,l+r),bipartite=1)
+    if p<=0:
+        return G
+    if p>=1:
+        G.add_edges_from(product(range(0,l),range(l,l+r)))
+        return G
+
+    # skip the non-edges with geometric jumps (Batagelj and Brandes)
+    lp = log(1.0 - p)
+    v = 0
+    w = -1
+    while v < l:
+        lr = log(1.0 - rng.random())
+        w = w + 1 + int(lr/lp)
+        while w >= r and v < l:
+            w = w - r
+            v = v + 1
+        if v < l:
+            G.add_edge(v, l+w)
+    return G
+
+
+def bipartite_random_left_regular(l,r,d,seed=None,rng=None):
     """Returns a random bipartite graph with constant left degree.
 
     Each vertex on the left side has `d` neighbors on the right side,
@@ -883,6 +1165,9 @@ def bipartite_random_left_regular(l,r,d,seed=None):
         degree on the left side.
     seed : hashable object
         seed the random generator
+    rng : random.Random, optional
+        random generator to be used instead of the global one
+        (in that case `seed` is ignored)
 
     Returns
     -------
@@ -894,9 +1179,7 @@ def bipartite_random_left_regular(l,r,d,seed=None):
         unless ``l``, ``r`` and ``d`` are non negative.
 
     """
-    import random
-    if seed:
-        random.seed(seed)
+    rng = resolve_rng(seed, rng)
 
     if l<0 or r<0 or d<0:
         raise ValueError("bipartite_random_left_regular(l,r,d) needs l,r,d >=0.")
@@ -915,7 +1198,7 @@ def bipartite_random_left_regular(l,r,d,seed=None):
         G.add_node(v,bipartite=1)
 
     for u in L:
-        for v in sorted(random.sample(R,d)):
+        for v in sorted(rng.sample(R,d)):
             G.add_edge(u,v)
 
     return G
@@ -980,7 +1263,7 @@ def bipartite_shift(N,M,pattern=[]):
     return G
 
 
-def bipartite_random_regular(l,r,d,seed=None):
+def bipartite_random_regular(l,r,d,seed=None,rng=None):
     """Returns a random bipartite graph with constant degree on both sides.
 
     The graph is d-regular on the left side and regular on the right
@@ -990,6 +1273,13 @@ def bipartite_random_regular(l,r,d,seed=None):
     for the vertices on the left side and 1 for the vertices on the
     right side.
 
+    The graph is sampled according to the configuration model: the
+    :math:`ld` edge endpoints on the left side are matched with
+    a random permutation of the :math:`ld` edge endpoints on the right
+    side. The repeated edges produced by the matching are then removed
+    by random edge switches, which preserve the degrees. The whole
+    process runs in time roughly linear in the number of edges.
+
     Parameters
     ----------
     l : int
@@ -1000,6 +1290,9 @@ def bipartite_random_regular(l,r,d,seed=None):
        degree of vertices at the left side
     seed : hashable object
        seed of random generator
+    rng : random.Random, optional
+       random generator to be used instead of the global one
+       (in that case `seed` is ignored)
 
     Returns
     -------
@@ -1008,18 +1301,18 @@ def bipartite_random_regular(l,r,d,seed=None):
     Raises
     ------
     ValueError
-        if one among ``l``, ``r`` and ``d`` is negative or
-        if ``r`` does not divides `l*d`
+        if one among ``l``, ``r`` and ``d`` is negative, or
+        if ``r`` does not divides `l*d`, or if ``d>r``.
 
     References
     ----------
-    [1] http://...
+    .. [1] B. Bollobas.
+           A probabilistic proof of an asymptotic formula for the number of labelled regular graphs.
+           European Journal of Combinatorics (1980)
 
     """
 
-    import random
-    if seed:
-        random.seed(seed)
+    rng = resolve_rng(seed, rng)
 
     if l<0 or r<0 or d<0:
         raise ValueError("bipartite_random_regular(l,r,d) needs l,r,d >=0.")
@@ -1027,6 +1320,9 @@ def bipartite_random_regular(l,r,d,seed=None):
     if (l*d) % r != 0:
         raise ValueError("bipartite_random_regular(l,r,d) needs r to divid l*d.")
 
+    if d > r:
+        raise ValueError("bipartite_random_regular(l,r,d) needs d <= r.")
+
     G=networkx.Graph()
     G.name = "bipartite_random_regular({},{},{})".format(l,r,d)
 
@@ -1039,87 +1335,318 @@ def bipartite_random_regular(l,r,d,seed=None):
     for v in R:
         G.add_node(v,bipartite=1)
 
-    A=L*d
-    B=R*(l*d / r)
+    A=[u for u in L for _ in xrange(d)]
+    B=R*(l*d // r)
     assert len(B)==l*d
 
-    for i in range(l*d):
-        # Sample an edge, do not add it if it existed
-        # We expect to sample at most d^2 edges
-        for retries in range(3*d*d):
-            ea=random.randint(i,l*d-1)
-            eb=random.randint(i,l*d-1)
-            if not G.has_edge(A[ea],B[eb]):
-                G.add_edge(A[ea],B[eb])
-                A[i],A[ea] = A[ea],A[i]
-                B[i],B[eb] = B[eb],B[i]
-                break
-        else:
-            # Sampling takes too long, maybe no good edge exists
-            failure=True
-            for ea in range(i,l*d):
-                for eb in range(i,l*d):
-                    if not G.has_edge(A[ea],B[eb]):
-                        failure=False
-                        break
-                if not failure:
-                    break
-            if failure:
-                return bipartite_random_regular(l,r,d)
+    while True:
+        rng.shuffle(B)
+        edges = _remove_multiple_edges(zip(A,B), rng)
+        if edges is not None:
+            break
 
+    G.add_edges_from(edges)
     return G
 
 
-def dag_pyramid(height):
+def _remove_multiple_edges(edges, rng, max_attempts=None):
+    """Turn a bipartite multigraph into a simple graph with the same degrees
+
+    Each repeated copy of an edge :math:`(u,v)` is switched with a
+    random edge :math:`(x,y)`, so that the two are replaced by
+    :math:`(u,y)` and :math:`(x,v)`, as long as the new edges are not
+    already present. Degrees are preserved by the switches.
+
+    Parameters
+    ----------
+    edges : list of pairs
+        the edges (with repetitions) of a bipartite graph, with the
+        left vertex as the first element of each pair.
+
+    rng : random.Random
+        random generator
+
+    max_attempts : int, optional
+        the maximum number of switch attempts, before giving up
+        (default: proportional to the number of edges)
+
+    Returns
+    -------
+    the list of edges of the simple graph, or None if the number of
+    attempts ran out.
+    """
+    multiplicity = {}
+    repeated = []
+    for i, e in enumerate(edges):
+        if e in multiplicity:
+            multiplicity[e] += 1
+            repeated.append(i)
+        else:
+            multiplicity[e] = 1
+
+    if max_attempts is None:
+        max_attempts = 100*len(edges)+100
+
+    for i in repeated:
+
+        while multiplicity[edges[i]] > 1:
+
+            if max_attempts <= 0:
+                return None
+            max_attempts -= 1
+
+            j = rng.randrange(len(edges))
+            u, v = edges[i]
+            x, y = edges[j]
+            if u == x or v == y or (u, y) in multiplicity or (x, v) in multiplicity:
+                continue
+
+            for e in [(u, v), (x, y)]:
+                multiplicity[e] -= 1
+                if multiplicity[e] == 0:
+                    del multiplicity[e]
+            multiplicity[(u, y)] = 1
+            multiplicity[(x, v)] = 1
+            edges[i] = (u, y)
+            edges[j] = (x, v)
+
+    return edges
+
+
+#
+# Large generated DAGs
+#
+class _NoAttributes(dict):
+    """Empty attribute dictionary shared by all vertices and edges
+
+    Large generated graphs use a single instance of this class as
+    the attribute dictionary of all their vertices and edges, instead
+    of an empty dictionary for each of them. Setting an attribute
+    raises `TypeError`.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("The vertices and edges of this graph have no attributes")
+
+    __setitem__ = __delitem__ = setdefault = pop = popitem = clear = _read_only
+
+    def update(self, *args, **kwargs):
+        if any(args) or kwargs:
+            self._read_only()
+
+_NO_ATTRIBUTES = _NoAttributes()
+
+
+def _attributeless_dag(name, vertices, edges):
+    """Topologically sorted DAG with no vertex and edge attributes
+
+    Parameters
+    ----------
+    name : str
+        name of the graph
+    vertices : list
+        the vertices, in topological order
+    edges : iterable
+        the edges, as pairs of positions in `vertices`, counting from 1
+    """
+    D=_StampedDiGraph()
+    D.name=name
+    for v in vertices:
+        D.node[v] = _NO_ATTRIBUTES
+        D.succ[v] = {}
+        D.pred[v] = {}
+    for u,v in edges:
+        u,v = vertices[u-1],vertices[v-1]
+        D.succ[u][v] = D.pred[v][u] = _NO_ATTRIBUTES
+    D.ordered_vertices = vertices
+    D.topologically_sorted = True
+    return D
+
+
+class _TreeVertex(int):
+    """Integer label of a complete binary tree vertex
+
+    The vertex is rendered as its name ``v_i`` only when it is
+    converted to a string.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return 'v_{}'.format(int(self))
+
+
+class _PyramidVertex(int):
+    """Integer label of a pyramid vertex
+
+    The vertex at position :math:`i` in layer :math:`h` is rendered as
+    its name ``x_{h,i}`` only when it is converted to a string. There
+    is a subclass for each height, see :py:func:`_pyramid_vertex`.
+    """
+    __slots__ = ()
+    height = None
+
+    def __str__(self):
+        return 'x_{{{},{}}}'.format(*_pyramid_rank(self.height,int(self)))
+
+    def __reduce__(self):
+        return (_pyramid_vertex, (self.height, int(self)))
+
+
+_pyramid_vertex_classes = {}
+
+def _pyramid_vertex(height, label):
+    """The vertex with integer `label` in the pyramid of given height"""
+    cls = _pyramid_vertex_classes.get(height)
+    if cls is None:
+        cls = type('_PyramidVertex', (_PyramidVertex,),
+                   {'__slots__': (), 'height': height})
+        _pyramid_vertex_classes[height] = cls
+    return cls(label)
+
+
+def _pyramid_rank(height, label):
+    """Layer and position of the vertex with integer `label` in the pyramid
+
+    >>> [_pyramid_rank(2,t) for t in range(1,7)]
+    [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (2, 0)]
+    """
+    # `d` is the depth of the layer, counting from the top vertex
+    r = (height+1)*(height+2)//2 - label
+    d = int(((8*r+1)**0.5 - 1)/2)
+    while d*(d+1)//2 > r:
+        d -= 1
+    while (d+1)*(d+2)//2 <= r:
+        d += 1
+    h = height - d
+    first = 1 + h*(height+1) - h*(h-1)//2
+    return (h, label - first)
+
+
+def dag_pyramid(height, integer_labels=False):
     """Generates the pyramid DAG
 
+    Vertices are indexed from the bottom layer, starting from index 0.
+    By default the vertex at position :math:`i` in layer :math:`h` is
+    named ``x_{h,i}`` and has the attribute ``rank=(h,i)``.
+
+    With ``integer_labels`` the vertices are the integers
+    :math:`1,\\ldots,n` listed layer by layer, from the bottom
+    layer. The vertex at position :math:`i` in layer :math:`h` is
+    then :math:`1 + i + \\sum_{j<h} (H-j+1)`, where :math:`H` is the
+    height. The vertices are rendered as ``x_{h,i}`` when converted to
+    strings, and the vertices and edges carry no attributes. This
+    representation is much faster to build and uses less memory,
+    which is significant for large pyramids.
+
+    In both cases the graph is marked as topologically sorted.
+
     Parameters
     ----------
     height : int
-        the height of the tree
+        the height of the pyramid
+
+    integer_labels : bool, optional
+        label vertices with consecutive integers (default: False)
 
     Returns
     -------
     networkx.DiGraph
+
+    Examples
+    --------
+    >>> D = dag_pyramid(2, integer_labels=True)
+    >>> list(D.ordered_vertices)
+    [1, 2, 3, 4, 5, 6]
+    >>> sorted(D.edges())
+    [(1, 4), (2, 4), (2, 5), (3, 5), (4, 6), (5, 6)]
+    >>> print(D.ordered_vertices[4])
+    x_{1,1}
     """
-    D=networkx.DiGraph()
-    D.name='Pyramid of height {}'.format(height)
-    D.ordered_vertices=[]
+    name='Pyramid of height {}'.format(height)
 
-    # vertices
-    X=[ [('x_{{{},{}}}'.format(h,i),h,i) for i in range(height-h+1)] \
-        for h in range(height+1) ]
+    if integer_labels:
+
+        n = (height+1)*(height+2)//2
+        vertices = [ _pyramid_vertex(height,t) for t in xrange(1,n+1) ]
+        return _attributeless_dag(name, vertices, _pyramid_edges(height))
+
+    D=_StampedDiGraph()
+    D.name=name
+
+    # vertices, in the same order of the integer labels
+    ranks=[ (h,i) for h in range(height+1) for i in range(height-h+1) ]
+    names=[ 'x_{{{},{}}}'.format(h,i) for (h,i) in ranks ]
 
-    for layer in X:
-        for (name,h,i) in layer:
-            D.add_node(name,rank=(h,i))
-            D.ordered_vertices.append(name)
+    D.add_nodes_from( (name,{'rank':rank}) for (name,rank) in zip(names,ranks) )
+    D.ordered_vertices=names
 
     # edges
-    for h in range(1,len(X)):
-        for i in range(len(X[h])):
-            D.add_edge(X[h-1][i][0]  ,X[h][i][0])
-            D.add_edge(X[h-1][i+1][0],X[h][i][0])
+    D.add_edges_from( (names[u-1],names[v-1]) for (u,v) in _pyramid_edges(height) )
 
+    D.topologically_sorted = True
     return D
 
-def dag_complete_binary_tree(height):
+def _pyramid_edges(height):
+    """Edges of the integer labelled pyramid of a given height"""
+    below = 1                   # first vertex of the layer below
+    for h in xrange(1,height+1):
+        width = height-h+1      # number of vertices in layer h
+        above = below + width + 1
+        for i in xrange(width):
+            yield (below+i,   above+i)
+            yield (below+i+1, above+i)
+        below = above
+
+def dag_complete_binary_tree(height, integer_labels=False):
     """Generates the complete binary tree DAG
 
+    The vertices are listed from the leaves to the root. By default
+    they are named ``v_1``, ``v_2``, ... With ``integer_labels`` they
+    are the integers :math:`1,2,\\ldots`, rendered as ``v_1``,
+    ``v_2``, ... when converted to strings. Vertices and edges carry
+    no attributes: the graph is faster to build and uses less memory.
+
+    In both cases the graph is marked as topologically sorted.
+
     Parameters
     ----------
     height : int
         the height of the tree
 
+    integer_labels : bool, optional
+        label vertices with consecutive integers (default: False)
+
     Returns
     -------
     networkx.DiGraph
+
+    Examples
+    --------
+    >>> D = dag_complete_binary_tree(1, integer_labels=True)
+    >>> list(D.ordered_vertices)
+    [1, 2, 3]
+    >>> sorted(D.edges())
+    [(1, 3), (2, 3)]
+    >>> print(D.ordered_vertices[2])
+    v_3
     """
-    D=networkx.DiGraph()
-    D.name='Complete binary tree of height {}'.format(height)
+    name='Complete binary tree of height {}'.format(height)
+
+    n = 2*(2**height) - 1
+
+    if integer_labels:
+
+        vertices = [ _TreeVertex(v) for v in xrange(1,n+1) ]
+        edges = ( (n-2*i-j, n-i) for i in xrange(n//2) for j in (1,2) )
+        return _attributeless_dag(name, vertices, edges)
+
+    D=_StampedDiGraph()
+    D.name=name
+
     D.ordered_vertices=[]
     # vertices
-    vert=['v_{}'.format(i) for i in range(1,2*(2**height))]
+    vert=['v_{}'.format(i) for i in range(1,n+1)]
     for w in vert:
         D.add_node(w)
         D.ordered_vertices.append(w)
@@ -1129,13 +1656,48 @@ def dag_complete_binary_tree(height):
         D.add_edge(vert[N-2*i-1],vert[N-i])
         D.add_edge(vert[N-2*i-2],vert[N-i])
 
+    D.topologically_sorted = True
     return D
 
-def sample_missing_edges(G,m, seed=None):
+def _pair_ranks(n):
+    """Lexicographic rank of the first pair of each row
+
+    The pairs :math:`(i,j)` with :math:`0 \\leq i < j < n` are ranked
+    as in ``itertools.combinations(range(n),2)``, so that the rank of
+    `(i,j)` is ``_pair_ranks(n)[i] + j - i - 1``.
+    """
+    return [ i*n - i*(i+1)//2 for i in xrange(n) ]
+
+
+def _pair_index_table(n):
+    """Table of the pair ranks, shifted by one
+
+    Entry `[i][j]`, for :math:`i<j`, is one plus the rank of the pair
+    `(i,j)` as in :py:func:`_pair_ranks`, which is the index of the
+    variable of the pair when there is one variable per pair. The
+    other entries are zero.
+
+    >>> _pair_index_table(3)
+    [[0, 1, 2], [0, 0, 3], [0, 0, 0]]
+    """
+    return [ [0]*(i+1) + range(start+1,start+n-i)
+             for i,start in enumerate(_pair_ranks(n)) ]
+
+
+def sample_missing_edges(G,m, seed=None, rng=None):
     """Sample m pairs of missing edges in G
 
     If :math:`G` is not complete and has at least :math:`m` missing edges, :math:`m` of them are sampled.
 
+    The pairs of vertices of :math:`G` (or the pairs in
+    :math:`L \\times R` if :math:`G` is bipartite) are ranked
+    lexicographically according to the order of the vertices. The
+    sampler picks :math:`m` distinct ranks among the missing edges,
+    and maps each of them to the corresponding pair by skipping the
+    ranks of the edges already in the graph. No retries are necessary,
+    and the memory used is proportional to the size of :math:`G` plus
+    :math:`m`.
+
     Parameters
     ----------
     G : networkx.Graph
@@ -1144,6 +1706,9 @@ def sample_missing_edges(G,m, seed=None):
        the number of missing edges to sample
     seed : hashable object
        seed of random generator
+    rng : random.Random, optional
+       random generator to be used instead of the global one
+       (in that case `seed` is ignored)
 
     Returns
     -------
@@ -1153,73 +1718,337 @@ def sample_missing_edges(G,m, seed=None):
     ------
     ValueError
         if :math:`G` doesn't have :math:`m` missing edges
-    RuntimeError
-        Sampling failure in the sparse case
-
 
+    Examples
+    --------
+    >>> G = networkx.complete_graph(5)
+    >>> G.remove_edges_from([(0,1),(2,4),(3,4)])
+    >>> sorted(tuple(sorted(e)) for e in sample_missing_edges(G,3))
+    [(0, 1), (2, 4), (3, 4)]
     """
 
-    import random
-    if seed:
-        random.seed(seed)
+    from bisect import bisect_right
 
-    from networkx import non_edges
+    rng = resolve_rng(seed, rng)
 
     if m < 0:
         raise ValueError("You can only sample a non negative number of edges.")
 
-
-    total_number_of_edges=None
-
     if has_bipartition(G):
 
         Left,Right = bipartite_sets(G)
-        total_number_of_edges = len(Left)*len(Right)
+        position = dict((v,i) for (i,v) in enumerate(Left))
+        position.update((v,i) for (i,v) in enumerate(Right))
+        width = len(Right)
+        total_number_of_edges = len(Left)*width
 
-        def edge_sampler():
-            u = random.sample(Left,1)[0]
-            v = random.sample(Right,1)[0]
-            return (u,v)
+        def rank(u,v):
+            if G.node[u]['bipartite'] in [1,'1']:
+                u,v = v,u
+            return position[u]*width + position[v]
 
-        def available_edges():
-            return [(u,v) for u in Left for v in Right if not G.has_edge(u,v)]
+        def unrank(t):
+            return (Left[t // width], Right[t % width])
+
+        edges = [ (u,v) for (u,v) in G.edges()
+                  if G.node[u]['bipartite'] != G.node[v]['bipartite'] ]
 
     else:
 
-        total_number_of_edges = G.order()*(G.order()-1)/2
+        V = sorted(G.nodes())
+        n = len(V)
+        position = dict((v,i) for (i,v) in enumerate(V))
+        total_number_of_edges = n*(n-1)//2
+
+        # pairs (i,j) with i<j are ranked lexicographically, and
+        # the first pair with i as the smaller element is at
+        # `row_start[i]`
+        row_start = _pair_ranks(n)
 
-        def edge_sampler():
-            return random.sample(G.nodes(),2)
+        def rank(u,v):
+            i,j = sorted((position[u],position[v]))
+            return row_start[i] + j - i - 1
 
-        def available_edges():
-            return list(non_edges(G))
+        def unrank(t):
+            i = bisect_right(row_start,t) - 1
+            return (V[i], V[t - row_start[i] + i + 1])
 
+        edges = [ (u,v) for (u,v) in G.edges() if u!=v ]
 
-    number_avaiable_edges = total_number_of_edges - G.number_of_edges()
+    # The k-th missing pair (counting from 0) has rank `k+s` where
+    # `s` is the number of existing edges of rank `t` at the i-th
+    # position in sorted order such that `t-i <= k`.
+    occupied = sorted(set(rank(u,v) for (u,v) in edges))
+    shifted  = [ t - i for (i,t) in enumerate(occupied) ]
+
+    number_avaiable_edges = total_number_of_edges - len(occupied)
 
     if number_avaiable_edges < m:
         raise ValueError("The graph does not have {} missing edges to sample.".format(m))
 
-    if G.number_of_edges() + m >=  total_number_of_edges / 2:
-        # Large density case: enumerate missing edges and sample.
-        return random.sample(available_edges(),m)
+    return [ unrank(k + bisect_right(shifted,k))
+             for k in rng.sample(xrange(number_avaiable_edges),m) ]
 
-    else:
-        # Sparse case: sample and retry
-        missing_edges=set()
 
-        for _ in xrange(100*m):
+#################################################################
+#          On-disk cache of generated graphs
+#################################################################
 
-            if len(missing_edges) >= m:
-                break
+# Graphs loaded from the cache, which keep the order of the stored ones
+class _OrderedGraph(networkx.Graph):
+    node_dict_factory    = OrderedDict
+    adjlist_dict_factory = OrderedDict
 
-            u,v = edge_sampler()
-            if (u,v) not in missing_edges and \
-               (v,u) not in missing_edges and \
-               not G.has_edge(u,v):
-                missing_edges.add( (u,v) )
+class _OrderedMultiGraph(networkx.MultiGraph):
+    node_dict_factory    = OrderedDict
+    adjlist_dict_factory = OrderedDict
 
-        if len(missing_edges) >= m:
-            return missing_edges
-        else:
-            raise RuntimeError("Improbable failure at sampling missing edges in a sparse graph.")
+class _OrderedDiGraph(_StampedDiGraph):
+    node_dict_factory    = OrderedDict
+    adjlist_dict_factory = OrderedDict
+
+class _OrderedMultiDiGraph(_StampedMultiDiGraph):
+    node_dict_factory    = OrderedDict
+    adjlist_dict_factory = OrderedDict
+
+
+class GraphCache(object):
+    """Content addressed on-disk cache for generated graphs
+
+    Graph constructions are stored in a directory, each one in a file
+    named after a digest of the generator name, its parameters, the
+    seed, the state of the random generator before the construction
+    and the versions of CNFgen and NetworkX. The graphs are stored as
+    compressed pickles of their node and adjacency lists.
+
+    The order of the vertices and of the adjacency lists determines
+    the formula built on the graph, but the order of the python
+    dictionaries of a graph depends on their whole insertion
+    history, and can't be rebuilt from their content. Therefore the
+    graphs are loaded with ordered dictionaries, filled in the
+    original order: a graph from the cache lists its vertices and
+    edges exactly as the graph that was stored.
+
+    The cache has a size limit: when a new graph is stored, the least
+    recently used entries are removed until the total size of the
+    cache is below the limit.
+
+    Parameters
+    ----------
+    directory : str
+        the directory that holds the cache. It is created if missing.
+
+    max_size : int, optional
+        maximum total size of the cache in bytes (default: 256MB)
+
+    Examples
+    --------
+    >>> import tempfile, shutil
+    >>> tmpdir = tempfile.mkdtemp()
+    >>> cache = GraphCache(tmpdir)
+    >>> key = cache.key('complete', (4,))
+    >>> cache.load(key) is None
+    True
+    >>> cache.store(key, networkx.complete_graph(4))
+    >>> G, state = cache.load(key)
+    >>> G.order(), G.size(), state
+    (4, 6, None)
+    >>> G = networkx.grid_graph([5,5])
+    >>> cache.store(key, G)
+    >>> H, _ = cache.load(key)
+    >>> H.nodes() == G.nodes() and H.edges() == G.edges()
+    True
+    >>> shutil.rmtree(tmpdir)
+    """
+
+    # (directed, multigraph) -> class of the loaded graphs
+    _graph_classes = {
+        (False, False) : _OrderedGraph,
+        (False, True)  : _OrderedMultiGraph,
+        (True, False)  : _OrderedDiGraph,
+        (True, True)   : _OrderedMultiDiGraph
+    }
+
+    suffix = '.graph'
+
+    def __init__(self, directory, max_size=256*2**20):
+        self.directory = directory
+        self.max_size  = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, generator, parameters, seed=None, random_state=None):
+        """Digest that identifies a graph construction
+
+        Parameters
+        ----------
+        generator : str
+            name of the graph construction
+
+        parameters : tuple
+            parameters of the construction
+
+        seed : str, optional
+            the seed of the random generator
+
+        random_state : object, optional
+            the state of the random generator before the construction
+            (as returned by ``random.getstate()``).
+        """
+        import hashlib
+        from .prjdata import __version__
+
+        digest = hashlib.sha1()
+        digest.update(repr((generator, tuple(parameters), seed,
+                            __version__, networkx.__version__)))
+        if random_state is not None:
+            digest.update(repr(random_state))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key):
+        """Load a graph from the cache
+
+        Returns
+        -------
+        a pair (G, random_state), where `random_state` is the state of
+        the random generator right after the construction of `G` (or
+        None if the construction is deterministic). If the graph is
+        not in the cache, the returned value is None.
+        """
+        import cPickle as pickle
+        import zlib
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cachefile:
+                data = pickle.loads(zlib.decompress(cachefile.read()))
+            G, random_state = self._decode(data)
+        except (IOError, OSError):
+            return None
+        except Exception:
+            # corrupted entry: drop it and regenerate the graph
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path, None)   # mark as recently used
+        except OSError:
+            pass
+
+        return G, random_state
+
+    def _decode(self, data):
+        """Rebuild a graph, in its original order, from its cache entry"""
+        grtype, graph_data, nodes, adjacency, predecessors, attributes, random_state = data
+
+        G = self._graph_classes[grtype]()
+        G.graph.update(graph_data)
+        G.node.update(nodes)
+        for u, neighbors in adjacency:
+            G.adj[u] = G.adjlist_dict_factory(neighbors)
+        for v, neighbors in predecessors:
+            G.pred[v] = G.adjlist_dict_factory(neighbors)
+        for name, value in attributes.items():
+            setattr(G, name, value)
+
+        return G, random_state
+
+    def store(self, key, G, random_state=None):
+        """Save a graph in the cache
+
+        Parameters
+        ----------
+        key : str
+            the key of the graph, as produced by :py:meth:`GraphCache.key`
+
+        G : networkx graph
+            the graph to be saved
+
+        random_state : object, optional
+            the state of the random generator right after the
+            construction of `G`
+        """
+        import cPickle as pickle
+
+        self._write(key, pickle.dumps(self._encode(G, random_state),
+                                      pickle.HIGHEST_PROTOCOL))
+
+    def store_and_load(self, key, G, random_state=None):
+        """Save a graph in the cache, and return its cached version
+
+        The result is the graph that :py:meth:`GraphCache.load` will
+        return for `key`, so that the constructions that miss the cache
+        behave exactly as the ones that hit it, even when the graph is
+        modified afterwards.
+        """
+        import cPickle as pickle
+
+        data = pickle.dumps(self._encode(G, random_state), pickle.HIGHEST_PROTOCOL)
+        self._write(key, data)
+        return self._decode(pickle.loads(data))
+
+    def _write(self, key, data):
+        import zlib
+        import tempfile
+
+        payload = zlib.compress(data)
+
+        # atomic write, so that concurrent runs never see partial entries
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmpfile:
+            tmpfile.write(payload)
+        os.rename(tmpname, self._path(key))
+
+        self.evict()
+
+    @staticmethod
+    def _encode(G, random_state):
+        """Cache entry of a graph, with the order of its vertices and edges"""
+        # graph properties cached as attributes
+        attributes = dict((name, getattr(G, name))
+                          for name in ['ordered_vertices', 'topologically_sorted']
+                          if hasattr(G, name))
+
+        # vertices and adjacency lists are stored in separate
+        # dictionaries, each one with its own order. They go in one
+        # pickle, so that the edge attributes stay shared.
+        data = ((G.is_directed(), G.is_multigraph()),
+                G.graph,
+                list(G.node.items()),
+                [(u, list(neighbors.items())) for u, neighbors in G.adj.items()],
+                [(v, list(neighbors.items())) for v, neighbors in G.pred.items()]
+                if G.is_directed() else [],
+                attributes,
+                random_state)
+
+        return data
+
+    def evict(self):
+        """Remove the least recently used graphs exceeding the size limit"""
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Sources of randomness for the random constructions
+
+By default the random formulas and graphs of the library use the
+global generator of module :py:mod:`random`, which the command line
+utility seeds with the value of ``--seed``. The outcome of each
+construction then depends on all the random choices made before it.
+
+A :py:class:`SeedStream` instead derives independent random
+generators from a seed and a sequence of labels. A construction can
+split its work into shards, and use a different generator for each
+shard: the result depends only on the seed, and not on the order in
+which the shards are computed, or on the number of processes that
+compute them.
+
+>>> s = SeedStream(42)
+>>> s.generator(3).random() == SeedStream(42).generator(3).random()
+True
+>>> s.generator(3).random() == s.generator(4).random()
+False
+>>> s.substream('a').generator(1).random() == s.generator('a',1).random()
+True
+"""
+
+import hashlib
+import os
+import random
+
+__all__ = ["SeedStream", "resolve_rng"]
+
+
+def _derive(key, labels):
+    """Digest of a key followed by a sequence of labels"""
+    digest = hashlib.sha256(key)
+    for label in labels:
+        label = str(label)
+        digest.update("{0}:{1}".format(len(label), label))
+    return digest.hexdigest()
+
+
+class SeedStream(object):
+    """Deterministic source of independent random generators
+
+    Parameters
+    ----------
+    seed : hashable object, optional
+        the seed of the stream. Seeds are compared through their
+        string representation. If no seed is given, a random one is
+        taken from the operating system.
+
+    labels : optional
+        further labels that identify the stream
+    """
+
+    def __init__(self, seed=None, *labels):
+        if seed is None:
+            seed = os.urandom(16).encode('hex')
+        self._seed = str(seed)
+        self._labels = tuple(str(label) for label in labels)
+
+    def substream(self, *labels):
+        """The stream identified by `labels` inside this one"""
+        return SeedStream(self._seed, *(self._labels + labels))
+
+    def generator(self, *labels):
+        """The random generator identified by `labels` in this stream
+
+        Returns
+        -------
+        random.Random
+        """
+        return random.Random(int(_derive(self._seed, self._labels + labels), 16))
+
+    def __eq__(self, other):
+        return (isinstance(other, SeedStream) and
+                (self._seed, self._labels) == (other._seed, other._labels))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self._seed, self._labels))
+
+
+def resolve_rng(seed=None, rng=None):
+    """The random generator to be used by a random construction
+
+    Parameters
+    ----------
+    seed : hashable object, optional
+        if `rng` is not given, the global generator of module
+        :py:mod:`random` is seeded with this value (unless it is
+        empty).
+
+    rng : random.Random, optional
+        an explicit random generator
+
+    Returns
+    -------
+    either `rng`, or the module :py:mod:`random` itself, which has
+    the same interface of a :py:class:`random.Random` object.
+    """
+    if rng is not None:
+        return rng
+    if seed:
+        random.seed(seed)
+    return random
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Asynchronous interface to the SAT solvers
+
+The functions in this module run the external SAT solvers as
+:py:mod:`asyncio` subprocesses, and return a future for the result
+instead of blocking. The formula is written to the solver
+incrementally, while the event loop keeps running, and the output is
+parsed as it arrives. Cancelling the future kills the solver.
+
+This requires :py:mod:`asyncio` (Python 3.4 or later). The module
+can be imported without it, but its functions raise `RuntimeError`.
+
+Examples
+--------
+>>> future = is_satisfiable_async(F, cmd='lingeling')  # doctest: +SKIP
+>>> result, witness = loop.run_until_complete(future)  # doctest: +SKIP
+"""
+
+from __future__ import print_function
+
+import os
+import tempfile
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+from .solver import _INTERFACE_NAME, _choose_satsolver, _satsolve_builtin
+from .solver import _WitnessParser, _witness, _dimacs_file
+
+__all__ = ["is_satisfiable_async"]
+
+
+def _dimacs_chunks(F, batch=4096):
+    """The dimacs encoding of F, as a sequence of strings
+
+    Each string contains at most `batch` clauses, so the encoding is
+    never built in memory all at once.
+    """
+    try:
+        from cStringIO import StringIO
+    except ImportError:
+        from io import StringIO
+
+    header = StringIO()
+    F._dimacs_dump_header(header, len(F._index2name)-1, len(F),
+                          export_header=False)
+    yield header.getvalue()
+
+    clauses = F._clauses
+    for start in range(0, len(clauses), batch):
+        yield "".join(["\n" + " ".join([str(l) for l in cls + (0,)])
+                       for cls in clauses[start:start+batch]])
+    yield "\n"
+
+
+if asyncio is not None:
+
+    class _SolverProtocol(asyncio.SubprocessProtocol):
+        """Feeds the formula to the solver and collects its output"""
+
+        def __init__(self, run, chunks):
+            self.run = run
+            self.chunks = chunks
+            self.paused = False
+            self.parser = _WitnessParser(len(run.F._index2name) - 1)
+            self.transport = None
+
+        def connection_made(self, transport):
+            self.transport = transport
+            self._feed()
+
+        def _feed(self):
+            stdin = self.transport.get_pipe_transport(0)
+            if stdin is None:
+                return
+            while self.chunks is not None and not self.paused:
+                try:
+                    chunk = next(self.chunks)
+                except StopIteration:
+                    self.chunks = None
+                    break
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode('ascii')
+                stdin.write(chunk)
+            if self.chunks is None:
+                stdin.close()
+
+        def pause_writing(self):
+            self.paused = True
+
+        def resume_writing(self):
+            # the pipe is still flushing its buffer, and must not be
+            # closed from inside this callback
+            self.paused = False
+            self.run.loop.call_soon(self._feed)
+
+        def pipe_data_received(self, fd, data):
+            if fd == 1:
+                self.parser.feed(data)
+
+        def pipe_connection_lost(self, fd, exc):
+            if fd == 0:
+                self.chunks = None  # the solver stopped reading
+
+        def connection_lost(self, exc):
+            self.parser.close()
+            self.run._finished(self.parser)
+            # the pipes are still shutting down at this point
+            self.run.loop.call_soon(self.transport.close)
+
+
+class _SolverRun(object):
+    """A run of a solver, whose outcome is `self.future`"""
+
+    def __init__(self, F, cmd, interface, loop=None, tmpdir=None):
+        if asyncio is None:
+            raise RuntimeError("Asynchronous solving requires 'asyncio'.")
+
+        self.F = F
+        self.cmd = cmd
+        self.interface = interface
+        self.loop = loop or asyncio.get_event_loop()
+        self.future = self.loop.create_future() \
+            if hasattr(self.loop, 'create_future') else asyncio.Future(loop=self.loop)
+        self.transport = None
+        self.satfile = None
+
+        args = cmd.split()
+        chunks = None
+        if interface == 'stdin/stdout':
+            chunks = _dimacs_chunks(F)
+        else:
+            args.append(_dimacs_file(F, tmpdir))
+        if interface == 'filein/fileout':
+            sat = tempfile.NamedTemporaryFile(suffix='.sat', dir=tmpdir,
+                                              delete=False)
+            self.satfile = sat.name
+            sat.close()
+            args.append(sat.name)
+
+        self.future.add_done_callback(self._future_done)
+
+        devnull = getattr(asyncio.subprocess, 'DEVNULL', None)
+        start = self.loop.subprocess_exec(
+            lambda: _SolverProtocol(self, chunks), *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=devnull)
+        self.starting = asyncio.ensure_future(start, loop=self.loop)
+        self.starting.add_done_callback(self._started)
+
+    def _started(self, starting):
+        if starting.cancelled():
+            return
+        if starting.exception() is not None:
+            if not self.future.done():
+                self.future.set_exception(RuntimeError(
+                    "Error during SAT solver call: {}.\n".format(self.cmd)))
+            return
+        self.transport, _ = starting.result()
+        if self.future.done():   # cancelled while starting
+            self._kill()
+
+    def _kill(self):
+        if self.transport is not None:
+            try:
+                self.transport.kill()
+            except OSError:
+                pass  # the solver already exited
+
+    def _future_done(self, future):
+        if future.cancelled():
+            if not self.starting.done():
+                self.starting.cancel()
+            self._kill()
+        self._cleanup()
+
+    def _cleanup(self):
+        if self.satfile is not None:
+            try:
+                os.unlink(self.satfile)
+            except OSError:
+                pass
+            self.satfile = None
+
+    def _finished(self, parser):
+        if self.future.done():
+            return
+        if self.interface == 'filein/fileout':
+            parser = _WitnessParser(len(self.F._index2name) - 1, minisat=True)
+            try:
+                parser.feed_file(self.satfile)
+            except (IOError, OSError):
+                parser.result = None
+
+        if parser.result is None:
+            self.future.set_exception(RuntimeError(
+                "Error during SAT solver call: {}.\n".format(self.cmd)))
+        else:
+            self.future.set_result((parser.result,
+                                    _witness(self.F, parser.result, parser.values)))
+
+
+def _satsolve_stdin_stdout_async(F, cmd='lingeling', loop=None, tmpdir=None):
+    """Asynchronous variant of `solver._satsolve_stdin_stdout`
+
+    Returns
+    -------
+    a future for the pair `(answer,witness)`
+    """
+    return _SolverRun(F, cmd, 'stdin/stdout', loop, tmpdir).future
+
+
+def _satsolve_filein_stdout_async(F, cmd='sat4j', loop=None, tmpdir=None):
+    """Asynchronous variant of `solver._satsolve_filein_stdout`
+
+    Returns
+    -------
+    a future for the pair `(answer,witness)`
+    """
+    return _SolverRun(F, cmd, 'filein/stdout', loop, tmpdir).future
+
+
+def _satsolve_filein_fileout_async(F, cmd='minisat', loop=None, tmpdir=None):
+    """Asynchronous variant of `solver._satsolve_filein_fileout`
+
+    Returns
+    -------
+    a future for the pair `(answer,witness)`
+    """
+    return _SolverRun(F, cmd, 'filein/fileout', loop, tmpdir).future
+
+
+def is_satisfiable_async(F, cmd=None, sameas=None, loop=None, tmpdir=None):
+    """Determines whether a CNF is satisfiable, without blocking.
+
+    This is the asynchronous variant of
+    :py:func:`cnfformula.utils.solver.is_satisfiable`, see there for
+    the meaning of `cmd` and `sameas`.
+
+    The ``builtin`` solver is used only when `cmd` asks for it. It
+    runs in a thread of the default executor of the loop, and it is
+    not stopped by cancellation.
+
+    Parameters
+    ----------
+    F: a CNF formula object
+
+    cmd: string,optional
+       the actual command line used to invoke the SAT solver
+
+    sameas: string, optional
+       use the interface of one of the supported solvers
+
+    loop: asyncio event loop, optional
+       the event loop that runs the solver (default: the current one).
+       Before Python 3.8 asyncio runs subprocesses only on the
+       current event loop of the main thread.
+
+    tmpdir: string, optional
+       directory for the temporary files (see `is_satisfiable`)
+
+    Returns
+    -------
+    an :py:class:`asyncio.Future` for the pair `(answer,witness)`.
+    The future raises `RuntimeError` if the solver fails. Cancelling
+    the future kills the solver.
+
+    Raises
+    ------
+    RuntimeError
+       if :py:mod:`asyncio` is not available, or if it is not possible
+       to find the solver needed.
+    ValueError
+       if `sameas` is set and does not match the name of a supported solver.
+    TypeError
+       if F is not a CNF object.
+    """
+    import cnfformula
+    if not isinstance(F, cnfformula.CNF):
+        raise TypeError("'F' is not a CNF formula object.")
+
+    if asyncio is None:
+        raise RuntimeError("Asynchronous solving requires 'asyncio'.")
+
+    solver_cmd, s_func = _choose_satsolver(cmd, sameas)
+    if s_func is _satsolve_builtin:
+        # runs in a thread, and cannot be killed
+        loop = loop or asyncio.get_event_loop()
+        return asyncio.ensure_future(
+            loop.run_in_executor(None, _satsolve_builtin, F), loop=loop)
+    return _SolverRun(F, solver_cmd, _INTERFACE_NAME[s_func], loop,
+                      tmpdir).future
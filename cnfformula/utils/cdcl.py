@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""A small CDCL SAT solver, written in pure python
+
+This solver is meant for the small formulas of tests and examples,
+where starting an external solver costs more than solving the
+formula. It is used by :py:func:`cnfformula.utils.solver.is_satisfiable`
+under the name ``builtin``.
+
+The solver works on the compressed representation of the clauses
+used by :py:class:`cnfformula.CNF`: variables are positive integers
+and a literal is either `v` or `-v`. It implements unit propagation
+with two watched literals, conflict analysis with first UIP learning,
+non chronological backjumping, the VSIDS decision heuristic with
+phase saving, and Luby restarts. The solver is incremental: clauses
+can be added between the calls to :py:meth:`CDCLSolver.solve`, and
+each call can fix some literals with assumptions.
+
+>>> s = CDCLSolver([[1, 2], [-1, 2], [1, -2]])
+>>> s.solve()
+True
+>>> s.model
+[1, 2]
+>>> s.solve(assumptions=[-2])
+False
+>>> s.add_clause([-1, -2])
+>>> s.solve()
+False
+
+Run as a script, the module is a solver process that speaks the line
+protocol of :py:class:`cnfformula.utils.solver.SolverSession`, and
+stands in for an incremental solver in tests and examples.
+"""
+
+import heapq
+import sys
+import time
+
+__all__ = ["CDCLSolver"]
+
+
+def _luby(i):
+    """The i-th element of the Luby sequence 1,1,2,1,1,2,4,1,...
+
+    >>> [_luby(i) for i in range(1, 16)]
+    [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class CDCLSolver(object):
+    """A conflict driven clause learning SAT solver
+
+    Parameters
+    ----------
+    clauses : iterable of sequences of int, optional
+        the initial clauses, in compressed form
+
+    nvars : int, optional
+        the number of variables. The solver has at least as many
+        variables as the largest one mentioned in the clauses.
+
+    Attributes
+    ----------
+    model : list of int
+        after a satisfiable call to :py:meth:`CDCLSolver.solve`, the
+        satisfying assignment as a list of literals, one for each
+        variable in increasing order.
+    """
+
+    restart_unit = 100
+
+    def __init__(self, clauses=(), nvars=0):
+        self.nvars = 0
+        self.ok = True          # False once the clauses are unsatisfiable
+        self.model = None
+
+        self._value = {}        # assigned literals: lit -> 1, -lit -> -1
+        self._level = [0]
+        self._reason = [None]
+        self._trail = []
+        self._trail_lim = []
+        self._qhead = 0
+        self._watches = {}
+
+        self._activity = [0.0]
+        self._var_inc = 1.0
+        self._polarity = [False]
+        self._heap = []
+
+        self._new_variables(nvars)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def _new_variables(self, nvars):
+        for v in range(self.nvars + 1, nvars + 1):
+            self._level.append(0)
+            self._reason.append(None)
+            self._activity.append(0.0)
+            self._polarity.append(False)
+            self._watches[v] = []
+            self._watches[-v] = []
+            heapq.heappush(self._heap, (0.0, v))
+        self.nvars = max(self.nvars, nvars)
+
+    def add_clause(self, clause):
+        """Add a clause to the formula
+
+        Parameters
+        ----------
+        clause : sequence of int
+            the literals of the clause
+        """
+        self._backtrack(0)
+        clause = set(clause)
+        if not clause:
+            self.ok = False
+            return
+        self._new_variables(max(abs(l) for l in clause))
+
+        value = self._value
+        if any(-l in clause or value.get(l) == 1 for l in clause):
+            return   # tautology, or already satisfied
+        clause = [l for l in clause if value.get(l) != -1]
+
+        if not self.ok:
+            return
+        if len(clause) == 0:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            if self._propagate() is not None:
+                self.ok = False
+        else:
+            self._watches[clause[0]].append(clause)
+            self._watches[clause[1]].append(clause)
+
+    def _enqueue(self, lit, reason):
+        v = abs(lit)
+        self._value[lit] = 1
+        self._value[-lit] = -1
+        self._level[v] = len(self._trail_lim)
+        self._reason[v] = reason
+        self._trail.append(lit)
+
+    def _propagate(self):
+        """Unit propagation on the watched literals
+
+        Returns
+        -------
+        the falsified clause in case of conflict, None otherwise.
+        """
+        value = self._value
+        watches = self._watches
+        trail = self._trail
+
+        while self._qhead < len(trail):
+            false_lit = -trail[self._qhead]
+            self._qhead += 1
+
+            watching = watches[false_lit]
+            watches[false_lit] = kept = []
+            for i, clause in enumerate(watching):
+                # the false literal goes in the second position
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if value.get(first) == 1:
+                    kept.append(clause)
+                    continue
+
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if value.get(lit) != -1:
+                        clause[1], clause[k] = lit, false_lit
+                        watches[lit].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value.get(first) == -1:
+                        kept.extend(watching[i+1:])
+                        self._qhead = len(trail)
+                        return clause
+                    self._enqueue(first, clause)
+        return None
+
+    def _analyze(self, conflict):
+        """First UIP conflict analysis
+
+        Returns
+        -------
+        a pair `(learnt,level)` with the learnt clause, whose first
+        literal is the asserting one, and the backjump level.
+        """
+        level = self._level
+        current = len(self._trail_lim)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        index = len(self._trail) - 1
+        lit = None
+        clause = conflict
+
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and level[v] > 0:
+                    seen.add(v)
+                    self._bump(v)
+                    if level[v] == current:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while abs(self._trail[index]) not in seen:
+                index -= 1
+            lit = self._trail[index]
+            index -= 1
+            clause = self._reason[abs(lit)]
+            seen.discard(abs(lit))
+            pending -= 1
+            if pending == 0:
+                break
+        learnt[0] = -lit
+
+        if len(learnt) == 1:
+            return learnt, 0
+        # the literal of highest level goes in the second position
+        best = max(range(1, len(learnt)), key=lambda i: level[abs(learnt[i])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, level[abs(learnt[1])]
+
+    def _bump(self, v):
+        self._activity[v] += self._var_inc
+        if self._activity[v] > 1e100:
+            self._activity = [a * 1e-100 for a in self._activity]
+            self._var_inc *= 1e-100
+            self._heap = [(-self._activity[u], u)
+                          for u in range(1, self.nvars + 1)]
+            heapq.heapify(self._heap)
+        else:
+            heapq.heappush(self._heap, (-self._activity[v], v))
+
+    def _backtrack(self, level):
+        if len(self._trail_lim) <= level:
+            return
+        start = self._trail_lim[level]
+        for lit in self._trail[start:]:
+            v = abs(lit)
+            del self._value[lit]
+            del self._value[-lit]
+            self._reason[v] = None
+            self._polarity[v] = lit > 0
+            heapq.heappush(self._heap, (-self._activity[v], v))
+        del self._trail[start:]
+        del self._trail_lim[level:]
+        self._qhead = len(self._trail)
+        if len(self._heap) > 4 * self.nvars + 64:
+            # too many stale entries
+            self._heap = [(-self._activity[u], u)
+                          for u in range(1, self.nvars + 1)
+                          if u not in self._value]
+            heapq.heapify(self._heap)
+
+    def _decision_variable(self):
+        heap = self._heap
+        while heap:
+            activity, v = heapq.heappop(heap)
+            if v not in self._value and -activity == self._activity[v]:
+                return v
+        for v in range(1, self.nvars + 1):   # stale heap
+            if v not in self._value:
+                return v
+        return None
+
+    def solve(self, assumptions=(), time_limit=None, conflict_limit=None):
+        """Decide whether the formula is satisfiable
+
+        Parameters
+        ----------
+        assumptions : sequence of int, optional
+            literals that are fixed to true for this call only
+
+        time_limit : float, optional
+            give up after this many seconds
+
+        conflict_limit : int, optional
+            give up after this many conflicts
+
+        Returns
+        -------
+        True if the formula is satisfiable under the assumptions,
+        False if it is not, and None if a limit is reached. If the
+        formula is satisfiable the assignment is in
+        :py:attr:`CDCLSolver.model`.
+        """
+        self.model = None
+        self._backtrack(0)
+        if not self.ok:
+            return False
+        if assumptions:
+            self._new_variables(max(abs(l) for l in assumptions))
+        if self._propagate() is not None:
+            self.ok = False
+            return False
+
+        deadline = None if time_limit is None else time.time() + time_limit
+        conflicts = 0
+        restarts = 1
+        budget = self.restart_unit * _luby(restarts)
+
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                conflicts += 1
+                if not self._trail_lim:
+                    self.ok = False
+                    return False
+                learnt, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self._watches[learnt[0]].append(learnt)
+                    self._watches[learnt[1]].append(learnt)
+                    self._enqueue(learnt[0], learnt)
+                self._var_inc /= 0.95
+                if conflicts == conflict_limit or \
+                   (deadline is not None and conflicts % 256 == 0
+                    and time.time() > deadline):
+                    self._backtrack(0)
+                    return None
+                continue
+
+            if conflicts >= budget:
+                restarts += 1
+                budget = conflicts + self.restart_unit * _luby(restarts)
+                self._backtrack(0)
+
+            # assumptions are the first decisions
+            lit = None
+            while len(self._trail_lim) < len(assumptions):
+                assumed = assumptions[len(self._trail_lim)]
+                if self._value.get(assumed) == -1:
+                    self._backtrack(0)
+                    return False
+                self._trail_lim.append(len(self._trail))
+                if assumed not in self._value:
+                    lit = assumed
+                    break
+
+            if lit is None:
+                v = self._decision_variable()
+                if v is None:
+                    self.model = [u if self._value[u] == 1 else -u
+                                  for u in range(1, self.nvars + 1)]
+                    self._backtrack(0)
+                    return True
+                self._trail_lim.append(len(self._trail))
+                lit = v if self._polarity[v] else -v
+            self._enqueue(lit, None)
+
+
+def _serve(input, output):
+    """Answer the queries of a solver session
+
+    Clauses are read in dimacs format. A line ``a <literals> 0`` asks
+    to solve the formula under the assumptions in the line, and the
+    answer is written in the style of the dimacs output conventions.
+    See :py:class:`cnfformula.utils.solver.SolverSession`.
+    """
+    solver = CDCLSolver()
+    clause = []
+    for line in iter(input.readline, ''):
+        tokens = line.split()
+        if len(tokens) == 0 or tokens[0] == 'c':
+            continue
+        elif tokens[0] == 'p':
+            solver._new_variables(int(tokens[2]))
+        elif tokens[0] == 'a':
+            if solver.solve([int(t) for t in tokens[1:] if t != '0']):
+                output.write("s SATISFIABLE\nv {} 0\n".format(
+                    " ".join([str(l) for l in solver.model])))
+            else:
+                output.write("s UNSATISFIABLE\n")
+            output.flush()
+        else:
+            for lit in map(int, tokens):
+                if lit == 0:
+                    solver.add_clause(clause)
+                    clause = []
+                else:
+                    clause.append(lit)
+
+
+if __name__ == '__main__':
+    _serve(sys.stdin, sys.stdout)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Thin client for the cnfgen server
+
+Running ``cnfgen --serve <socket>`` starts a server that listens on
+a local UNIX socket, with all the formula families and their command
+line parsers already loaded. This client sends it a cnfgen command
+line, and writes the formula produced on the standard output, as
+``cnfgen`` would do::
+
+  $ cnfgen --serve /tmp/cnfgen.sock &
+  $ cnfgenclient.py --socket /tmp/cnfgen.sock php 5 4
+
+The socket can also be given with the environment variable
+``CNFGEN_SOCKET``. The exit status and the error messages are the
+ones of ``cnfgen``. The standard input is forwarded to the server
+only if the command line reads from it. The environment variables
+read by ``cnfgen`` (i.e. ``CNFGEN_GRAPH_CACHE``) are the ones of the
+client, not the ones of the server.
+
+The client depends only on the standard library: run as a script it
+does not import :py:mod:`cnfformula`, and it starts in a few
+milliseconds.
+
+Protocol
+--------
+Client and server exchange frames made of a one byte tag, the length
+of the payload as a 4 bytes big endian integer, and the payload. The
+client sends its environment variables among `_FORWARDED_ENVIRONMENT`
+(tag ``V``, as ``name=value`` separated by NUL bytes) and the
+arguments (tag ``A``, separated by NUL bytes), and then the server sends the standard output (``O``) and error (``E``)
+of the command, and finally its exit status (``X``). When the command
+reads the standard input, the server asks for it (``R``) and the
+client sends its content (``I``), followed by an empty ``I`` frame.
+"""
+
+from __future__ import print_function
+
+import os
+import socket
+import struct
+import sys
+
+_HEADER = struct.Struct('!cI')
+_CHUNK_SIZE = 1 << 16
+_FORWARDED_ENVIRONMENT = ('CNFGEN_GRAPH_CACHE',)
+
+
+def _send(sock, tag, payload=b""):
+    """Send a frame on the socket"""
+    sock.sendall(_HEADER.pack(tag, len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    data = []
+    while size > 0:
+        chunk = sock.recv(min(size, _CHUNK_SIZE))
+        if not chunk:
+            return None
+        data.append(chunk)
+        size -= len(chunk)
+    return b"".join(data)
+
+
+def _recv(sock):
+    """Receive a frame from the socket
+
+    Returns
+    -------
+    a pair `(tag,payload)`, or `(None,None)` if the connection is
+    closed.
+    """
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None, None
+    tag, size = _HEADER.unpack(header)
+    payload = _recv_exactly(sock, size)
+    if payload is None:
+        return None, None
+    return tag, payload
+
+
+def command_line_utility(argv=sys.argv):
+    """Run a cnfgen command line on the cnfgen server
+
+    Parameters
+    ----------
+    argv: list, optional
+        the command line of the client. The socket is given either
+        with ``--socket <path>`` as first argument, or by the
+        environment variable ``CNFGEN_SOCKET``. The other arguments
+        are the ones of ``cnfgen``.
+
+    Returns
+    -------
+    the exit status of the command.
+    """
+    args = list(argv[1:])
+    address = os.environ.get('CNFGEN_SOCKET')
+    if len(args) >= 2 and args[0] == '--socket':
+        address = args[1]
+        args = args[2:]
+    if address is None:
+        print("Usage: {} [--socket <path>] <cnfgen arguments>".format(
+            os.path.basename(argv[0])), file=sys.stderr)
+        return os.EX_USAGE
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+    except socket.error as e:
+        print("Cannot connect to the cnfgen server on '{}': {}".format(address, e),
+              file=sys.stderr)
+        return os.EX_UNAVAILABLE
+
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    stderr = getattr(sys.stderr, 'buffer', sys.stderr)
+    def encode(s):
+        return s.encode('utf-8') if not isinstance(s, bytes) else s
+
+    try:
+        _send(sock, b'V', b"\0".join([encode(name + '=' + os.environ[name])
+                                      for name in _FORWARDED_ENVIRONMENT
+                                      if name in os.environ]))
+        _send(sock, b'A', b"\0".join([encode(a) for a in args]))
+        while True:
+            tag, payload = _recv(sock)
+            if tag == b'O':
+                stdout.write(payload)
+            elif tag == b'E':
+                stderr.write(payload)
+                stderr.flush()
+            elif tag == b'R':
+                fd = sys.stdin.fileno()
+                for chunk in iter(lambda: os.read(fd, _CHUNK_SIZE), b""):
+                    _send(sock, b'I', chunk)
+                _send(sock, b'I')
+            elif tag == b'X':
+                stdout.flush()
+                return struct.unpack('!i', payload)[0]
+            else:
+                print("The cnfgen server closed the connection.", file=sys.stderr)
+                return os.EX_UNAVAILABLE
+    finally:
+        sock.close()
+
+
+### Launcher
+if __name__ == '__main__':
+    sys.exit(command_line_utility(sys.argv))
@@ -11,11 +11,365 @@ solvers, see
 
 from __future__ import print_function
 import sys
+import os
+import atexit
+import tempfile
+import threading
+import weakref
+from array import array
+from collections import namedtuple
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from distutils.spawn import find_executable
+
+__all__ = ["supported_satsolvers", "is_satisfiable", "have_satsolver",
+           "satsolver_registry", "solve_many", "ResultCache", "Witness",
+           "SolverSession", "BUILTIN_SOLVER_THRESHOLD", "BUILTIN_SOLVER_CONFLICTS"]
+
+# Formulas with at most this many clauses are solved by the builtin
+# solver, when no solver is specified. Set it to 0 to always use an
+# external solver.
+BUILTIN_SOLVER_THRESHOLD = 3000
+
+# Conflicts allowed to the builtin solver before it hands the formula
+# to an external solver, if there is one.
+BUILTIN_SOLVER_CONFLICTS = 1000
+
+
+def _parse_minisat_output(foutput):
+    """Parse the output file of a minisat-style solver
+
+    The content of the file is either "UNSAT", or "SAT" followed by
+    the literals of the assignment, e.g. "SAT -1 2 3 -4 -5 0".
 
-__all__ = ["supported_satsolvers", "is_satisfiable", "have_satsolver"]
+    Returns
+    -------
+    a pair `(result,literals)`, where `result` is None if the output
+    is not valid.
+    """
+    tokens = foutput.split()
+    if len(tokens) == 0:
+        return (None, [])
+    elif tokens[0] == 'SAT':
+        return (True, [int(v) for v in tokens[1:] if v != '0'])
+    elif tokens[0] == 'UNSAT':
+        return (False, [])
+    else:
+        return (None, [])
+
+
+# Size of the chunks of solver output parsed at once
+_CHUNK_SIZE = 1 << 16
+
+
+def _assign(values, literals):
+    """Record the literals of an assignment in an array of values
+
+    Entry `i` of `values` becomes 1 if `i` is among the literals, and
+    -1 if `-i` is. Literals on variables outside the array are ignored.
+    """
+    n = len(values)
+    for lit in literals:
+        if 0 < lit < n:
+            values[lit] = 1
+        elif 0 < -lit < n:
+            values[-lit] = -1
+
+
+class _WitnessParser(object):
+    """Parse the solution printed by a solver, as it arrives
+
+    The output is fed in chunks of any size, and the values of the
+    variables are kept in a compact array with one byte per variable:
+    ``values[i]`` is 1 if variable `i` is true, -1 if it is false, and
+    0 if the solver did not assign it. For example the output::
+
+      s SATISFIABLE
+      v -1 2 -3
+      v 4 0
+
+    gives ``result == True`` and ``list(values) == [0,-1,1,-1,1]``.
+
+    Parameters
+    ----------
+    nvars : int
+        the number of variables of the formula
+
+    minisat : bool, optional
+        parse the output file of a minisat-style solver (see
+        `_parse_minisat_output`) instead of an output which follows
+        the dimacs conventions.
+
+    Attributes
+    ----------
+    result : bool or None
+        whether the solver found the formula satisfiable, or None if
+        the output has no valid solution line (yet).
+    """
+
+    def __init__(self, nvars, minisat=False):
+        self.result = None
+        self.values = array('b', [0]) * (nvars + 1)
+        self._minisat = minisat
+        self._started = False
+        self._partial = b""
+
+    def feed(self, data):
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._parse_line(line)
+
+    def close(self):
+        self._parse_line(self._partial)
+        self._partial = b""
+
+    def feed_file(self, path):
+        """Parse a whole output file"""
+        with open(path, 'rb') as output:
+            for chunk in iter(lambda: output.read(_CHUNK_SIZE), b""):
+                self.feed(chunk)
+        self.close()
+
+    def _parse_line(self, line):
+        tokens = line.split()
+        if len(tokens) == 0:
+            return
+
+        if self._minisat:
+            if not self._started:
+                self._started = True
+                self.result = {b'SAT': True, b'UNSAT': False}.get(tokens.pop(0))
+            if self.result:
+                _assign(self.values, [int(el) for el in tokens])
+        elif tokens[0] == b's' and len(tokens) > 1:
+            if tokens[1] == b'SATISFIABLE':
+                self.result = True
+            elif tokens[1] == b'UNSATISFIABLE':
+                self.result = False
+            else:
+                self.result = None
+        elif tokens[0] == b'v':
+            _assign(self.values, [int(el) for el in tokens[1:]])
+
+
+class Witness(Mapping):
+    """A satisfying assignment found by a SAT solver
+
+    The witness is a read-only mapping from the names of the variables
+    of a formula to their truth values. The values are kept in a
+    compact array indexed by variables, with one byte per variable,
+    and the names are looked up only when the witness is accessed.
+    Variables not assigned by the solver are not in the mapping.
+
+    Parameters
+    ----------
+    F : CNF
+        the formula solved
+
+    values : array
+        entry `i` is 1 if the variable of index `i` is true, -1 if it
+        is false, and 0 if it is not assigned.
+
+    Examples
+    --------
+    >>> from cnfformula import CNF
+    >>> F = CNF([[(True, 'x'), (False, 'y')]])
+    >>> w = Witness(F, array('b', [0, -1, 1]))
+    >>> w['y'], len(w), w == {'x': False, 'y': True}
+    (True, 2, True)
+    >>> list(w.literals())
+    [-1, 2]
+    """
+
+    def __init__(self, F, values):
+        self._index2name = F._index2name
+        self._name2index = F._name2index
+        self._values = values
+
+    def __getitem__(self, name):
+        index = self._name2index[name]
+        if index < len(self._values) and self._values[index] != 0:
+            return self._values[index] > 0
+        raise KeyError(name)
+
+    def __iter__(self):
+        names = self._index2name
+        for index, value in enumerate(self._values):
+            if value != 0:
+                yield names[index]
+
+    def __len__(self):
+        return len(self._values) - self._values.count(0)
+
+    def iteritems(self):
+        names = self._index2name
+        for index, value in enumerate(self._values):
+            if value != 0:
+                yield names[index], value > 0
+
+    def items(self):
+        return list(self.iteritems())
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+    def literals(self):
+        """The assignment as an array of literals
+
+        Returns
+        -------
+        an array of int, with one literal for each assigned variable,
+        in increasing order of variables.
+        """
+        return array('i', [index if value > 0 else -index
+                           for index, value in enumerate(self._values)
+                           if value != 0])
+
+
+def _witness(F, result, values):
+    """The witness of a solution, from the values of its variables
+
+    Returns
+    -------
+    a `Witness` for F, or None if the formula is not satisfiable.
+    """
+    witness = Witness(F, values)
+    return result and witness or None
+
+
+def _literal_values(F, literals):
+    """The compact array of values of a list of literals on F"""
+    values = array('b', [0]) * len(F._index2name)
+    _assign(values, literals)
+    return values
+
+
+def _write_dimacs(F, output):
+    """Write the dimacs encoding of F on a file-like object"""
+    F._dimacs_dump_clauses(output, export_header=False)
+    output.write("\n")
+
+
+def _communicate(p, F=None, parser=None, verbose=0):
+    """Send a formula to a solver process and parse its output
+
+    The dimacs encoding of F is written to the standard input of the
+    solver by a separate thread, while this one feeds the solver
+    output to `parser` as it arrives, so neither the encoding nor the
+    output are ever kept in memory. If F is None the standard input
+    is just closed. With `verbose` at least 2 the output is copied on
+    the standard error.
+    """
+    errors = []
+
+    def feed():
+        try:
+            if F is not None:
+                _write_dimacs(F, p.stdin)
+        except (IOError, OSError):
+            pass  # the solver stopped reading
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            try:
+                p.stdin.close()
+            except (IOError, OSError):
+                pass
+
+    writer = threading.Thread(target=feed)
+    writer.daemon = True
+    writer.start()
+    for chunk in iter(lambda: p.stdout.read(_CHUNK_SIZE), b""):
+        if parser is not None:
+            parser.feed(chunk)
+        if verbose >= 2:
+            getattr(sys.stderr, 'buffer', sys.stderr).write(chunk)
+    if parser is not None:
+        parser.close()
+    p.wait()
+    writer.join()
+    if errors:
+        raise errors[0]
+
+
+# Temporary files with the dimacs encoding of the formulas, indexed by
+# the id of the formula, so that repeated solver runs on the same
+# formula do not write it again.
+_dimacs_files = {}
+_dimacs_files_lock = threading.RLock()
+
+
+def _remove_file(filename):
+    try:
+        os.unlink(filename)
+    except OSError:
+        pass
+
+
+def _dimacs_file(F, tmpdir=None):
+    """Name of a temporary file with the dimacs encoding of F
+
+    The file is written the first time, and it is reused until
+    clauses or variables are added to F. It is removed when F is
+    garbage collected, or at exit.
+
+    Parameters
+    ----------
+    F : a CNF formula
+
+    tmpdir : string, optional
+        the directory of the file, e.g. a `tmpfs` mount point. By
+        default it is the directory chosen by :py:mod:`tempfile`
+        (see the ``TMPDIR`` environment variable).
+    """
+    key = id(F)
+    state = (id(F._clauses), len(F._index2name), len(F._clauses), tmpdir)
 
+    with _dimacs_files_lock:
+        entry = _dimacs_files.get(key)
+        if entry is not None and entry[0]() is F and entry[1] == state:
+            return entry[2]
 
-def _satsolve_filein_fileout(F, cmd='minisat',verbose=0):
+    fd, filename = tempfile.mkstemp(suffix='.cnf', dir=tmpdir)
+    try:
+        with os.fdopen(fd, 'w') as cnf:
+            _write_dimacs(F, cnf)
+    except:
+        _remove_file(filename)
+        raise
+
+    def forget(ref):
+        with _dimacs_files_lock:
+            if key in _dimacs_files and _dimacs_files[key][0] is ref:
+                _remove_file(_dimacs_files.pop(key)[2])
+
+    with _dimacs_files_lock:
+        entry = _dimacs_files.get(key)
+        if entry is not None and entry[0]() is F and entry[1] == state:
+            _remove_file(filename)   # written concurrently by another thread
+            return entry[2]
+        if entry is not None:
+            _remove_file(entry[2])
+        _dimacs_files[key] = (weakref.ref(F, forget), state, filename)
+        return filename
+
+
+@atexit.register
+def _remove_dimacs_files():
+    with _dimacs_files_lock:
+        for entry in _dimacs_files.values():
+            _remove_file(entry[2])
+        _dimacs_files.clear()
+
+
+def _satsolve_filein_fileout(F, cmd='minisat',verbose=0,tmpdir=None):
     """Test CNF satisfiability using a minisat-style solver.
 
     This also works fine using `glucose` instead of `minisat`, or any
@@ -32,6 +386,9 @@ def _satsolve_filein_fileout(F, cmd='minisat',verbose=0):
        0 or less means no output. 1 shows the command line actually
        run. 2 outputs the solver output. (default: 0)
 
+    tmpdir: string, optional
+       directory for the temporary files (see `_dimacs_file`)
+
     Examples:
     ---------
     _satsolve_filein_fileout(F,cmd='minisat -no-pre')
@@ -45,7 +402,7 @@ def _satsolve_filein_fileout(F, cmd='minisat',verbose=0):
     --------
     A pair (answer,witness) where answer is either True when F is
     satisfiable, or False otherwise. If F is satisfiable the witness
-    is a satisfiable assignment in form of a dictionary, otherwise it
+    is a satisfiable assignment in form of a `Witness`, otherwise it
     is None.
 
 
@@ -58,75 +415,46 @@ def _satsolve_filein_fileout(F, cmd='minisat',verbose=0):
     """
 
     import subprocess
-    import os
-    import tempfile
 
     # Minisat does not operate on stdin/stdout so we need temporary
     # files
-    cnf = tempfile.NamedTemporaryFile(delete=False)
-    sat = tempfile.NamedTemporaryFile(delete=False)
-    cnf.write(F.dimacs())
-    cnf.close()
+    cnf = _dimacs_file(F, tmpdir)
+    sat = tempfile.NamedTemporaryFile(suffix='.sat', dir=tmpdir, delete=False)
     sat.close()
 
-    output = None
+    parser = _WitnessParser(len(F._index2name) - 1, minisat=True)
 
-    # Run the command, store its output and remove the temporary files.
+    # Run the command, parse its output and remove the temporary files.
     try:
 
-        final_command = cmd + " " + cnf.name + " " +sat.name
+        final_command = cmd + " " + cnf + " " +sat.name
 
         if verbose >=1:
             print("$ "+final_command,file=sys.stderr)
 
-        p = subprocess.Popen(args=cmd.split()+[cnf.name, sat.name],
+        p = subprocess.Popen(args=cmd.split()+[cnf, sat.name],
+                         bufsize=-1,
                          stdin=subprocess.PIPE,
                          stdout=subprocess.PIPE)
-        (output,_) = p.communicate()
-        sat     = open(sat.name, "r")
-        foutput = sat.read().split()
-        sat.close()
-    except OSError:
+        _communicate(p, verbose=verbose)
+
+        # The output file is either "UNSAT" or of the form "SAT v1
+        # v2 ... vn" where each "vi" is either "-i" or "i", to
+        # indicate that the i-th variables is assigned to false and
+        # true, respectively.
+        parser.feed_file(sat.name)
+    except (IOError, OSError):
         pass
     finally:
-        os.unlink(cnf.name)
         os.unlink(sat.name)
 
-    # At this point `output` is either the list ["UNSAT"] or a list of
-    # the form ["SAT","v1","v2",...,"vn"] where each "vi" is either
-    # "-i" or "i", to indicate that the i-th variables is assigned to
-    # false and true, respectively.
-    #
-    result = None
-    witness = None
-
-    if verbose>=2:
-        print(output,file=sys.stderr)
-        
-    if len(foutput) == 0:
-
-        raise RuntimeError("Error during SAT solver call: {}.\n".format(" ".join([cmd,cnf.name, sat.name])))
-
-    elif foutput[0] == 'SAT':
-
-        result = True
-
-        witness = [int(v) for v in foutput[1:] if v != '0']
+    if parser.result is None:
+        raise RuntimeError("Error during SAT solver call: {}.\n".format(" ".join([cmd,cnf, sat.name])))
 
-        witness = {F._index2name[abs(v)]: v > 0 for v in witness}
+    return (parser.result, _witness(F, parser.result, parser.values))
 
-    elif foutput[0] == 'UNSAT':
 
-        result = False
-
-    else:
-
-        raise RuntimeError("Error during SAT solver call: {}.\n".format(" ".join([cmd,cnf.name, sat.name])))
-
-    return (result, result and witness or None)
-
-
-def _satsolve_stdin_stdout(F, cmd='lingeling',verbose=0):
+def _satsolve_stdin_stdout(F, cmd='lingeling',verbose=0,tmpdir=None):
     """Test CNF satisfiability using a dimacs I/O compatible solver.
 
     This works fine using any other solver which respects the dimacs
@@ -144,6 +472,10 @@ def _satsolve_stdin_stdout(F, cmd='lingeling',verbose=0):
        0 or less means no output. 1 shows the command line actually
        run. 2 outputs the solver output. (default: 0)
 
+    tmpdir: string, optional
+       unused, since the formula is written directly to the solver
+       standard input.
+
 
     Example:
     --------
@@ -158,7 +490,7 @@ def _satsolve_stdin_stdout(F, cmd='lingeling',verbose=0):
     --------
     A pair (answer,witness) where answer is either True when F is
     satisfiable, or False otherwise. If F is satisfiable the witness
-    is a satisfiable assignment in form of a dictionary, otherwise it
+    is a satisfiable assignment in form of a `Witness`, otherwise it
     is None.
 
     Notes:
@@ -180,62 +512,27 @@ def _satsolve_stdin_stdout(F, cmd='lingeling',verbose=0):
     import subprocess
 
     # call solver
-    output = ""
+    parser = _WitnessParser(len(F._index2name) - 1)
     try:
         
         if verbose >=1:
             print("$ "+cmd,file=sys.stderr)
 
         p = subprocess.Popen(args=cmd.split(),
+                             bufsize=-1,
                              stdin=subprocess.PIPE,
                              stdout=subprocess.PIPE)
-        (output, err) = p.communicate(F.dimacs())
+        _communicate(p, F, parser, verbose)
     except OSError:
         pass
 
-    # parse the solver output, for example
-    #
-    # s SATISFIABLE
-    # v -1 -2 -3 4 5 6
-    # v -7 8 9 -10 0
-    #
-    # is parsed as (True,[-1,-2,-3,4,5,6,-7,8,9,-10])
-
-    witness = []
-    result = None
-
-    for line in output.splitlines():
-
-        if verbose >= 2:
-            print(line,file=sys.stderr)
-        
-        if len(line) == 0:
-            continue
-
-        if line[0] == 's':
-            if line.split()[1] == 'SATISFIABLE':
-                result = True
-            elif line.split()[1] == 'UNSATISFIABLE':
-                result = False
-            else:
-                result = None
-        if line[0] == 'v':
-            witness += [int(el)
-                        for el in line.split() if el != "v" and el != "0"]
-
-    if result is None:
+    if parser.result is None:
         raise RuntimeError("Error during SAT solver call: {}.\n".format(cmd))
 
-    # Now witness is a list [v1,v2,...,vn] where vi is either -i or
-    # +i, to represent the assignment. We translate this to our
-    # desired output.
-    witness = {F._index2name[abs(v)]: v > 0
-               for v in witness}
-
-    return (result, result and witness or None)
+    return (parser.result, _witness(F, parser.result, parser.values))
 
 
-def _satsolve_filein_stdout(F, cmd='sat4j', verbose=0):
+def _satsolve_filein_stdout(F, cmd='sat4j', verbose=0, tmpdir=None):
     """Test CNF satisfiability using solvers that requires input file.
 
     This works fine using any solver which requires the input formula
@@ -253,6 +550,9 @@ def _satsolve_filein_stdout(F, cmd='sat4j', verbose=0):
        0 or less means no output. 1 shows the command line actually
        run. 2 outputs the solver output. (default: 0)
 
+    tmpdir: string, optional
+       directory for the temporary file (see `_dimacs_file`)
+
     Example:
     --------
     _satsolve_filein_stdout(F,cmd='sat4j')
@@ -262,80 +562,90 @@ def _satsolve_filein_stdout(F, cmd='sat4j', verbose=0):
     --------
     A pair (answer,witness) where answer is either True when F is
     satisfiable, or False otherwise. If F is satisfiable the witness
-    is a satisfiable assignment in form of a dictionary, otherwise it
+    is a satisfiable assignment in form of a `Witness`, otherwise it
     is None.
 
     """
 
     import subprocess
-    import tempfile
 
     # Input formula must be on file.
-    cnf = tempfile.NamedTemporaryFile(delete=False)
-    cnf.write(F.dimacs())
-    cnf.close()
+    cnf = _dimacs_file(F, tmpdir)
 
-    output = ""
+    parser = _WitnessParser(len(F._index2name) - 1)
 
     try:
 
-        final_command = cmd + " " + cnf.name
+        final_command = cmd + " " + cnf
 
         if verbose >=1:
             print("$ "+final_command,file=sys.stderr)
         
-        p = subprocess.Popen(args=cmd.split()+[cnf.name],
+        p = subprocess.Popen(args=cmd.split()+[cnf],
+                             bufsize=-1,
                              stdin=subprocess.PIPE,
                              stdout=subprocess.PIPE)
-        (output, err) = p.communicate()
+        _communicate(p, None, parser, verbose)
     except OSError:
         pass
 
-    # parse the solver output, for example
-    #
-    # s SATISFIABLE
-    # v -1 -2 -3 4 5 6
-    # v -7 8 9 -10 0
-    #
-    # is parsed as (True,[-1,-2,-3,4,5,6,-7,8,9,-10])
+    if parser.result is None:
+        raise RuntimeError("Error during SAT solver call: {}.\n".format(cmd+" "+cnf))
 
-    witness = []
-    result = None
+    return (parser.result, _witness(F, parser.result, parser.values))
 
 
-    if verbose>=2:
-        print(output,file=sys.stderr)
-        
-    for line in output.splitlines():
+def _satsolve_builtin(F, cmd='builtin', verbose=0, tmpdir=None, time_limit=None,
+                      conflict_limit=None):
+    """Test CNF satisfiability using the builtin solver.
 
-        if len(line) == 0:
-            continue
+    The formula is solved in process by the small CDCL solver in
+    :py:mod:`cnfformula.utils.cdcl`, which is good enough for the
+    formulas of tests and examples, but not for hard ones.
 
-        if line[0] == 's':
-            if line.split()[1] == 'SATISFIABLE':
-                result = True
-            elif line.split()[1] == 'UNSATISFIABLE':
-                result = False
-            else:
-                result = None
-        if line[0] == 'v':
-            witness += [int(el)
-                        for el in line.split() if el != "v" and el != "0"]
+    Parameters
+    ----------
+    F  : a CNF formula
 
-    if result is None:
-        raise RuntimeError("Error during SAT solver call: {}.\n".format(cmd+" "+cnf.name))
-        
-    # Now witness is a list [v1,v2,...,vn] where vi is either -i or
-    # +i, to represent the assignment. We translate this to our
-    # desired output.
-    witness = {F._index2name[abs(v)]: v > 0
-               for v in witness}
+    cmd : string
+        ignored, there are no options for the builtin solver.
+
+    verbose: int
+       0 or less means no output. 1 shows the name of the solver.
+       (default: 0)
+
+    tmpdir: string, optional
+       unused, since the formula is not written anywhere.
+
+    time_limit: float, optional
+       give up after this many seconds
 
-    return (result, result and witness or None)
+    conflict_limit: int, optional
+       give up after this many conflicts
+
+    Returns:
+    --------
+    A pair (answer,witness) where answer is either True when F is
+    satisfiable, or False otherwise. If F is satisfiable the witness
+    is a satisfiable assignment in form of a `Witness`, otherwise it
+    is None. If a limit is reached the answer is None.
+    """
+    from .cdcl import CDCLSolver
+
+    if verbose >= 1:
+        print("$ builtin",file=sys.stderr)
+
+    solver = CDCLSolver(F._clauses, nvars=len(F._index2name)-1)
+    result = solver.solve(time_limit=time_limit, conflict_limit=conflict_limit)
+    if result is None:
+        return (None, None)
+    return (result, _witness(F, result,
+                             _literal_values(F, solver.model if result else [])))
 
 
 # Solver uses different interfaces
 _SATSOLVER_INTERFACE = {
+    'builtin': _satsolve_builtin,
     'lingeling': _satsolve_stdin_stdout,
     'plingeling': _satsolve_stdin_stdout,
     'precosat': _satsolve_stdin_stdout,
@@ -356,7 +666,67 @@ def supported_satsolvers():
     return _SATSOLVER_INTERFACE.keys()
 
 
-def have_satsolver(solvers=None):
+# Names of the solver interfaces
+_INTERFACE_NAME = {
+    _satsolve_stdin_stdout: 'stdin/stdout',
+    _satsolve_filein_stdout: 'filein/stdout',
+    _satsolve_filein_fileout: 'filein/fileout',
+    _satsolve_builtin: 'builtin',
+}
+
+SolverInfo = namedtuple('SolverInfo', ['name', 'path', 'interface'])
+
+# Executables already looked up in this process
+_executable_cache = {}
+
+
+def _lookup_executable(name, refresh=False):
+    """Full path of an executable, or None if it cannot be run
+
+    The executable is searched in the ``PATH`` only the first time,
+    unless `refresh` is true.
+    """
+    if name == 'builtin':
+        return None
+    if refresh or name not in _executable_cache:
+        path = find_executable(name)
+        if path is not None and not os.access(path, os.X_OK):
+            path = None
+        _executable_cache[name] = path
+    return _executable_cache[name]
+
+
+def satsolver_registry(refresh=False):
+    """Installation status of the supported SAT solvers
+
+    The solver executables are looked up in the ``PATH`` the first
+    time, and the result is cached for the rest of the process. No
+    solver is actually run.
+
+    Parameters
+    ----------
+    refresh : bool, optional
+        look up the executables again, e.g. after a change of the
+        ``PATH`` or after the installation of a solver (default: False)
+
+    Returns
+    -------
+    a dictionary that maps the name of each supported solver to
+    a `SolverInfo` tuple `(name,path,interface)`, where `path` is the
+    full path of the executable or None if it is not installed, and
+    `interface` describes how the formula and the solution are passed
+    to and from the solver (e.g. ``'stdin/stdout'``). The builtin
+    solver has no executable, and its interface is ``'builtin'``.
+    """
+    if refresh:
+        _executable_cache.clear()
+    return dict((name, SolverInfo(name,
+                                  _lookup_executable(name),
+                                  _INTERFACE_NAME[interface]))
+                for name, interface in _SATSOLVER_INTERFACE.items())
+
+
+def have_satsolver(solvers=None, refresh=False):
     """Test whether we can run SAT solvers.
 
     Parameters
@@ -364,17 +734,21 @@ def have_satsolver(solvers=None):
     `solvername` : string / list of strings, optional
         the names of the solvers to be tested.
 
+    `refresh` : bool, optional
+        look up the solvers executables again, instead of using the
+        result of previous calls (see `satsolver_registry`).
+
     If `solvers` is None then all supported solvers are tested.
     If `solvers` is a list of strings all solvers in the list are tested.
     If `solvers` is a string then only that solver is tested.
 
+    The ``builtin`` solver is always available.
+
     Raises
     ------
     `TypeError` if `solvers` is not of the right type.
     """
 
-    import subprocess
-
     if solvers is None:
         solvers = supported_satsolvers()
     elif type(solvers) == str:
@@ -382,27 +756,217 @@ def have_satsolver(solvers=None):
     elif any([type(s) != str for s in solvers]):
         raise TypeError("'solvers' type must be either 'str' or 'list(str)'.")
 
-    for solvername in solvers:
+    if refresh:
+        _executable_cache.clear()
+
+    return any(solvername == 'builtin' or
+               _lookup_executable(solvername) is not None
+               for solvername in solvers)
+
+
+class ResultCache(object):
+    """Persistent cache of SAT solver results
+
+    Each result is stored in a file of a directory, named after
+    a digest of the clauses of the formula, of the solver command line
+    and of the solver executable. The digest does not depend on the
+    names of the variables, nor on the header of the formula.
+
+    The executable is identified by its path, its size and its
+    modification time, so the results of a solver are discarded when
+    it is upgraded. All entries can be removed with
+    :py:meth:`ResultCache.clear`, e.g. when the solver is changed in
+    ways that the cache cannot detect.
+
+    The cache has a size limit: when a new result is stored, the least
+    recently used entries are removed until the total size of the
+    cache is below the limit.
+
+    Parameters
+    ----------
+    directory : str
+        the directory that holds the cache. It is created if missing.
+
+    max_size : int, optional
+        maximum total size of the cache in bytes (default: 64MB)
+
+    Examples
+    --------
+    >>> import tempfile, shutil
+    >>> from cnfformula import CNF
+    >>> tmpdir = tempfile.mkdtemp()
+    >>> cache = ResultCache(tmpdir)
+    >>> F = CNF([[(True, 'x'), (True, 'y')], [(False, 'x')]])
+    >>> key = cache.key(F, 'minisat')
+    >>> cache.load(key) is None
+    True
+    >>> cache.store(key, True, [-1, 2])
+    >>> cache.load(key)
+    (True, [-1, 2])
+    >>> shutil.rmtree(tmpdir)
+
+    Results are cached by :py:func:`is_satisfiable` if it is given
+    a cache.
+
+    >>> is_satisfiable(F, cache=cache)  # doctest: +SKIP
+    """
+
+    suffix = '.result'
+
+    def __init__(self, directory, max_size=64*2**20):
+        self.directory = directory
+        self.max_size  = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, F, cmd, sameas=None):
+        """Digest that identifies a solver run on a formula
+
+        Parameters
+        ----------
+        F : a CNF formula
+
+        cmd : str
+            the command line used to invoke the SAT solver
+
+        sameas : str, optional
+            the solver interface used for the run
+        """
+        import hashlib
+        from itertools import chain
+        from ..prjdata import __version__
+
+        solver = cmd.split()[0]
+        path = _lookup_executable(solver)
+        try:
+            info = os.stat(path)
+            fingerprint = (path, info.st_size, info.st_mtime)
+        except (TypeError, OSError):
+            fingerprint = (path,)
+
+        digest = hashlib.sha1()
+        digest.update(repr((cmd.split(), sameas, fingerprint, __version__,
+                            len(F._index2name) - 1, len(F._clauses))).encode('utf-8'))
+        clauses = F._clauses
+        for start in range(0, len(clauses), 4096):
+            literals = array('i', chain.from_iterable(cls + (0,)
+                                                      for cls in clauses[start:start+4096]))
+            # `tostring` is deprecated in python 3 and removed in 3.9
+            if hasattr(literals, 'tobytes'):
+                digest.update(literals.tobytes())
+            else:
+                digest.update(literals.tostring())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key):
+        """Load a result from the cache
+
+        Returns
+        -------
+        a pair `(result,literals)`, where `result` tells whether the
+        formula is satisfiable and `literals` is the satisfying
+        assignment, as a list of literals. If the result is not in
+        the cache, the returned value is None.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as cachefile:
+                result, literals = _parse_minisat_output(cachefile.read())
+        except (IOError, OSError):
+            return None
+
+        if result is None:
+            # corrupted entry: drop it and run the solver again
+            self._remove(path)
+            return None
+
         try:
-            subprocess.Popen(args=[solvername, '--help'],
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
+            os.utime(path, None)   # mark as recently used
         except OSError:
             pass
-        else:
-            return True
-    return False
 
+        return result, literals
+
+    def store(self, key, result, literals):
+        """Save a result in the cache
 
+        Parameters
+        ----------
+        key : str
+            the key of the solver run, as produced by
+            :py:meth:`ResultCache.key`
 
+        result : bool
+            whether the formula is satisfiable
 
-def is_satisfiable(F, cmd=None, sameas=None, verbose=0):
+        literals : sequence of int
+            the satisfying assignment, as a sequence of literals
+        """
+        if result:
+            payload = " ".join(["SAT"] + [str(l) for l in literals] + ["0"])
+        else:
+            payload = "UNSAT"
+
+        # atomic write, so that concurrent runs never see partial entries
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as tmpfile:
+            tmpfile.write(payload + "\n")
+        os.rename(tmpname, self._path(key))
+
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used results exceeding the size limit"""
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """Remove all the results"""
+        for filename in os.listdir(self.directory):
+            if filename.endswith(self.suffix):
+                self._remove(os.path.join(self.directory, filename))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def is_satisfiable(F, cmd=None, sameas=None, verbose=0, tmpdir=None,
+                   cache=None, verify=False, raw=False):
     """Determines whether a CNF is satisfiable or not.
 
     The satisfiability is determined using an external sat solver.  If
     no command line is specified, the known solvers are tried in
     succession until one is found.
 
+    Without a command line, formulas with at most
+    `BUILTIN_SOLVER_THRESHOLD` clauses are first given to the
+    ``builtin`` solver, which runs in process. If an external solver
+    is installed, the builtin one gives up after
+    `BUILTIN_SOLVER_CONFLICTS` conflicts and the external solver
+    decides the formula.
+
     Parameters
     ----------
     F: a CNF formula object
@@ -419,6 +983,27 @@ def is_satisfiable(F, cmd=None, sameas=None, verbose=0):
        0 or less means no output. 1 shows the command line actually
        run. 2 outputs the solver output. (default: 0)
 
+    tmpdir: string, optional
+       directory for the temporary file with the formula, needed by
+       the solvers that do not read it from the standard input. For
+       large formulas a `tmpfs` mount point avoids the disk. The file
+       is reused by further calls on the same formula, until the
+       formula is modified or garbage collected.
+
+    cache: ResultCache, optional
+       look up the result in this cache before running the solver,
+       and store it there afterwards.
+
+    verify: bool, optional
+       check that the witness satisfies the formula (see
+       :py:meth:`cnfformula.CNF.evaluate`). A wrong witness is never
+       stored in the cache. (default: False)
+
+    raw: bool, optional
+       return the witness as an array of literals, one for each
+       variable assigned by the solver, instead of a mapping from
+       variable names. (default: False)
+
     Examples
     --------
     >>> is_satisfiable(F)                                               # doctest: +SKIP
@@ -433,13 +1018,15 @@ def is_satisfiable(F, cmd=None, sameas=None, verbose=0):
     -------
     A pair (answer,witness) where answer is either True when F is
     satisfiable, or False otherwise. If F is satisfiable the witness
-    is a satisfiable assignment in form of a dictionary, otherwise it
-    is None.
+    is a satisfiable assignment in form of a `Witness`, which is a
+    read-only mapping from variable names to truth values (or an
+    array of literals, if `raw` is set), otherwise it is None.
 
     Raises
     ------
     RuntimeError
-       if it is not possible to correctly invoke the solver needed.
+       if it is not possible to correctly invoke the solver needed,
+       or if `verify` is set and the witness is wrong.
     ValueError 
        if `sameas` is set and does not match the name of a supported solver.
     TypeError
@@ -471,12 +1058,78 @@ def is_satisfiable(F, cmd=None, sameas=None, verbose=0):
     if not isinstance(F, cnfformula.CNF):
         raise TypeError("'F' is not a CNF formula object.")
 
+    for solver_cmd, s_func in _default_satsolvers(F, cmd, sameas):
+
+        cached = None
+        if cache is not None:
+            key = cache.key(F, solver_cmd, sameas)
+            cached = cache.load(key)
+
+        if cached is not None:
+            if verbose >= 1:
+                print("$ "+solver_cmd+" (cached)",file=sys.stderr)
+            result, literals = cached
+            witness = _witness(F, result, _literal_values(F, literals))
+        else:
+            result, witness = s_func(F, solver_cmd,verbose=verbose,tmpdir=tmpdir)
+
+        if result is not None:
+            break
+
+    if verify and result and F.evaluate(witness) is not True:
+        raise RuntimeError("The assignment found by {} does not satisfy the formula.\n"
+                           .format(solver_cmd))
+
+    if cache is not None and cached is None:
+        cache.store(key, result, witness.literals() if witness else [])
+
+    if raw and witness is not None:
+        witness = witness.literals()
+    return (result, witness)
+
+
+def _default_satsolvers(F, cmd=None, sameas=None):
+    """Solvers to run in turn on `F`, until one of them decides it
+
+    See `is_satisfiable` for the meaning of the arguments.
+
+    Returns
+    -------
+    a list of pairs `(cmd,interface)`, as the ones returned by
+    `_choose_satsolver`.
+    """
+    if (cmd is not None and len(cmd.split()) > 0) or sameas is not None \
+            or len(F) > BUILTIN_SOLVER_THRESHOLD:
+        return [_choose_satsolver(cmd, sameas)]
+
+    try:
+        external = _choose_satsolver()
+    except RuntimeError:
+        return [('builtin', _satsolve_builtin)]
+
+    def builtin(F, cmd, **kwargs):
+        return _satsolve_builtin(F, cmd, conflict_limit=BUILTIN_SOLVER_CONFLICTS,
+                                 **kwargs)
+    return [('builtin', builtin), external]
+
+
+def _choose_satsolver(cmd=None, sameas=None):
+    """Command line and interface of the solver to be used
+
+    See `is_satisfiable` for the meaning of the arguments.
+
+    Returns
+    -------
+    a pair `(cmd,interface)` with the command line of an installed
+    solver, and the function that implements its interface.
+    """
     if (sameas is not None) and (sameas not in supported_satsolvers()):
         raise ValueError("'{}' is not a supported sat solver.".format(sameas))
 
     if (cmd is None) or len(cmd.split()) == 0:
 
-        solver_cmds = supported_satsolvers()  # try all supported solvers
+        # try all supported external solvers
+        solver_cmds = [s for s in supported_satsolvers() if s != 'builtin']
         sameas = None
 
     else:
@@ -496,7 +1149,7 @@ def is_satisfiable(F, cmd=None, sameas=None, verbose=0):
         if not have_satsolver(solvers=[solver]):
             continue
         else:
-            return s_func(F, solver_cmd,verbose=verbose)
+            return (solver_cmd, s_func)
 
     # no solver was available.
     if len(solver_cmds) == 1:
@@ -504,3 +1157,464 @@ def is_satisfiable(F, cmd=None, sameas=None, verbose=0):
                            .format(solver_cmds[0].split()[0]))
     else:
         raise RuntimeError("No usable solver found.")
+
+
+SolverResult = namedtuple('SolverResult',
+                          ['index', 'result', 'witness', 'status', 'time'])
+
+
+def _memory_limited(args, memory_limit):
+    """Command line that runs `args` with a limited address space
+
+    The limit is set by the shell, which then runs the solver in its
+    place, so that nothing runs in the child process between fork and
+    exec.
+    """
+    if memory_limit is None:
+        return args
+    return ['/bin/sh', '-c', 'ulimit -v {} && exec "$@"'.format(int(memory_limit) * 1024),
+            'sh'] + args
+
+
+class _SolverProcesses(object):
+    """The solver processes started by `solve_many`
+
+    The processes are started and registered under a lock, so that
+    none of them is started after `kill_all`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes = {}
+        self.stopped = False
+
+    def start(self, index, args, **kwargs):
+        """Start the solver process for a formula
+
+        Returns
+        -------
+        the `subprocess.Popen` object, or None if `kill_all` has
+        already been called.
+        """
+        import subprocess
+        with self._lock:
+            if self.stopped:
+                return None
+            p = subprocess.Popen(args=args, **kwargs)
+            self._processes[index] = p
+            return p
+
+    def finished(self, index):
+        with self._lock:
+            self._processes.pop(index, None)
+
+    def kill_all(self):
+        """Kill the running solvers, and start no more of them"""
+        with self._lock:
+            self.stopped = True
+            processes = list(self._processes.values())
+        for p in processes:
+            try:
+                p.kill()
+            except OSError:
+                pass
+
+
+def _solve_job(index, F, cmd, interface, timeout, memory_limit, processes,
+               tmpdir=None):
+    """Run the solver on a formula, with time and memory limits
+
+    The formula is written directly to the solver standard input, or
+    to a temporary file, without building its dimacs encoding in
+    memory. The temporary files are not reused, since usually each
+    formula is solved once.
+
+    The builtin solver runs in this thread, and has no memory limit.
+
+    Returns
+    -------
+    a `SolverResult`, or None if the solvers have been stopped.
+    """
+    import subprocess
+    import time
+
+    if interface == 'builtin':
+        start = time.time()
+        result, witness = _satsolve_builtin(F, time_limit=timeout)
+        status = 'timeout' if result is None else 'ok'
+        return SolverResult(index, result, witness, status, time.time() - start)
+
+    tmpfiles = []
+    args = cmd.split()
+    try:
+        if interface != 'stdin/stdout':
+            cnf = tempfile.NamedTemporaryFile(suffix='.cnf', dir=tmpdir,
+                                              delete=False)
+            tmpfiles.append(cnf.name)
+            _write_dimacs(F, cnf)
+            cnf.close()
+            args.append(cnf.name)
+        if interface == 'filein/fileout':
+            sat = tempfile.NamedTemporaryFile(suffix='.sat', dir=tmpdir,
+                                              delete=False)
+            tmpfiles.append(sat.name)
+            sat.close()
+            args.append(sat.name)
+
+        start = time.time()
+        with open(os.devnull, 'w') as devnull:
+            try:
+                p = processes.start(index, _memory_limited(args, memory_limit),
+                                    bufsize=-1,
+                                    stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE,
+                                    stderr=devnull,
+                                    close_fds=True)
+            except OSError:
+                return SolverResult(index, None, None, 'error', 0.0)
+        if p is None:
+            return None
+
+        expired = []
+
+        def kill():
+            expired.append(True)
+            try:
+                p.kill()
+            except OSError:
+                pass
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+
+        parser = _WitnessParser(len(F._index2name) - 1,
+                                minisat=(interface == 'filein/fileout'))
+        try:
+            if interface == 'filein/fileout':
+                _communicate(p)
+            else:
+                _communicate(p, F if interface == 'stdin/stdout' else None,
+                             parser)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            processes.finished(index)
+        elapsed = time.time() - start
+
+        if expired:
+            return SolverResult(index, None, None, 'timeout', elapsed)
+
+        if interface == 'filein/fileout':
+            parser.feed_file(tmpfiles[1])
+
+        if parser.result is None:
+            return SolverResult(index, None, None, 'error', elapsed)
+        return SolverResult(index, parser.result,
+                            _witness(F, parser.result, parser.values),
+                            'ok', elapsed)
+    finally:
+        for filename in tmpfiles:
+            os.unlink(filename)
+
+
+def solve_many(formulas, cmd=None, sameas=None, jobs=1, timeout=None,
+               memory_limit=None, tmpdir=None):
+    """Determines the satisfiability of many formulas concurrently.
+
+    Each formula is solved by a separate run of an external SAT
+    solver, and at most `jobs` solvers run at the same time. The
+    formulas are streamed to the solvers, without building their
+    dimacs encoding in memory.
+
+    Parameters
+    ----------
+    formulas: iterable of CNF formula objects
+       the formulas to be solved. They are read from the iterable only
+       when a solver is available for them.
+
+    cmd: string,optional
+       the actual command line used to invoke the SAT solver
+
+    sameas: string, optional
+       use the interface of one of the supported solvers (see
+       `is_satisfiable`)
+
+    jobs: int, optional
+       the number of solvers running at the same time (default: 1)
+
+    timeout: float, optional
+       the wall clock time limit for each solver run, in seconds. The
+       solver is killed when the time is over.
+
+    memory_limit: int, optional
+       the limit on the address space of each solver run, in
+       megabytes, set with ``ulimit -v`` by ``/bin/sh``. It does not
+       apply to the builtin solver.
+
+    tmpdir: string, optional
+       directory for the temporary files (see `is_satisfiable`)
+
+    Returns
+    -------
+    an iterator over `SolverResult` tuples
+    `(index,result,witness,status,time)` in completion order, where
+    `index` is the position of the formula in `formulas`, `result` and
+    `witness` are as in `is_satisfiable`, `status` is one of
+    ``'ok'``, ``'timeout'`` and ``'error'``, and `time` is the wall
+    clock time of the solver run. The result is None when the status
+    is not ``'ok'``.
+
+    Stopping the iteration early kills the running solvers.
+
+    Raises
+    ------
+    RuntimeError
+       if it is not possible to find the solver needed.
+    ValueError
+       if `sameas` is set and does not match the name of a supported
+       solver, or if `jobs` is not positive.
+
+    Examples
+    --------
+    >>> for r in solve_many(formulas, jobs=4, timeout=60):  # doctest: +SKIP
+    ...     print(r.index, r.status, r.result, r.time)
+    """
+    if jobs < 1:
+        raise ValueError("The number of jobs must be positive.")
+
+    solver_cmd, s_func = _choose_satsolver(cmd, sameas)
+    interface = _INTERFACE_NAME[s_func]
+
+    source = enumerate(formulas)
+    source_lock = threading.Lock()
+    results = queue.Queue()
+    processes = _SolverProcesses()
+
+    def worker():
+        try:
+            while not processes.stopped:
+                with source_lock:
+                    try:
+                        index, F = next(source)
+                    except StopIteration:
+                        return
+                result = _solve_job(index, F, solver_cmd, interface,
+                                    timeout, memory_limit, processes,
+                                    tmpdir)
+                if result is not None:
+                    results.put(result)
+        except BaseException as e:
+            results.put(e)
+        finally:
+            results.put(None)
+
+    workers = [threading.Thread(target=worker) for _ in range(jobs)]
+    for w in workers:
+        w.daemon = True
+        w.start()
+
+    active = len(workers)
+    try:
+        while active > 0:
+            try:
+                # a timeout lets the main thread handle signals
+                item = results.get(True, 1)
+            except queue.Empty:
+                continue
+            if item is None:
+                active -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        processes.kill_all()
+
+
+class SolverSession(object):
+    """A long running solver, queried under many assumptions
+
+    The session starts a solver process and sends it the formula
+    once. Then the formula can be solved many times under different
+    assumptions, and further clauses can be added between the queries,
+    without sending the formula again. Later changes to the formula
+    object itself are not seen by the session.
+
+    The solver process must read its input incrementally, in the
+    following line protocol:
+
+    - the formula is sent in dimacs format, and further clauses are
+      sent as dimacs clause lines;
+    - the line ``a <literals> 0`` asks to solve the formula under the
+      assumption that the literals in the line are true;
+    - the solver answers each query with a line ``s SATISFIABLE``
+      followed by the assignment in ``v`` lines, the last of which
+      ends with ``0``, or with the line ``s UNSATISFIABLE``.
+
+    Incremental solvers with the IPASIR interface can be run through
+    a thin wrapper for this protocol. By default the session uses the
+    builtin solver (see :py:mod:`cnfformula.utils.cdcl`) in a separate
+    process.
+
+    Parameters
+    ----------
+    F : CNF
+        the formula to be solved
+
+    cmd : string, optional
+        the command line of a solver that speaks the protocol
+
+    verbose : int
+        0 or less means no output. 1 shows the command line actually
+        run. 2 outputs the queries and the answers. (default: 0)
+
+    Examples
+    --------
+    >>> from cnfformula import CNF
+    >>> F = CNF([[(True, 'x'), (True, 'y')], [(False, 'x'), (True, 'y')]])
+    >>> with SolverSession(F) as session:
+    ...     print(session.solve()[0], session.solve([(False, 'y')])[0])
+    ...     session.add_clause([(False, 'y')])
+    ...     print(session.solve()[0])
+    True False
+    False
+    """
+
+    def __init__(self, F, cmd=None, verbose=0):
+        import subprocess
+
+        if cmd is None:
+            from . import cdcl
+            args = [sys.executable, os.path.splitext(cdcl.__file__)[0] + '.py']
+        else:
+            args = cmd.split()
+        self.cmd = " ".join(args)
+        self.verbose = verbose
+
+        self._F = F
+        self._nvars = len(F._index2name) - 1
+        self._process = None
+
+        if verbose >= 1:
+            print("$ "+self.cmd,file=sys.stderr)
+        try:
+            self._process = subprocess.Popen(args=args,
+                                             bufsize=-1,
+                                             stdin=subprocess.PIPE,
+                                             stdout=subprocess.PIPE,
+                                             close_fds=True)
+            _write_dimacs(F, self._process.stdin)
+        except (IOError, OSError):
+            self.close()
+            raise RuntimeError("Error during SAT solver call: {}.\n".format(self.cmd))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _literals(self, literals):
+        """Translate literals from `(polarity,name)` pairs to integers"""
+        name2index = self._F._name2index
+        result = []
+        for polarity, name in literals:
+            index = name2index.get(name, 0)
+            if not 0 < index <= self._nvars:
+                raise ValueError("Variable {} is not in the formula.".format(name))
+            result.append(index if polarity else -index)
+        return result
+
+    def _send(self, line):
+        if self._process is None:
+            raise RuntimeError("The solver session is closed.")
+        if self.verbose >= 2:
+            print(line,file=sys.stderr)
+        try:
+            self._process.stdin.write(line + "\n")
+        except (IOError, OSError):
+            self.close()
+            raise RuntimeError("Error during SAT solver call: {}.\n".format(self.cmd))
+
+    def add_clause(self, clause):
+        """Add a clause to the formula solved in the session
+
+        Parameters
+        ----------
+        clause : list of (bool,string) pairs
+            the literals of the clause, as in
+            :py:meth:`cnfformula.CNF.add_clause`. The variables must be
+            in the formula.
+
+        Raises
+        ------
+        ValueError
+            if the clause contains variables not in the formula.
+        """
+        literals = self._literals(clause)
+        self._send(" ".join([str(l) for l in literals + [0]]))
+
+    def solve(self, assumptions=()):
+        """Solve the formula under some assumptions
+
+        Parameters
+        ----------
+        assumptions : list of (bool,string) pairs, optional
+            literals that are assumed true for this query only
+
+        Returns
+        -------
+        A pair (answer,witness) as in
+        :py:func:`cnfformula.utils.solver.is_satisfiable`.
+
+        Raises
+        ------
+        RuntimeError
+            if the solver fails or does not follow the protocol.
+        ValueError
+            if the assumptions contain variables not in the formula.
+        """
+        literals = self._literals(assumptions)
+        self._send(" ".join(["a"] + [str(l) for l in literals + [0]]))
+
+        parser = _WitnessParser(self._nvars)
+        complete = False
+        try:
+            self._process.stdin.flush()
+            for line in iter(self._process.stdout.readline, b""):
+                if self.verbose >= 2:
+                    sys.stderr.write(line)
+                parser.feed(line)
+                tokens = line.split()
+                if tokens[:1] == [b's'] and parser.result is not True:
+                    complete = True
+                elif tokens[:1] == [b'v'] and tokens[-1] == b'0':
+                    complete = True
+                if complete:
+                    break
+            parser.close()
+        except (IOError, OSError):
+            pass
+
+        if not complete or parser.result is None:
+            self.close()
+            raise RuntimeError("Error during SAT solver call: {}.\n".format(self.cmd))
+        return (parser.result, _witness(self._F, parser.result, parser.values))
+
+    def close(self):
+        """Stop the solver process"""
+        if self._process is None:
+            return
+        p, self._process = self._process, None
+        try:
+            p.stdin.close()
+        except (IOError, OSError):
+            pass
+        try:
+            p.kill()
+        except OSError:
+            pass
+        p.wait()
+        p.stdout.close()
@@ -22,6 +22,8 @@ setup(
             'cnfshuffle=cnfformula.utils.cnfshuffle:command_line_utility',
             'cnftransform=cnfformula.utils.dimacstransform:command_line_utility'],
     },
+    # the client of `cnfgen --serve` runs without importing the package
+    scripts=['cnfformula/utils/cnfgenclient.py'],
     install_requires=['networkx','pyparsing'],
     # make some tests
     test_suite='nose.collector',
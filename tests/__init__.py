@@ -5,6 +5,8 @@ import textwrap
 
 from cnfformula import CNF
 from cnfformula.utils.solver import is_satisfiable, have_satsolver
+from cnfformula.utils.solver import supported_satsolvers
+from cnfformula.utils.solver import BUILTIN_SOLVER_THRESHOLD
 
 
 def example_filename(filename):
@@ -41,15 +43,21 @@ class TestCNFBase(unittest.TestCase):
     def assertCnfEquivalentModuloVariables(self, cnf1, cnf2):
         self.assertSetEqual(set(cnf1._clauses), set(cnf2._clauses))
 
+    def solvable(self, formula):
+        """Small formulas are solved by the builtin solver"""
+        if len(formula) <= BUILTIN_SOLVER_THRESHOLD:
+            return True
+        return have_satsolver([s for s in supported_satsolvers() if s != 'builtin'])
+
     def assertSAT(self, formula):
-        if have_satsolver():
+        if self.solvable(formula):
             result, _ = is_satisfiable(formula)
             assert result
         else:
             self.skipTest("No usable solver found.")
 
     def assertUNSAT(self, formula):
-        if have_satsolver():
+        if self.solvable(formula):
             result, _ = is_satisfiable(formula)
             assert not result
         else:
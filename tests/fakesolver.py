@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Brute force SAT solver, a stand-in for real solvers in the tests
+
+Usage: fakesolver.py [--sleep <seconds>] [--memory <MB>] [--flip <var>]
+                     [<input> [<output>]]
+
+Without arguments the formula is read from the standard input. The
+solution is written on the standard output with the dimacs
+conventions, unless an output file is given: then it is written there
+in the style of `minisat`. The solver can be asked to sleep or to
+allocate memory before solving, and to flip a variable in the
+solution, which is then wrong.
+"""
+
+import sys
+import time
+from itertools import product
+
+
+def read_dimacs(text):
+    n = 0
+    clauses = []
+    literals = []
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) == 0 or line[0] == 'c':
+            continue
+        if line[0] == 'p':
+            n = int(line.split()[2])
+            continue
+        for lit in line.split():
+            lit = int(lit)
+            if lit == 0:
+                clauses.append(literals)
+                literals = []
+            else:
+                literals.append(lit)
+    return n, clauses
+
+
+def solve(n, clauses):
+    for values in product([False, True], repeat=n):
+        if all(any(values[abs(l) - 1] == (l > 0) for l in cls) for cls in clauses):
+            return [i + 1 if v else -(i + 1) for i, v in enumerate(values)]
+    return None
+
+
+def main(args):
+    ballast = None
+    flip = None
+    while args and args[0].startswith('--'):
+        option, value = args[0], float(args[1])
+        args = args[2:]
+        if option == '--sleep':
+            time.sleep(value)
+        elif option == '--memory':
+            ballast = bytearray(int(value * 1024 * 1024))
+        elif option == '--flip':
+            flip = int(value)
+
+    if len(args) > 0:
+        with open(args[0]) as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+
+    n, clauses = read_dimacs(text)
+    solution = solve(n, clauses)
+    if solution is not None and flip is not None:
+        solution[flip - 1] = -solution[flip - 1]
+
+    if len(args) > 1:
+        with open(args[1], 'w') as f:
+            if solution is None:
+                f.write("UNSAT\n")
+            else:
+                f.write("SAT\n" + " ".join(str(l) for l in solution + [0]) + "\n")
+    elif solution is None:
+        sys.stdout.write("s UNSATISFIABLE\n")
+    else:
+        sys.stdout.write("s SATISFIABLE\n")
+        sys.stdout.write("v " + " ".join(str(l) for l in solution + [0]) + "\n")
+    return 10 if solution is not None else 20
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+import random
+import unittest
+
+from cnfformula import CNF
+from cnfformula.utils.solver import satsolver_registry, is_satisfiable
+from cnfformula.utils.asyncsolver import asyncio, is_satisfiable_async
+
+from .satisfiable import evaluate_cnf
+from .test_solver import FakeSolverTestCase
+
+
+# asyncio only exists on Python 3, where the formula families are not
+# available yet: the test formulas are built by hand.
+def random_3cnf(n, m, seed):
+    rng = random.Random(seed)
+    F = CNF()
+    for _ in range(m):
+        F.add_clause([(rng.random() < 0.5, 'x{}'.format(v))
+                      for v in sorted(rng.sample(range(1, n + 1), 3))])
+    return F
+
+
+def contradiction():
+    return CNF([[(True, 'x')], [(False, 'x')]])
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class TestAsyncSolver(FakeSolverTestCase):
+
+    def setUp(self):
+        FakeSolverTestCase.setUp(self)
+        for name in ['picosat', 'minisat', 'sat4j']:
+            self.install(name)
+        satsolver_registry(refresh=True)
+        # subprocesses need the loop to be the current one (before
+        # Python 3.8 the child watcher is attached to it)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        FakeSolverTestCase.tearDown(self)
+
+    def solve(self, F, **kwargs):
+        return self.loop.run_until_complete(
+            is_satisfiable_async(F, loop=self.loop, **kwargs))
+
+    def test_interfaces(self):
+        formulas = [random_3cnf(8, m, seed=m) for m in range(10, 60, 10)]
+        formulas += [contradiction(), CNF()]
+        for cmd in ['picosat', 'minisat', 'sat4j']:
+            for F in formulas:
+                result, witness = self.solve(F, cmd=cmd)
+                self.assertEqual(result, is_satisfiable(F)[0])
+                if result:
+                    _, falsified, undefined = evaluate_cnf(F, witness)
+                    self.assertListEqual(falsified + undefined, [])
+                else:
+                    self.assertIsNone(witness)
+
+    def test_large_input(self):
+        F = CNF()
+        for i in range(20000):
+            F.add_clause([(True, 'x{}'.format(i)), (False, 'y{}'.format(i))])
+        result, witness = self.solve(F, cmd='picosat')
+        self.assertTrue(result)
+        self.assertEqual(len(witness), 40000)
+
+    def test_concurrent(self):
+        formulas = [random_3cnf(8, m, seed=m) for m in range(10, 60, 10)]
+        futures = [is_satisfiable_async(F, cmd='picosat', loop=self.loop)
+                   for F in formulas]
+        results = self.loop.run_until_complete(asyncio.gather(*futures))
+        self.assertListEqual([r[0] for r in results],
+                             [is_satisfiable(F)[0] for F in formulas])
+
+    def test_cancel(self):
+        F = contradiction()
+        future = is_satisfiable_async(F, cmd='picosat --sleep 30', loop=self.loop)
+        self.loop.call_later(0.5, future.cancel)
+        start = self.loop.time()
+        with self.assertRaises(asyncio.CancelledError):
+            self.loop.run_until_complete(future)
+        self.assertLess(self.loop.time() - start, 10)
+        # let the loop reap the killed solver
+        self.loop.run_until_complete(asyncio.sleep(0.5))
+
+    def test_errors(self):
+        F = contradiction()
+        with self.assertRaises(RuntimeError):
+            is_satisfiable_async(F, cmd='lingeling', loop=self.loop)
+        with self.assertRaises(TypeError):
+            is_satisfiable_async([[1, 2]], loop=self.loop)
+        with self.assertRaises(RuntimeError):
+            self.solve(F, cmd='picosat --sleep forever')
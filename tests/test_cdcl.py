@@ -0,0 +1,111 @@
+import itertools
+import random
+import unittest
+
+from cnfformula.utils.cdcl import CDCLSolver
+
+
+def brute_force(nvars, clauses, assumptions=()):
+    for bits in itertools.product([False, True], repeat=nvars):
+        def true(lit):
+            return bits[abs(lit) - 1] == (lit > 0)
+        if all(true(a) for a in assumptions) and \
+           all(any(true(l) for l in cls) for cls in clauses):
+            return True
+    return False
+
+
+def pigeonhole(pigeons, holes):
+    var = lambda p, h: p * holes + h + 1
+    clauses = [[var(p, h) for h in range(holes)] for p in range(pigeons)]
+    for h in range(holes):
+        for p, q in itertools.combinations(range(pigeons), 2):
+            clauses.append([-var(p, h), -var(q, h)])
+    return clauses
+
+
+class TestCDCLSolver(unittest.TestCase):
+
+    def check_model(self, solver, clauses, assumptions=()):
+        model = set(solver.model)
+        self.assertEqual(len(solver.model), solver.nvars)
+        for lit in assumptions:
+            self.assertIn(lit, model)
+        for cls in clauses:
+            self.assertTrue(any(l in model for l in cls))
+
+    def test_trivial(self):
+        self.assertTrue(CDCLSolver().solve())
+        self.assertFalse(CDCLSolver([[]]).solve())
+        self.assertFalse(CDCLSolver([[1], [-1]]).solve())
+        solver = CDCLSolver([[1, -1]], nvars=3)
+        self.assertTrue(solver.solve())
+        self.assertEqual(len(solver.model), 3)
+
+    def test_random_formulas(self):
+        rng = random.Random(7)
+        for _ in range(500):
+            n = rng.randint(1, 8)
+            clauses = [[rng.choice([-1, 1]) * rng.randint(1, n)
+                        for _ in range(rng.randint(1, 4))]
+                       for _ in range(rng.randint(0, 40))]
+            solver = CDCLSolver(clauses, nvars=n)
+            solver.restart_unit = rng.choice([1, 100])
+            result = solver.solve()
+            self.assertEqual(result, brute_force(n, clauses))
+            if result:
+                self.check_model(solver, clauses)
+
+    def test_pigeonhole(self):
+        for n in range(1, 7):
+            self.assertFalse(CDCLSolver(pigeonhole(n + 1, n)).solve())
+            solver = CDCLSolver(pigeonhole(n, n))
+            self.assertTrue(solver.solve())
+            self.check_model(solver, pigeonhole(n, n))
+
+    def test_assumptions(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            n = rng.randint(1, 8)
+            clauses = [[rng.choice([-1, 1]) * rng.randint(1, n)
+                        for _ in range(rng.randint(1, 3))]
+                       for _ in range(rng.randint(0, 25))]
+            solver = CDCLSolver(clauses, nvars=n)
+            for _ in range(4):
+                assumptions = [rng.choice([-1, 1]) * rng.randint(1, n)
+                               for _ in range(rng.randint(0, 3))]
+                result = solver.solve(assumptions)
+                self.assertEqual(result, brute_force(n, clauses, assumptions))
+                if result:
+                    self.check_model(solver, clauses, assumptions)
+
+    def test_incremental(self):
+        solver = CDCLSolver(pigeonhole(4, 4))
+        self.assertTrue(solver.solve())
+        self.assertFalse(solver.solve([-1, -2, -3, -4]))
+        self.assertTrue(solver.solve([2]))
+        solver.add_clause([-1])
+        solver.add_clause([-2])
+        self.assertTrue(solver.solve())
+        self.assertNotIn(1, solver.model)
+        self.assertNotIn(2, solver.model)
+        solver.add_clause([-3])
+        self.assertTrue(solver.solve())
+        self.assertIn(4, solver.model)
+        self.assertFalse(solver.solve([-4]))
+        solver.add_clause([-4])
+        self.assertFalse(solver.solve())
+        self.assertFalse(solver.solve([5]))
+
+    def test_new_variables(self):
+        solver = CDCLSolver([[1, 2]])
+        self.assertTrue(solver.solve([5]))
+        self.assertEqual(solver.nvars, 5)
+        solver.add_clause([-5, 7])
+        self.assertTrue(solver.solve([5]))
+        self.assertIn(7, solver.model)
+
+    def test_time_limit(self):
+        solver = CDCLSolver(pigeonhole(10, 9))
+        self.assertIsNone(solver.solve(time_limit=0))
+        self.assertIsNone(solver.model)
@@ -47,3 +47,105 @@ class TestCNF(TestCNFBase) :
         self.assertTrue(len(list(F.variables())),3)
         self.assertRaises(ValueError, F.add_clause,
                           [(True,"T"),(False,"V")],strict=True)
+
+
+class TestMappingEncodings(TestCNFBase) :
+    """The auxiliary encodings of the mappings are equivalent to the
+    pairwise ones, once projected on the mapping variables."""
+
+    @staticmethod
+    def projected_models(mapping) :
+        F=cnfformula.CNF()
+        for v in mapping.variables():
+            F.add_variable(v)
+        for c in mapping.clauses():
+            F.add_clause(c,strict=True)
+        auxiliary=list(mapping.auxiliary_variables())
+        main=[v for v in F.variables() if v not in auxiliary]
+        clauses=list(F.clauses())
+        models=set()
+        for bits in itertools.product([False,True],repeat=len(main)):
+            assignment=dict(zip(main,bits))
+            for auxbits in itertools.product([False,True],repeat=len(auxiliary)):
+                assignment.update(zip(auxiliary,auxbits))
+                if all(any(assignment[v]==p for p,v in c) for c in clauses):
+                    models.add(bits)
+                    break
+        return models
+
+    def check_unary(self,D,R,**kwargs) :
+        mapping=cnfformula.CNF.unary_mapping(D,R,**kwargs)
+        compact=cnfformula.CNF.unary_mapping(D,R,encoding='auxiliary',**kwargs)
+        self.assertListEqual(list(mapping.auxiliary_variables()),[])
+        self.assertNotEqual(list(compact.auxiliary_variables()),[])
+        self.assertSetEqual(self.projected_models(mapping),self.projected_models(compact))
+
+    def check_binary(self,D,R,**kwargs) :
+        mapping=cnfformula.CNF.binary_mapping(D,R,**kwargs)
+        compact=cnfformula.CNF.binary_mapping(D,R,encoding='auxiliary',**kwargs)
+        self.assertSetEqual(self.projected_models(mapping),self.projected_models(compact))
+
+    def test_unary_injective(self) :
+        self.check_unary(range(3),range(3),injective=True,complete=False)
+
+    def test_unary_functional(self) :
+        self.check_unary(range(3),range(3),functional=True)
+
+    def test_unary_nondecreasing(self) :
+        self.check_unary(range(3),range(3),nondecreasing=True,complete=False)
+        self.check_unary(range(2),range(4),nondecreasing=True)
+
+    def test_binary_injective(self) :
+        self.check_binary(range(3),range(2),injective=True)
+
+    def test_binary_nondecreasing(self) :
+        self.check_binary(range(2),range(3),nondecreasing=True)
+
+    def test_unknown_encoding(self) :
+        with self.assertRaises(ValueError):
+            cnfformula.CNF.unary_mapping(range(3),range(3),encoding='commander')
+
+
+class TestEvaluate(TestCNFBase) :
+
+    def random_assignment(self, variables, rng, total=True):
+        return dict((v, rng.random() < 0.5) for v in variables
+                    if total or rng.random() < 0.7)
+
+    def test_against_clause_by_clause(self):
+        from .satisfiable import evaluate_cnf
+        rng = random.Random(3)
+        F = cnfformula.RandomKCNF(3, 10, 30, seed=3)
+        assignments = [self.random_assignment(F.variables(), rng, total)
+                       for total in [True, False] * 50]
+        values = F.evaluate(assignments)
+        self.assertEqual(len(values), len(assignments))
+        for assignment, value in zip(assignments, values):
+            _, falsified, undefined = evaluate_cnf(F, assignment)
+            self.assertListEqual(F.falsified_clauses(assignment), falsified)
+            if falsified:
+                self.assertIs(value, False)
+            elif undefined:
+                self.assertIsNone(value)
+            else:
+                self.assertIs(value, True)
+            self.assertIs(F.evaluate(assignment), value)
+
+    def test_empty(self):
+        F = cnfformula.CNF()
+        self.assertIs(F.evaluate({}), True)
+        self.assertListEqual(F.evaluate([]), [])
+        F.add_clause([])
+        self.assertIs(F.evaluate({}), False)
+        self.assertListEqual(F.falsified_clauses({}), [[]])
+
+    def test_unknown_variables(self):
+        F = cnfformula.CNF([[(True, 'x')]])
+        self.assertIs(F.evaluate({'x': True, 'y': False}), True)
+        self.assertIsNone(F.evaluate({'y': True}))
+
+    def test_planted(self):
+        planted = [{'x_{0}'.format(i): i % 3 == 0 for i in range(1, 101)},
+                   {'x_{0}'.format(i): i % 2 == 0 for i in range(1, 51)}]
+        F = cnfformula.RandomKCNF(3, 100, 400, seed=5, planted_assignments=planted)
+        self.assertListEqual(F.evaluate(planted), [True, True])
@@ -0,0 +1,110 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from cStringIO import StringIO
+
+import cnfformula
+from cnfformula import cnfgen
+
+from .test_commandline_helper import stdout_redirector
+
+
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(cnfformula.__file__)))
+CLIENT = os.path.join(PACKAGE_PATH, 'cnfformula', 'utils', 'cnfgenclient.py')
+
+
+class TestCnfgenServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.address = os.path.join(cls.directory, 'cnfgen.sock')
+        env = dict(os.environ, PYTHONPATH=PACKAGE_PATH)
+        with open(os.devnull, 'w') as devnull:
+            cls.server = subprocess.Popen(
+                [sys.executable, '-c',
+                 'import sys; from cnfformula import cnfgen; cnfgen(sys.argv)',
+                 '--serve', cls.address],
+                env=env, stderr=devnull)
+        for _ in range(100):
+            if os.path.exists(cls.address):
+                break
+            time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        shutil.rmtree(cls.directory)
+
+    def run_client(self, args, stdin=None, env=None):
+        p = subprocess.Popen([sys.executable, CLIENT, '--socket', self.address] + args,
+                             stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE,
+                             env=env)
+        output, errors = p.communicate(stdin)
+        return p.returncode, output, errors
+
+    def run_cnfgen(self, args):
+        f = StringIO()
+        with stdout_redirector(f):
+            cnfgen(["cnfgen"] + args)
+        return f.getvalue()
+
+    def test_same_output(self):
+        for args in [["php", "5", "4"],
+                     ["-q", "-S", "3", "randkcnf", "3", "10", "20"],
+                     ["-q", "op", "4", "-T", "xor", "2"]]:
+            status, output, _ = self.run_client(args)
+            self.assertEqual(status, 0)
+            self.assertEqual(output, self.run_cnfgen(args))
+
+    def test_errors(self):
+        status, output, errors = self.run_client(["php", "5"])
+        self.assertEqual(status, 2)
+        self.assertEqual(output, "")
+        self.assertIn("too few arguments", errors)
+        # the server survives the failed command
+        status, _, _ = self.run_client(["php", "2", "2"])
+        self.assertEqual(status, 0)
+
+    def test_standard_input(self):
+        graph = "p edge 3 3\ne 1 2\ne 2 3\ne 3 1\n"
+        status, output, errors = self.run_client(["-q", "tseitin", "-i", "-",
+                                                  "-gf", "dimacs"], stdin=graph)
+        self.assertEqual(status, 0)
+        self.assertIn("<stdin>", errors)
+        self.assertTrue(output.startswith("p cnf 3 6\n"))
+
+    def test_graph_cache_environment(self):
+        """The graph cache is the one in the environment of the client"""
+        cache = tempfile.mkdtemp()
+        try:
+            args = ["-q", "gphp", "--bshift", "5", "4", "1", "2"]
+            env = dict(os.environ)
+            env.pop('CNFGEN_GRAPH_CACHE', None)
+            status, output, _ = self.run_client(args, env=env)
+            self.assertEqual(status, 0)
+            self.assertListEqual(os.listdir(cache), [])
+            env['CNFGEN_GRAPH_CACHE'] = cache
+            status, cached, _ = self.run_client(args, env=env)
+            self.assertEqual(status, 0)
+            self.assertEqual(cached, output)
+            self.assertNotEqual(os.listdir(cache), [])
+        finally:
+            shutil.rmtree(cache)
+
+    def test_no_server(self):
+        p = subprocess.Popen([sys.executable, CLIENT,
+                              '--socket', os.path.join(self.directory, 'none'),
+                              'php', '2', '2'],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, errors = p.communicate()
+        self.assertEqual(p.returncode, os.EX_UNAVAILABLE)
+        self.assertIn("Cannot connect", errors)
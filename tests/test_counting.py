@@ -0,0 +1,63 @@
+import sys
+
+from cnfformula import CNF
+from cnfformula import CountingPrinciple
+
+from . import TestCNFBase
+from .test_commandline_helper import TestCommandline
+
+from itertools import combinations, product
+
+
+def var_name(tpl):
+    return "Y_{{" + ",".join(str(v) for v in tpl) + "}}"
+
+
+class TestCountingPrinciple(TestCNFBase):
+    def test_clauses(self):
+        """Compare with the exactly one constraints on the incidence lists"""
+        for M, p in [(5, 2), (7, 3), (6, 4), (3, 3), (2, 3), (4, 1)]:
+            F = CountingPrinciple(M, p)
+            G = CNF()
+            for el in range(M):
+                edge_vars = [var_name(tpl) for tpl in combinations(range(M), p)
+                             if el in tpl]
+                for cls in CNF.equal_to_constraint(edge_vars, 1):
+                    G.add_clause(cls)
+            self.assertListEqual(list(F.variables()), list(G.variables()))
+            self.assertListEqual(list(F.clauses()), list(G.clauses()))
+
+    def test_auxiliary_encoding(self):
+        """Intended counter values extend exactly the models of the formula"""
+        for M, p in [(4, 2), (5, 3)]:
+            F = CountingPrinciple(M, p)
+            A = CountingPrinciple(M, p, encoding='auxiliary')
+            parts = list(F.variables())
+            auxiliary = list(A.variables())[len(parts):]
+            self.assertListEqual(list(A.variables())[:len(parts)], parts)
+            for bits in product([False, True], repeat=len(parts)):
+                assignment = dict(zip(parts, bits))
+                expected = all(any(assignment[v] == b for b, v in cls)
+                               for cls in F.clauses())
+                # set the counters to their intended values
+                for el in range(M):
+                    incident = [v for tpl, v in zip(combinations(range(M), p), parts)
+                                if el in tpl]
+                    for i in range(1, len(incident)):
+                        assignment["S_{{{0},{1}}}".format(el, i)] = \
+                            any(assignment[v] for v in incident[:i])
+                self.assertEqual(len(assignment), len(parts) + len(auxiliary))
+                satisfied = all(any(assignment[v] == b for b, v in cls)
+                                for cls in A.clauses())
+                self.assertEqual(satisfied, expected)
+
+
+class TestCountingCommandline(TestCommandline):
+    def test_parameters(self):
+        for M, p in [(5, 2), (6, 3)]:
+            for encoding in ['pairwise', 'auxiliary']:
+                F = CountingPrinciple(M, p, encoding=encoding)
+                self.checkFormula(sys.stdin, F, ["cnfgen", "-q", "count", M, p,
+                                                 "--encoding", encoding])
+        F = CountingPrinciple(6, 2)
+        self.checkFormula(sys.stdin, F, ["cnfgen", "-q", "parity", 6])
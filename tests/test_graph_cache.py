@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from cStringIO import StringIO
+
+import networkx as nx
+
+from cnfformula import cnfgen
+from cnfformula.graphs import GraphCache
+
+from .test_commandline_helper import stdout_redirector
+
+
+class TestGraphCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_cnfgen(self, args):
+        f = StringIO()
+        with stdout_redirector(f):
+            cnfgen(["cnfgen"] + [str(x) for x in args])
+        return f.getvalue()
+
+    def cache_entries(self):
+        return [x for x in os.listdir(self.directory) if x.endswith(GraphCache.suffix)]
+
+    def test_store_and_load(self):
+        cache = GraphCache(self.directory)
+        G = nx.bipartite.complete_bipartite_graph(3, 4)
+        G.name = "test graph"
+        key = cache.key('bcomplete', (3, 4))
+        cache.store(key, G)
+        H, state = cache.load(key)
+        self.assertIsNone(state)
+        self.assertEqual(H.name, G.name)
+        self.assertListEqual(sorted(H.nodes(data=True)), sorted(G.nodes(data=True)))
+        self.assertListEqual(sorted(H.edges()), sorted(G.edges()))
+
+    def test_keys_depend_on_parameters(self):
+        cache = GraphCache(self.directory)
+        self.assertNotEqual(cache.key('gnp', (10, 0.5), '1'),
+                            cache.key('gnp', (10, 0.5), '2'))
+        self.assertNotEqual(cache.key('gnp', (10, 0.5), '1'),
+                            cache.key('gnp', (10, 0.4), '1'))
+        self.assertNotEqual(cache.key('gnp', (10, 0.5), '1'),
+                            cache.key('gnm', (10, 0.5), '1'))
+
+    def test_corrupted_entry(self):
+        cache = GraphCache(self.directory)
+        key = cache.key('complete', (5,))
+        with open(os.path.join(self.directory, key + GraphCache.suffix), 'wb') as f:
+            f.write("garbage")
+        self.assertIsNone(cache.load(key))
+        self.assertListEqual(self.cache_entries(), [])
+
+    def test_eviction(self):
+        cache = GraphCache(self.directory, max_size=0)
+        cache.store(cache.key('complete', (5,)), nx.complete_graph(5))
+        self.assertListEqual(self.cache_entries(), [])
+
+    def test_random_graph_is_cached(self):
+        cmdline = ["-q", "-S", "42", "--graph-cache", self.directory,
+                   "kclique", "3", "--gnp", "15", "0.5", "--addedges", "3"]
+        reference = self.run_cnfgen(["-q", "-S", "42", "kclique", "3",
+                                     "--gnp", "15", "0.5", "--addedges", "3"])
+        first = self.run_cnfgen(cmdline)
+        self.assertEqual(len(self.cache_entries()), 1)
+        second = self.run_cnfgen(cmdline)
+        self.assertEqual(len(self.cache_entries()), 1)
+        self.assertEqual(first, reference)
+        self.assertEqual(second, reference)
+
+    def test_no_cache_without_seed(self):
+        self.run_cnfgen(["-q", "--graph-cache", self.directory,
+                         "kclique", "3", "--gnp", "15", "0.5"])
+        self.assertListEqual(self.cache_entries(), [])
+
+    def test_environment_variable(self):
+        cmdline = ["-q", "gphp", "--bshift", "5", "4", "1", "2"]
+        # the parsers are already built when the variable is set
+        reference = self.run_cnfgen(cmdline)
+        self.assertListEqual(self.cache_entries(), [])
+        os.environ['CNFGEN_GRAPH_CACHE'] = self.directory
+        try:
+            self.assertEqual(self.run_cnfgen(cmdline), reference)
+        finally:
+            del os.environ['CNFGEN_GRAPH_CACHE']
+        self.assertEqual(len(self.cache_entries()), 1)
+
+    def test_deterministic_graph_is_cached(self):
+        cmdline = ["-q", "--graph-cache", self.directory,
+                   "gphp", "--bshift", "5", "4", "1", "2"]
+        first = self.run_cnfgen(cmdline)
+        second = self.run_cnfgen(cmdline)
+        self.assertEqual(len(self.cache_entries()), 1)
+        self.assertEqual(first, second)
+
+    def test_order_is_preserved(self):
+        cache = GraphCache(self.directory)
+        key = cache.key('gnp', (30, 0.2), '3')
+        for G in [nx.grid_graph([7, 9], periodic=True),
+                  nx.gnp_random_graph(30, 0.2, seed=3, directed=True)]:
+            H, _ = cache.store_and_load(key, G)
+            self.assertListEqual(H.nodes(), G.nodes())
+            self.assertListEqual(H.edges(), G.edges())
+            H, _ = cache.load(key)
+            self.assertListEqual(H.nodes(), G.nodes())
+            self.assertListEqual(H.edges(), G.edges())
+            if G.is_directed():
+                self.assertListEqual(H.in_edges(), G.in_edges())
+
+    def test_grid_and_torus_output(self):
+        for graph in [["--torus", "7", "9"], ["--torus", "4", "4"], ["--grid", "9", "9"]]:
+            reference = self.run_cnfgen(["-q", "-S", "5", "kcolor", "3"] + graph)
+            cmdline = ["-q", "-S", "5", "--graph-cache", self.directory, "kcolor", "3"] + graph
+            first = self.run_cnfgen(cmdline)
+            second = self.run_cnfgen(cmdline)
+            self.assertEqual(first, reference)
+            self.assertEqual(second, reference)
+        self.assertEqual(len(self.cache_entries()), 3)
@@ -1,4 +1,5 @@
 import argparse
+import random
 
 import unittest
 
@@ -8,10 +9,21 @@ from cnfformula.graphs import bipartite_sets
 class TestArgparse(unittest.TestCase) :
     def parse(self, args):
         parser = argparse.ArgumentParser()
+        parser.add_argument('--seed')
         self.graph_helper.setup_command_line(parser)
         args = parser.parse_args(args)
         return self.graph_helper.obtain_graph(args)
 
+    def check_global_state(self, args):
+        """The graph depends on the seed, not on the global generator"""
+        random.seed(1)
+        G = self.parse(["--seed", "7"] + args)
+        random.seed(2)
+        H = self.parse(["--seed", "7"] + args)
+        self.assertListEqual(sorted(G.edges()), sorted(H.edges()))
+        self.assertNotEqual(sorted(G.edges()),
+                            sorted(self.parse(["--seed", "8"] + args).edges()))
+
 class TestBipartite(TestArgparse) :
     def setUp(self):
         self.graph_helper = cnfformula.cmdline.BipartiteGraphHelper()
@@ -23,6 +35,9 @@ class TestBipartite(TestArgparse) :
         self.assertEqual(len(left),10)
         self.assertEqual(len(right),9)
 
+    def test_bp_global_state(self):
+        self.check_global_state(["--bp", "10", "9", "0.5"])
+
     def test_bm(self):
         G = self.parse(["--bm", "10", "9", "15"])
         self.assertEqual(G.order(),19)
@@ -137,6 +152,9 @@ class TestSimple(TestArgparse) :
         G = self.parse(["--gnp", "10", "0.5"])
         self.assertEqual(G.order(),10)
 
+    def test_gnp_global_state(self):
+        self.check_global_state(["--gnp", "10", "0.5"])
+
     def test_gnm(self):
         G = self.parse(["--gnm", "10", "15"])
         self.assertEqual(G.order(),10)
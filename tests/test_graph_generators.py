@@ -0,0 +1,229 @@
+import random
+import unittest
+
+import networkx as nx
+
+from cnfformula.graphs import bipartite_sets
+from cnfformula.graphs import bipartite_random_left_regular
+from cnfformula.graphs import bipartite_random_regular
+from cnfformula.graphs import sample_missing_edges
+from cnfformula.graphs import gnp_random_graph
+from cnfformula.graphs import bipartite_random_graph
+from cnfformula.graphs import dag_pyramid
+from cnfformula.graphs import dag_complete_binary_tree
+from cnfformula.graphs import is_dag
+from cnfformula.graphs import enumerate_vertices
+from cnfformula.graphs import check_topological_order
+import cnfformula.graphs
+
+
+class TestBipartiteRandomRegular(unittest.TestCase):
+
+    def check_regular(self, G, l, r, d):
+        left, right = bipartite_sets(G)
+        self.assertEqual(len(left), l)
+        self.assertEqual(len(right), r)
+        self.assertEqual(G.size(), l*d)
+        for v in left:
+            self.assertEqual(G.degree(v), d)
+        for v in right:
+            self.assertEqual(G.degree(v), l*d // r)
+
+    def test_small(self):
+        for l, r, d in [(10, 8, 4), (6, 6, 1), (1, 3, 3), (12, 4, 2)]:
+            self.check_regular(bipartite_random_regular(l, r, d), l, r, d)
+
+    def test_dense(self):
+        for l, r, d in [(20, 20, 19), (30, 10, 9), (15, 15, 15)]:
+            self.check_regular(bipartite_random_regular(l, r, d), l, r, d)
+
+    def test_large(self):
+        self.check_regular(bipartite_random_regular(3000, 2000, 20), 3000, 2000, 20)
+
+    def test_seed(self):
+        G1 = bipartite_random_regular(50, 40, 8, seed=17)
+        G2 = bipartite_random_regular(50, 40, 8, seed=17)
+        self.assertListEqual(sorted(G1.edges()), sorted(G2.edges()))
+
+    def test_degree_too_large(self):
+        with self.assertRaises(ValueError):
+            bipartite_random_regular(4, 2, 3)
+
+
+class TestSampleMissingEdges(unittest.TestCase):
+
+    def check_sample(self, G, m):
+        edges = set(frozenset(e) for e in G.edges())
+        sample = sample_missing_edges(G, m)
+        self.assertEqual(len(sample), m)
+        sample = set(frozenset(e) for e in sample)
+        self.assertEqual(len(sample), m)
+        self.assertEqual(len(sample & edges), 0)
+        for e in sample:
+            self.assertEqual(len(e), 2)
+        return sample
+
+    def test_all_missing_edges(self):
+        G = nx.gnm_random_graph(12, 30)
+        sample = self.check_sample(G, 66 - 30)
+        self.assertEqual(len(sample), 36)
+
+    def test_sparse(self):
+        G = nx.cycle_graph(1000)
+        self.check_sample(G, 500)
+
+    def test_bipartite(self):
+        G = bipartite_random_regular(20, 10, 4)
+        sample = self.check_sample(G, 200 - 80)
+        for e in sample:
+            u, v = tuple(e)
+            self.assertNotEqual(G.node[u]['bipartite'], G.node[v]['bipartite'])
+
+    def test_too_many(self):
+        with self.assertRaises(ValueError):
+            sample_missing_edges(nx.complete_graph(5), 1)
+
+    def test_seed(self):
+        G = nx.cycle_graph(100)
+        self.assertListEqual(sample_missing_edges(G, 50, seed=3),
+                             sample_missing_edges(G, 50, seed=3))
+
+
+class TestRandomGraphs(unittest.TestCase):
+
+    def check_rng(self, generator, *args):
+        random.seed(1)
+        G = generator(*args, rng=random.Random(5))
+        random.seed(2)
+        H = generator(*args, rng=random.Random(5))
+        self.assertListEqual(sorted(G.edges()), sorted(H.edges()))
+
+    def test_gnp(self):
+        self.check_rng(gnp_random_graph, 20, 0.3)
+        random.seed(3)
+        G = nx.gnp_random_graph(20, 0.3)
+        random.seed(3)
+        self.assertListEqual(sorted(G.edges()), sorted(gnp_random_graph(20, 0.3).edges()))
+
+    def test_bipartite(self):
+        self.check_rng(bipartite_random_graph, 10, 15, 0.3)
+        G = bipartite_random_graph(10, 15, 0.3, rng=random.Random(5))
+        left, right = bipartite_sets(G)
+        self.assertListEqual(left, range(10))
+        self.assertListEqual(right, range(10, 25))
+        for u, v in G.edges():
+            self.assertNotEqual(G.node[u]['bipartite'], G.node[v]['bipartite'])
+        random.seed(3)
+        H = nx.bipartite.random_graph(10, 15, 0.3)
+        random.seed(3)
+        self.assertListEqual(sorted(H.edges()),
+                             sorted(bipartite_random_graph(10, 15, 0.3).edges()))
+
+
+class TestIntegerLabelledDAGs(unittest.TestCase):
+
+    def check_same_dag(self, G, H):
+        self.assertTrue(nx.is_isomorphic(G, H))
+        self.assertTrue(G.topologically_sorted)
+        self.assertListEqual(list(G.ordered_vertices), range(1, G.order() + 1))
+        for u, v in G.edges():
+            self.assertLess(u, v)
+        # integer labels are rendered as the names of the vertices
+        self.assertListEqual([str(v) for v in G.ordered_vertices], H.ordered_vertices)
+        self.assertSetEqual(set((str(u), str(v)) for u, v in G.edges()), set(H.edges()))
+
+    def test_no_attributes(self):
+        D = dag_pyramid(3, integer_labels=True)
+        u, v = D.edges()[0]
+        with self.assertRaises(TypeError):
+            D.node[u]['color'] = 1
+        with self.assertRaises(TypeError):
+            D[u][v]['weight'] = 1
+        D.add_edge(1, D.order(), weight=1)
+        self.assertEqual(D[1][D.order()], {'weight': 1})
+
+    def test_pyramid(self):
+        for h in range(5):
+            self.check_same_dag(dag_pyramid(h, integer_labels=True), dag_pyramid(h))
+
+    def test_complete_binary_tree(self):
+        for h in range(5):
+            self.check_same_dag(dag_complete_binary_tree(h, integer_labels=True),
+                                dag_complete_binary_tree(h))
+
+
+class TestDAGCertificate(unittest.TestCase):
+
+    def test_topological_order(self):
+        D = dag_pyramid(3)
+        self.assertTrue(check_topological_order(D, D.ordered_vertices))
+        self.assertFalse(check_topological_order(D, D.ordered_vertices[::-1]))
+        self.assertFalse(check_topological_order(D, D.ordered_vertices[1:]))
+        self.assertFalse(check_topological_order(D, D.ordered_vertices + D.ordered_vertices[:1]))
+
+    def test_graph_changes(self):
+        D = nx.DiGraph([(1, 2), (2, 3), (1, 3)])
+        self.assertTrue(is_dag(D))
+        D.remove_edge(1, 3)
+        D.add_edge(3, 1)
+        self.assertFalse(is_dag(D))
+
+    def test_sorted_graph_changes(self):
+        D = dag_pyramid(2)
+        self.assertTrue(is_dag(D))
+        u, v = D.edges()[0]
+        D.remove_edge(u, v)
+        D.add_edge(v, u)
+        with self.assertRaises(AssertionError):
+            is_dag(D)
+
+    def test_wrong_order_is_detected(self):
+        D = dag_complete_binary_tree(2, integer_labels=True)
+        self.assertTrue(is_dag(D))
+        D.ordered_vertices = list(reversed(D.ordered_vertices))
+        with self.assertRaises(AssertionError):
+            is_dag(D)
+
+    def test_certificate_is_reused(self):
+        calls = []
+        check = cnfformula.graphs.check_topological_order
+        def counting_check(digraph, order):
+            calls.append(order)
+            return check(digraph, order)
+        cnfformula.graphs.check_topological_order = counting_check
+        try:
+            D = dag_pyramid(3)
+            for _ in range(3):
+                self.assertTrue(is_dag(D))
+                enumerate_vertices(D)
+            self.assertEqual(len(calls), 1)
+            D.add_edge(D.ordered_vertices[0], D.ordered_vertices[-1])
+            self.assertTrue(is_dag(D))
+            self.assertEqual(len(calls), 2)
+        finally:
+            cnfformula.graphs.check_topological_order = check
+
+    def test_vertex_changes(self):
+        D = dag_pyramid(2)
+        enumerate_vertices(D)
+        D.add_node('extra')
+        with self.assertRaises(AssertionError):
+            enumerate_vertices(D)
+
+
+class TestExplicitGenerator(unittest.TestCase):
+
+    def test_bipartite_random_regular(self):
+        G1 = bipartite_random_regular(30, 20, 4, rng=random.Random(4))
+        G2 = bipartite_random_regular(30, 20, 4, rng=random.Random(4))
+        self.assertListEqual(sorted(G1.edges()), sorted(G2.edges()))
+
+    def test_bipartite_random_left_regular(self):
+        G1 = bipartite_random_left_regular(30, 20, 4, rng=random.Random(4))
+        G2 = bipartite_random_left_regular(30, 20, 4, rng=random.Random(4))
+        self.assertListEqual(sorted(G1.edges()), sorted(G2.edges()))
+
+    def test_sample_missing_edges(self):
+        G = nx.cycle_graph(100)
+        self.assertListEqual(sample_missing_edges(G, 50, rng=random.Random(4)),
+                             sample_missing_edges(G, 50, rng=random.Random(4)))
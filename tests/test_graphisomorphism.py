@@ -65,3 +65,36 @@ class TestGraphAutomorphism(TestCNFBase):
         G = nx.cycle_graph(10)
         F = GraphAutomorphism(G)
         self.assertSAT(F)
+
+
+class TestDegreePruning(TestCNFBase):
+
+    def check_pruned(self, G1, G2):
+        F = GraphIsomorphism(G1, G2)
+        P = GraphIsomorphism(G1, G2, degree_pruning=True)
+        pruned = set(F.variables()) - set(P.variables())
+        for v in P.variables():
+            self.assertIn(v, F.variables())
+        # the pruned formula is the full one with the pruned variables
+        # set to false
+        expected = [[lit for lit in cls if lit[1] not in pruned]
+                    for cls in F if not any(not p and v in pruned for p, v in cls)]
+        self.assertListEqual(sorted(sorted(cls) for cls in P),
+                             sorted(sorted(cls) for cls in expected))
+        return P
+
+    def test_isomorphism(self):
+        G1 = nx.path_graph(5)
+        G2 = nx.relabel_nodes(G1, {0: 2, 1: 0, 2: 4, 3: 1, 4: 3})
+        P = self.check_pruned(G1, G2)
+        self.assertEqual(len(list(P.variables())), 2*2 + 3*3)
+        self.assertSAT(P)
+
+    def test_different_degrees(self):
+        P = self.check_pruned(nx.star_graph(4), nx.cycle_graph(5))
+        self.assertUNSAT(P)
+
+    def test_automorphism(self):
+        self.assertSAT(GraphAutomorphism(nx.cycle_graph(6), degree_pruning=True))
+        G = nx.Graph([(1, 2), (1, 3), (2, 3), (2, 5), (3, 4), (4, 5), (4, 6)])
+        self.assertUNSAT(GraphAutomorphism(G, degree_pruning=True))
@@ -4,9 +4,14 @@ from cnfformula import OrderingPrinciple, GraphOrderingPrinciple
 from . import TestCNFBase
 from .test_commandline_helper import TestCommandline
 
+from cnfformula.families.ordering import GraphOrderingPrincipleDimacs
+from cnfformula.families.ordering import _ordering_clauses_count
+
 import unittest
 import networkx as nx
 import sys
+from cStringIO import StringIO
+from itertools import combinations, permutations
 
 class TestOrderingPrinciple(TestCNFBase):
     def test_empty(self):
@@ -44,6 +49,45 @@ class TestGraphOrderingPrinciple(TestCNFBase):
                             G = OrderingPrinciple(elements,total,smart,plant,knuth)
                             self.assertCnfEquivalentModuloVariables(F,G)
 
+    def test_clauses(self):
+        """Compare with a direct enumeration of the axioms"""
+        x = lambda u, v: 'x_{{{0},{1}}}'.format(u, v)
+        graph = nx.cycle_graph(5)
+        for knuth in (0, 2, 3):
+            F = GraphOrderingPrinciple(graph, knuth=knuth)
+            expected = []
+            for med in range(5):
+                expected.append([(True, x(w, med)) for w in sorted(graph.neighbors(med))])
+            for v1, v2, v3 in permutations(range(5), 3):
+                if knuth == 2 and (v2 < v1 or v2 < v3):
+                    continue
+                if knuth == 3 and (v3 < v1 or v3 < v2):
+                    continue
+                expected.append([(False, x(v1, v2)), (False, x(v2, v3)), (True, x(v1, v3))])
+            for v1, v2 in combinations(range(5), 2):
+                expected.append([(False, x(v1, v2)), (False, x(v2, v1))])
+            self.assertListEqual(list(F.clauses()), expected)
+
+    def test_vertex_order(self):
+        graph = nx.cycle_graph(6)
+        graph.ordered_vertices = [3, 1, 4, 0, 5, 2]
+        for knuth in (0, 2, 3):
+            F = GraphOrderingPrinciple(graph, knuth=knuth)
+            clauses = list(F.clauses())
+            self.assertEqual(len(clauses), len(set(frozenset(c) for c in clauses)))
+            self.assertEqual(len(F), _ordering_clauses_count(6, knuth=knuth))
+
+    def test_streaming(self):
+        graph = nx.gnp_random_graph(7, 0.5, seed=2)
+        for total, smart, knuth in [(False, False, 0), (True, False, 0), (False, True, 0),
+                                    (False, False, 2), (False, False, 3)]:
+            for plant in (True, False):
+                F = GraphOrderingPrinciple(graph, total, smart, plant, knuth)
+                output = StringIO()
+                GraphOrderingPrincipleDimacs(graph, output, total, smart, plant, knuth)
+                self.assertEqual(output.getvalue(), F.dimacs() + "\n")
+
+
 class TestOrderingPrincipleCommandline(TestCommandline):
     def test_parameters(self):
         for elements in range(2,5):
@@ -1,7 +1,12 @@
 from cnfformula import CNF,PebblingFormula
+from cnfformula import StoneFormula,SparseStoneFormula
+from cnfformula.graphs import dag_pyramid
 import sys
 from . import TestCNFBase
 from test_commandline_helper import TestCommandline
+from test_commandline_helper import stdout_redirector
+from cStringIO import StringIO
+from cnfformula import cnfgen
 
 import networkx as nx
 
@@ -66,3 +71,50 @@ class TestPebblingCommandline(TestCommandline):
         G.name = 'Pyramid of height 2'
         F = PebblingFormula(G)
         self.checkFormula(sys.stdin,F, ["cnfgen","-q","peb", "--pyramid", 2])
+
+    def test_latex_vertex_names(self):
+        for args, name in [(["peb", "--pyramid", "2"], "{x_{2,0}}"),
+                           (["stone", "--pyramid", "1", "2"], "{P_{x_{1,0},1}}"),
+                           (["peb", "--tree", "1"], "{v_3}")]:
+            f = StringIO()
+            with stdout_redirector(f):
+                cnfgen(["cnfgen", "-q", "-of", "latex"] + args)
+            self.assertIn(name, f.getvalue())
+
+
+class TestStone(TestCNFBase) :
+    def test_small(self) :
+        G=nx.DiGraph()
+        G.add_edges_from([(1,3),(2,3)])
+        F = StoneFormula(G,2)
+        P = lambda v,j: "P_{{{0},{1}}}".format(v,j)
+        R = lambda j: "R_{{{0}}}".format(j)
+        clauses = \
+            [[(True,P(v,1)),(True,P(v,2))] for v in (1,2,3)] + \
+            [[(False,P(v,j)),(True,R(j))] for v in (1,2) for j in (1,2)] + \
+            [[(False,P(1,1)),(False,P(2,1)),(False,P(3,2)),(False,R(1)),(True,R(2))],
+             [(False,P(1,2)),(False,P(2,2)),(False,P(3,1)),(False,R(2)),(True,R(1))],
+             [(False,P(3,1)),(False,R(1))],
+             [(False,P(3,2)),(False,R(2))]]
+        self.assertTrue(F._check_coherence())
+        self.assertSetSetEqual(list(F.clauses()),clauses)
+
+    def test_sparse_complete(self) :
+        D = dag_pyramid(3)
+        B = nx.complete_bipartite_graph(D.order(),3)
+        F = StoneFormula(D,3)
+        S = SparseStoneFormula(D,B)
+        body = lambda cnf: [l for l in cnf.dimacs().split("\n") if not l.startswith("c")]
+        self.assertListEqual(body(F),body(S))
+
+    def test_parallel(self) :
+        D = dag_pyramid(4)
+        self.assertListEqual(list(StoneFormula(D,4).clauses()),
+                             list(StoneFormula(D,4,jobs=2).clauses()))
+
+    def test_sparse_parallel(self) :
+        D = dag_pyramid(4)
+        B = nx.complete_bipartite_graph(D.order(),4)
+        B.remove_edges_from([(v,D.order()+(v % 4)) for v in range(D.order())])
+        self.assertListEqual(list(SparseStoneFormula(D,B).clauses()),
+                             list(SparseStoneFormula(D,B,jobs=2).clauses()))
@@ -38,3 +38,13 @@ class TestPlanted(TestCNFBase) :
         ]
         with self.assertRaises(ValueError):
             RandomKCNF(2,2,1,planted_assignments=ass)
+
+    def test_large(self):
+        ass = [{'x_{0}'.format(i): i % 3 == 0 for i in range(1, 201)},
+               {'x_{0}'.format(i): i % 2 == 0 for i in range(1, 101)}]
+        F = RandomKCNF(3, 200, 2000, seed=7, planted_assignments=ass)
+        self.assertEqual(len(F), 2000)
+        self.assertEqual(len(set(frozenset(c) for c in F.clauses())), 2000)
+        for cls in F.clauses():
+            for a in ass:
+                self.assertTrue(any(a.get(v) == p for p, v in cls))
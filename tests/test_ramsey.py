@@ -0,0 +1,62 @@
+import sys
+from cStringIO import StringIO
+
+from cnfformula.families.ramsey import RamseyLowerBoundFormula
+from cnfformula.families.ramsey import RamseyLowerBoundDimacs
+from cnfformula.families.ramsey import PythagoreanTriples
+
+from . import TestCNFBase
+from .test_commandline_helper import TestCommandline
+
+from itertools import combinations
+
+
+class TestRamseyLowerBound(TestCNFBase):
+
+    def test_clauses(self):
+        F = RamseyLowerBoundFormula(3, 4, 6)
+        edge = lambda e: 'e_{{{0},{1}}}'.format(*e)
+        expected = [[(True, edge(e)) for e in combinations(S, 2)]
+                    for S in combinations(range(1, 7), 3)]
+        expected += [[(False, edge(e)) for e in combinations(S, 2)]
+                     for S in combinations(range(1, 7), 4)]
+        self.assertListEqual(list(F.clauses()), expected)
+
+    def test_degenerate(self):
+        for s, k, N in [(0, 2, 3), (1, 1, 2), (2, 2, 1), (5, 5, 4)]:
+            F = RamseyLowerBoundFormula(s, k, N)
+            self.assertEqual(len(F), len(list(combinations(range(N), s))) +
+                                     len(list(combinations(range(N), k))))
+
+    def test_streaming(self):
+        for s, k, N in [(3, 3, 5), (1, 2, 3), (4, 3, 9), (2, 2, 1)]:
+            expected = RamseyLowerBoundFormula(s, k, N).dimacs() + "\n"
+            for jobs, shard_size in [(1, 100000), (1, 1), (2, 7)]:
+                output = StringIO()
+                RamseyLowerBoundDimacs(s, k, N, output,
+                                       jobs=jobs, shard_size=shard_size)
+                self.assertEqual(output.getvalue(), expected)
+
+
+class TestRamseyCommandline(TestCommandline):
+
+    def test_parameters(self):
+        for s, k, N in [(3, 3, 5), (2, 3, 4), (3, 4, 7)]:
+            F = RamseyLowerBoundFormula(s, k, N)
+            self.checkFormula(sys.stdin, F, ["cnfgen", "-q", "ram", s, k, N])
+            self.checkFormula(sys.stdin, F, ["cnfgen", "-q", "ram", "-j", 2, s, k, N])
+
+
+class TestPythagoreanTriples(TestCNFBase):
+
+    def test_clauses(self):
+        N = 300
+        F = PythagoreanTriples(N)
+        var = lambda i: 'x_{{{0}}}'.format(i)
+        expected = []
+        for x, y in combinations(range(1, N + 1), 2):
+            for z in range(y + 1, N + 1):
+                if x*x + y*y == z*z:
+                    expected.append([(True, var(x)), (True, var(y)), (True, var(z))])
+                    expected.append([(False, var(x)), (False, var(y)), (False, var(z))])
+        self.assertListEqual(list(F.clauses()), expected)
@@ -1,5 +1,15 @@
 from cnfformula import RandomKCNF
 from cnfformula.families.randomformulas import all_clauses
+from cnfformula.families.randomformulas import sample_clauses
+from cnfformula.families.randomformulas import _sample_compressed_clauses
+from cnfformula.families import _pool_imap
+from cnfformula.randomness import SeedStream
+from cnfformula import cnfgen
+
+import random
+from cStringIO import StringIO
+
+from .test_commandline_helper import stdout_redirector
 
 from . import TestCNFBase
 
@@ -42,3 +52,78 @@ class TestRandomCNF(TestCNFBase) :
     def test_negative_clauses(self):
         with self.assertRaises(ValueError):
             RandomKCNF(3,5,-1)
+
+    def test_wide_clauses(self):
+        self.check_random_cnf(20, 25, 100)
+        self.check_random_cnf(20, 500, 100)
+
+    def test_sample_clauses(self):
+        clauses = sample_clauses(2, range(1, 6), 8, [{'x_1': True}])
+        self.assertEqual(len(clauses), 8)
+        for cls in clauses:
+            self.assertEqual(len(set(v for _, v in cls)), 2)
+            self.assertIn((True, 'x_1'), cls)
+
+
+class TestRandomCNFStreams(TestCNFBase):
+
+    def test_independent_of_jobs(self):
+        formulas = [RandomKCNF(3, 50, 1000, rng=SeedStream(5), jobs=jobs)
+                    for jobs in [1, 2, 3]]
+        for F in formulas:
+            self.assertEqual(len(F), 1000)
+            self.assertListEqual(list(F.clauses()), list(formulas[0].clauses()))
+
+    def test_many_blocks(self):
+        samples = [_sample_compressed_clauses(3, 50, 500, None, SeedStream(5),
+                                              jobs=jobs, blocksize=64)
+                   for jobs in [1, 3]]
+        self.assertEqual(len(samples[0]), 500)
+        self.assertListEqual(samples[0], samples[1])
+
+    def test_bounded_window(self):
+        submitted = []
+
+        class Result(object):
+            def __init__(self, value):
+                self.value = value
+
+            def get(self):
+                return self.value
+
+        class Pool(object):
+            def apply_async(self, func, args):
+                submitted.append(args[0])
+                return Result(args[0])
+
+        blocks = _pool_imap(Pool(), None, range(100), 4)
+        self.assertListEqual([next(blocks) for _ in range(10)], list(range(10)))
+        self.assertEqual(len(submitted), 14)
+
+    def test_independent_of_global_generator(self):
+        random.seed(1)
+        F = RandomKCNF(4, 30, 100, rng=SeedStream(5))
+        random.seed(2)
+        G = RandomKCNF(4, 30, 100, rng=SeedStream(5))
+        self.assertListEqual(list(F.clauses()), list(G.clauses()))
+
+    def test_explicit_generator(self):
+        F = RandomKCNF(3, 20, 50, rng=random.Random(3))
+        G = RandomKCNF(3, 20, 50, rng=random.Random(3))
+        self.assertListEqual(list(F.clauses()), list(G.clauses()))
+
+    def test_dense(self):
+        F = RandomKCNF(3, 5, 80, rng=SeedStream(5), jobs=2)
+        self.check_distinct(F, 80)
+
+    def check_distinct(self, F, m):
+        self.assertEqual(len(set(frozenset(x) for x in F.clauses())), m)
+
+    def test_commandline(self):
+        outputs = []
+        for jobs in ["1", "2"]:
+            f = StringIO()
+            with stdout_redirector(f):
+                cnfgen(["cnfgen", "-q", "-S", "3", "randkcnf", "-j", jobs, "3", "40", "300"])
+            outputs.append(f.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
@@ -0,0 +1,511 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+from array import array
+
+from cnfformula import CNF
+from cnfformula.utils.solver import satsolver_registry, have_satsolver
+from cnfformula.utils.solver import is_satisfiable, supported_satsolvers
+from cnfformula.utils.solver import solve_many, ResultCache, Witness
+from cnfformula.utils.solver import SolverSession
+from cnfformula.utils.solver import _WitnessParser, _SolverProcesses
+from cnfformula import RandomKCNF, PigeonholePrinciple
+
+from .satisfiable import evaluate_cnf
+
+
+FAKE_SOLVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakesolver.py')
+
+
+class FakeSolverTestCase(unittest.TestCase):
+    """Tests run with a PATH that contains only the fake solvers."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.environ.get('PATH', '')
+        os.environ['PATH'] = self.directory
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.directory)
+        satsolver_registry(refresh=True)
+
+    def install(self, name):
+        """Install the fake solver under the name of a real one"""
+        filename = os.path.join(self.directory, name)
+        with open(FAKE_SOLVER) as source:
+            code = source.read().split("\n", 1)[1]
+        with open(filename, 'w') as f:
+            f.write("#!" + sys.executable + "\n" + code)
+        os.chmod(filename, stat.S_IRWXU)
+        return filename
+
+
+class TestSolverRegistry(FakeSolverTestCase):
+
+    def test_interfaces(self):
+        registry = satsolver_registry(refresh=True)
+        self.assertSetEqual(set(registry), set(supported_satsolvers()))
+        self.assertEqual(registry['minisat'].interface, 'filein/fileout')
+        self.assertEqual(registry['lingeling'].interface, 'stdin/stdout')
+        self.assertEqual(registry['sat4j'].interface, 'filein/stdout')
+        for info in registry.values():
+            self.assertIsNone(info.path)
+
+    def test_refresh(self):
+        self.assertFalse(have_satsolver('picosat', refresh=True))
+        filename = self.install('picosat')
+        self.assertFalse(have_satsolver('picosat'))
+        self.assertTrue(have_satsolver('picosat', refresh=True))
+        self.assertEqual(satsolver_registry()['picosat'].path, filename)
+        os.unlink(filename)
+        self.assertTrue(have_satsolver('picosat'))
+        self.assertIsNone(satsolver_registry(refresh=True)['picosat'].path)
+
+    def test_not_executable(self):
+        filename = self.install('lingeling')
+        os.chmod(filename, stat.S_IRUSR)
+        self.assertFalse(have_satsolver('lingeling', refresh=True))
+
+    def test_no_process_is_spawned(self):
+        self.install('picosat')
+        self.assertTrue(have_satsolver(refresh=True))
+        import subprocess
+        original = subprocess.Popen
+
+        def forbidden(*args, **kwargs):
+            raise AssertionError("a process has been spawned")
+        subprocess.Popen = forbidden
+        try:
+            for _ in range(10):
+                self.assertTrue(have_satsolver())
+                self.assertFalse(have_satsolver(['minisat', 'glucose']))
+        finally:
+            subprocess.Popen = original
+
+    def test_is_satisfiable(self):
+        self.install('picosat')
+        satsolver_registry(refresh=True)
+        F = CNF([[(True, 'x')], [(False, 'x')]])
+        self.assertEqual(is_satisfiable(F), (False, None))
+        with self.assertRaises(RuntimeError):
+            is_satisfiable(F, cmd='lingeling')
+
+
+class TestSolveMany(FakeSolverTestCase):
+
+    def setUp(self):
+        FakeSolverTestCase.setUp(self)
+        for name in ['picosat', 'minisat', 'sat4j']:
+            self.install(name)
+        satsolver_registry(refresh=True)
+        self.formulas = [RandomKCNF(3, 8, m, seed=m) for m in range(5, 60, 5)]
+        self.formulas += [PigeonholePrinciple(3, 2), CNF()]
+
+    def check_results(self, results):
+        self.assertListEqual(sorted(r.index for r in results),
+                             range(len(self.formulas)))
+        for r in results:
+            F = self.formulas[r.index]
+            self.assertEqual(r.status, 'ok')
+            self.assertEqual(r.result, is_satisfiable(F)[0])
+            if r.result:
+                _, falsified, undefined = evaluate_cnf(F, r.witness)
+                self.assertListEqual(falsified + undefined, [])
+            else:
+                self.assertIsNone(r.witness)
+            self.assertGreaterEqual(r.time, 0)
+
+    def test_interfaces(self):
+        for cmd in ['picosat', 'minisat', 'sat4j']:
+            self.check_results(list(solve_many(self.formulas, cmd=cmd, jobs=3)))
+
+    def test_lazy_input(self):
+        formulas = (F for F in self.formulas)
+        self.check_results(list(solve_many(formulas, cmd='picosat', jobs=2)))
+
+    def test_timeout(self):
+        results = list(solve_many(self.formulas[:3], cmd='picosat --sleep 30',
+                                  jobs=3, timeout=0.5))
+        self.assertEqual(len(results), 3)
+        for r in results:
+            self.assertEqual(r.status, 'timeout')
+            self.assertIsNone(r.result)
+            self.assertLess(r.time, 10)
+
+    def test_memory_limit(self):
+        results = list(solve_many(self.formulas[:2], cmd='sat4j --memory 400',
+                                  memory_limit=200))
+        self.assertListEqual([r.status for r in results], ['error', 'error'])
+        results = list(solve_many(self.formulas[:2], cmd='sat4j --memory 10',
+                                  memory_limit=2000))
+        self.assertListEqual([r.status for r in results], ['ok', 'ok'])
+
+    def test_no_start_after_kill(self):
+        processes = _SolverProcesses()
+        processes.kill_all()
+        self.assertIsNone(processes.start(0, [os.path.join(self.directory, 'picosat')]))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            list(solve_many(self.formulas, cmd='picosat', jobs=0))
+        with self.assertRaises(RuntimeError):
+            list(solve_many(self.formulas, cmd='lingeling'))
+
+
+class TestDimacsStreaming(FakeSolverTestCase):
+
+    def setUp(self):
+        FakeSolverTestCase.setUp(self)
+        for name in ['picosat', 'minisat', 'sat4j']:
+            self.install(name)
+        satsolver_registry(refresh=True)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        FakeSolverTestCase.tearDown(self)
+
+    def test_no_dimacs_text(self):
+        F = RandomKCNF(3, 8, 20, seed=5)
+
+        def forbidden(*args, **kwargs):
+            raise AssertionError("the dimacs text has been built")
+        F.dimacs = forbidden
+        for cmd in ['picosat', 'minisat', 'sat4j']:
+            result, witness = is_satisfiable(F, cmd=cmd, tmpdir=self.tmpdir)
+            self.assertTrue(result)
+            _, falsified, undefined = evaluate_cnf(F, witness)
+            self.assertListEqual(falsified + undefined, [])
+
+    def test_large_formula(self):
+        F = CNF()
+        for i in range(20000):
+            F.add_clause([(True, 'x{}'.format(i)), (False, 'y{}'.format(i))])
+        result, witness = is_satisfiable(F, cmd='picosat')
+        self.assertTrue(result)
+        self.assertEqual(len(witness), 40000)
+
+    def test_file_is_reused(self):
+        F = PigeonholePrinciple(3, 2)
+        self.assertFalse(is_satisfiable(F, cmd='sat4j', tmpdir=self.tmpdir)[0])
+        files = os.listdir(self.tmpdir)
+        self.assertEqual(len(files), 1)
+        stat1 = os.stat(os.path.join(self.tmpdir, files[0]))
+        self.assertFalse(is_satisfiable(F, cmd='minisat', tmpdir=self.tmpdir)[0])
+        self.assertListEqual(os.listdir(self.tmpdir), files)
+        stat2 = os.stat(os.path.join(self.tmpdir, files[0]))
+        self.assertEqual(stat1.st_mtime, stat2.st_mtime)
+
+    def test_file_is_updated(self):
+        F = CNF([[(True, 'x')]])
+        self.assertTrue(is_satisfiable(F, cmd='sat4j', tmpdir=self.tmpdir)[0])
+        files = os.listdir(self.tmpdir)
+        F.add_clause([(False, 'x')])
+        self.assertFalse(is_satisfiable(F, cmd='sat4j', tmpdir=self.tmpdir)[0])
+        self.assertEqual(len(os.listdir(self.tmpdir)), 1)
+        self.assertNotEqual(os.listdir(self.tmpdir), files)
+
+    def test_file_is_removed(self):
+        F = PigeonholePrinciple(3, 2)
+        is_satisfiable(F, cmd='sat4j', tmpdir=self.tmpdir)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 1)
+        del F
+        self.assertListEqual(os.listdir(self.tmpdir), [])
+
+    def test_solve_many_tmpdir(self):
+        formulas = [RandomKCNF(3, 8, m, seed=m) for m in range(10, 40, 10)]
+        results = list(solve_many(formulas, cmd='minisat', tmpdir=self.tmpdir))
+        self.assertListEqual([r.status for r in results], ['ok'] * 3)
+        self.assertListEqual(os.listdir(self.tmpdir), [])
+
+    def test_broken_formula(self):
+        F = CNF()
+        F._add_compressed_clauses([(1, 2)])
+        with self.assertRaises(AssertionError):
+            is_satisfiable(F, cmd='picosat')
+
+
+class TestResultCache(FakeSolverTestCase):
+
+    def setUp(self):
+        FakeSolverTestCase.setUp(self)
+        self.solver = self.install('picosat')
+        self.install('minisat')
+        satsolver_registry(refresh=True)
+        self.cache = ResultCache(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.cache.directory)
+        FakeSolverTestCase.tearDown(self)
+
+    def entries(self):
+        return [x for x in os.listdir(self.cache.directory)
+                if x.endswith(ResultCache.suffix)]
+
+    def no_process(self):
+        import subprocess
+        original = subprocess.Popen
+
+        def forbidden(*args, **kwargs):
+            raise AssertionError("a process has been spawned")
+        subprocess.Popen = forbidden
+        self.addCleanup(setattr, subprocess, 'Popen', original)
+
+    def test_cached_results(self):
+        formulas = [RandomKCNF(3, 8, m, seed=m) for m in range(10, 60, 10)]
+        formulas += [PigeonholePrinciple(3, 2)]
+        expected = [is_satisfiable(F, cmd='picosat', cache=self.cache)
+                    for F in formulas]
+        self.assertEqual(len(self.entries()), len(formulas))
+        self.no_process()
+        for F, (result, witness) in zip(formulas, expected):
+            self.assertEqual(F.is_satisfiable(cmd='picosat', cache=self.cache),
+                             (result, witness))
+
+    def test_variable_names(self):
+        F = CNF([[(True, 'x'), (True, 'y')], [(False, 'x')]])
+        G = CNF([[(True, 'a'), (True, 'b')], [(False, 'a')]])
+        self.assertEqual(is_satisfiable(F, cmd='picosat', cache=self.cache),
+                         (True, {'x': False, 'y': True}))
+        self.no_process()
+        self.assertEqual(is_satisfiable(G, cmd='picosat', cache=self.cache),
+                         (True, {'a': False, 'b': True}))
+
+    def test_keys(self):
+        F = PigeonholePrinciple(3, 2)
+        G = PigeonholePrinciple(3, 3)
+        key = self.cache.key(F, 'picosat')
+        self.assertEqual(key, self.cache.key(PigeonholePrinciple(3, 2), 'picosat'))
+        self.assertNotEqual(key, self.cache.key(G, 'picosat'))
+        self.assertNotEqual(key, self.cache.key(F, 'minisat'))
+        self.assertNotEqual(key, self.cache.key(F, 'picosat --plain'))
+        self.assertNotEqual(key, self.cache.key(F, 'picosat', sameas='lingeling'))
+        F.add_clause([(True, 'p_{0}_{0}')])
+        self.assertNotEqual(key, self.cache.key(F, 'picosat'))
+
+    def test_solver_upgrade(self):
+        F = PigeonholePrinciple(3, 2)
+        key = self.cache.key(F, 'picosat')
+        info = os.stat(self.solver)
+        os.utime(self.solver, (info.st_atime, info.st_mtime + 100))
+        self.assertNotEqual(key, self.cache.key(F, 'picosat'))
+
+    def test_corrupted_entry(self):
+        F = PigeonholePrinciple(3, 2)
+        key = self.cache.key(F, 'picosat')
+        with open(os.path.join(self.cache.directory, key + ResultCache.suffix), 'w') as f:
+            f.write("garbage")
+        self.assertIsNone(self.cache.load(key))
+        self.assertListEqual(self.entries(), [])
+        self.assertEqual(is_satisfiable(F, cmd='picosat', cache=self.cache),
+                         (False, None))
+        self.assertEqual(self.cache.load(key), (False, []))
+
+    def test_eviction(self):
+        cache = ResultCache(self.cache.directory, max_size=0)
+        is_satisfiable(PigeonholePrinciple(3, 2), cmd='picosat', cache=cache)
+        self.assertListEqual(self.entries(), [])
+
+    def test_clear(self):
+        for n in range(2, 5):
+            is_satisfiable(PigeonholePrinciple(n, n), cmd='picosat', cache=self.cache)
+        self.assertEqual(len(self.entries()), 3)
+        self.cache.clear()
+        self.assertListEqual(self.entries(), [])
+
+
+class TestBuiltinSolver(FakeSolverTestCase):
+
+    def test_no_external_solver(self):
+        self.assertTrue(have_satsolver('builtin'))
+        self.assertTrue(have_satsolver())
+        self.assertEqual(satsolver_registry()['builtin'].interface, 'builtin')
+        F = RandomKCNF(3, 10, 30, seed=3)
+        result, witness = is_satisfiable(F)
+        self.assertTrue(result)
+        _, falsified, undefined = evaluate_cnf(F, witness)
+        self.assertListEqual(falsified + undefined, [])
+        self.assertEqual(is_satisfiable(PigeonholePrinciple(4, 3)), (False, None))
+
+    def test_threshold(self):
+        F = PigeonholePrinciple(3, 2)
+        self.install('picosat')
+        satsolver_registry(refresh=True)
+        import cnfformula.utils.solver as solver
+        threshold = solver.BUILTIN_SOLVER_THRESHOLD
+        solver.BUILTIN_SOLVER_THRESHOLD = 0
+        self.addCleanup(setattr, solver, 'BUILTIN_SOLVER_THRESHOLD', threshold)
+        os.unlink(os.path.join(self.directory, 'picosat'))
+        # picosat is still in the registry, but it is gone
+        with self.assertRaises(RuntimeError):
+            is_satisfiable(F)
+        self.assertEqual(is_satisfiable(F, cmd='builtin'), (False, None))
+
+    def test_conflict_budget(self):
+        F = PigeonholePrinciple(3, 2)
+        self.install('picosat')
+        satsolver_registry(refresh=True)
+        os.unlink(os.path.join(self.directory, 'picosat'))
+        # within the budget picosat is not used
+        self.assertEqual(is_satisfiable(F), (False, None))
+        import cnfformula.utils.solver as solver
+        budget = solver.BUILTIN_SOLVER_CONFLICTS
+        solver.BUILTIN_SOLVER_CONFLICTS = 1
+        self.addCleanup(setattr, solver, 'BUILTIN_SOLVER_CONFLICTS', budget)
+        # out of budget the formula goes to picosat, which is gone
+        with self.assertRaises(RuntimeError):
+            is_satisfiable(F)
+        # without external solvers there is no budget
+        satsolver_registry(refresh=True)
+        self.assertEqual(is_satisfiable(F), (False, None))
+
+    def test_solve_many(self):
+        formulas = [RandomKCNF(3, 8, m, seed=m) for m in range(5, 60, 5)]
+        results = sorted(solve_many(formulas, cmd='builtin', jobs=2))
+        self.assertListEqual([r.status for r in results], ['ok'] * len(formulas))
+        self.install('picosat')
+        satsolver_registry(refresh=True)
+        for r in results:
+            self.assertEqual(r.result, is_satisfiable(formulas[r.index],
+                                                      cmd='picosat')[0])
+
+
+class TestVerifyWitness(FakeSolverTestCase):
+
+    def test_verify(self):
+        F = RandomKCNF(3, 8, 10, seed=1)
+        self.install('picosat')
+        self.install('minisat')
+        satsolver_registry(refresh=True)
+        for cmd in ['picosat', 'minisat', 'builtin']:
+            result, witness = is_satisfiable(F, cmd=cmd, verify=True)
+            self.assertTrue(result)
+            self.assertTrue(F.evaluate(witness))
+
+    def test_wrong_witness(self):
+        F = CNF([[(True, 'x'), (True, 'y')], [(False, 'x')]])
+        self.install('picosat')
+        satsolver_registry(refresh=True)
+        result, witness = is_satisfiable(F, cmd='picosat --flip 2')
+        self.assertFalse(F.evaluate(witness))
+        with self.assertRaises(RuntimeError):
+            is_satisfiable(F, cmd='picosat --flip 2', verify=True)
+        cache = ResultCache(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, cache.directory)
+        with self.assertRaises(RuntimeError):
+            is_satisfiable(F, cmd='picosat --flip 2', verify=True, cache=cache)
+        self.assertListEqual(os.listdir(cache.directory), [])
+
+
+class TestStreamingWitness(FakeSolverTestCase):
+
+    def test_parser(self):
+        output = b"c comment\ns SATISFIABLE\nv -1 2 -3\nv 4 0\nc end"
+        whole = _WitnessParser(5)
+        whole.feed(output)
+        whole.close()
+        pieces = _WitnessParser(5)
+        for i in range(len(output)):
+            pieces.feed(output[i:i+1])
+        pieces.close()
+        for parser in [whole, pieces]:
+            self.assertTrue(parser.result)
+            self.assertListEqual(list(parser.values), [0, -1, 1, -1, 1, 0])
+
+    def test_minisat_parser(self):
+        for output, result, values in [(b"SAT\n-1 2 0\n", True, [0, -1, 1]),
+                                       (b"UNSAT\n", False, [0, 0, 0]),
+                                       (b"INDET\n", None, [0, 0, 0]),
+                                       (b"", None, [0, 0, 0])]:
+            parser = _WitnessParser(2, minisat=True)
+            parser.feed(output)
+            parser.close()
+            self.assertEqual(parser.result, result)
+            self.assertListEqual(list(parser.values), values)
+
+    def test_witness(self):
+        F = CNF([[(True, 'x'), (True, 'y')], [(False, 'x')]])
+        F.add_variable('z')
+        self.install('picosat')
+        self.install('minisat')
+        satsolver_registry(refresh=True)
+        for cmd in ['picosat', 'minisat', 'builtin']:
+            result, witness = is_satisfiable(F, cmd=cmd)
+            self.assertIsInstance(witness, Witness)
+            self.assertFalse(witness['x'])
+            self.assertTrue(witness['y'])
+            self.assertEqual(witness, {'x': False, 'y': True, 'z': witness['z']})
+            self.assertEqual(F.evaluate(witness), True)
+            with self.assertRaises(KeyError):
+                witness['w']
+
+    def test_raw(self):
+        F = CNF([[(True, 'x'), (True, 'y')], [(False, 'x')]])
+        self.install('picosat')
+        satsolver_registry(refresh=True)
+        cache = ResultCache(self.directory)
+        for _ in range(2):
+            result, literals = is_satisfiable(F, cmd='picosat', raw=True,
+                                              cache=cache)
+            self.assertListEqual(list(literals), [-1, 2])
+        self.assertEqual(F.is_satisfiable(cmd='builtin', raw=True),
+                         (True, array('i', [-1, 2])))
+        F.add_clause([(False, 'y')])
+        self.assertEqual(is_satisfiable(F, cmd='picosat', raw=True),
+                         (False, None))
+
+
+class TestSolverSession(unittest.TestCase):
+
+    def test_assumptions(self):
+        F = RandomKCNF(3, 20, 80, seed=3)
+        variables = list(F.variables())
+        with SolverSession(F) as session:
+            for i in range(10):
+                assumptions = [(j % 2 == 0, variables[(i + 7*j) % 20])
+                               for j in range(4)]
+                G = CNF()
+                for clause in F:
+                    G.add_clause(clause)
+                for literal in assumptions:
+                    G.add_clause([literal])
+                result, witness = session.solve(assumptions)
+                self.assertEqual(result, is_satisfiable(G, cmd='builtin')[0])
+                if result:
+                    self.assertTrue(G.evaluate(witness))
+
+    def test_add_clause(self):
+        F = CNF([[(True, 'x'), (True, 'y')]])
+        with SolverSession(F) as session:
+            self.assertTrue(session.solve()[0])
+            session.add_clause([(False, 'x')])
+            self.assertEqual(session.solve(), (True, {'x': False, 'y': True}))
+            self.assertFalse(session.solve([(False, 'y')])[0])
+            session.add_clause([(False, 'y')])
+            self.assertEqual(session.solve(), (False, None))
+
+    def test_unknown_variable(self):
+        F = CNF([[(True, 'x')]])
+        with SolverSession(F) as session:
+            F.add_variable('y')
+            with self.assertRaises(ValueError):
+                session.add_clause([(True, 'y')])
+            with self.assertRaises(ValueError):
+                session.solve([(True, 'z')])
+            self.assertEqual(session.solve(), (True, {'x': True}))
+
+    def test_solver_failure(self):
+        F = CNF([[(True, 'x')]])
+        with self.assertRaises(RuntimeError):
+            SolverSession(F, cmd='/nonexistent/solver')
+        # a solver that exits without answering
+        session = SolverSession(F, cmd='true')
+        with self.assertRaises(RuntimeError):
+            session.solve()
+        with self.assertRaises(RuntimeError):
+            session.solve()
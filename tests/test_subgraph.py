@@ -13,7 +13,7 @@ from StringIO import StringIO as sio
 from . import TestCNFBase
 from .test_commandline_helper import TestCommandline
 
-from itertools import combinations
+from itertools import combinations, permutations, product
 
 example1="""
 3
@@ -98,6 +98,23 @@ class TestSubgraphFormulas(TestCNFBase):
         F = SubgraphFormula(G,[T])
         self.assertUNSAT(F)
         
+    def test_structure_clauses(self):
+        """Compare the edge constraints with a direct enumeration"""
+        G = nx.gnp_random_graph(7, 0.5, seed=11)
+        G.add_edge(0, 0)
+        for T, symmetric in [(nx.path_graph(4), False),
+                             (nx.complete_graph(3), True)]:
+            F = SubgraphFormula(G, [T], symmetric=symmetric)
+            pairs = combinations if symmetric else permutations
+            expected = [[(False, "S_{{{0},{1}}}".format(i1, j1)),
+                         (False, "S_{{{0},{1}}}".format(i2, j2))]
+                        for (i1, i2), (j1, j2) in product(combinations(range(T.order()), 2),
+                                                          pairs(range(7), 2))
+                        if T.has_edge(i1, i2) != G.has_edge(j1, j2)]
+            clauses = list(F.clauses())
+            self.assertListEqual(clauses[len(clauses) - len(expected):], expected)
+
+
 class TestSubgraphCommandline(TestCommandline):
     def test_parameters(self):
         for base in range(2,5):
@@ -118,6 +135,13 @@ class TestSubgraphCommandline(TestCommandline):
                 F = SubgraphFormula(G,[T])
                 self.checkFormula(sys.stdin,F, parameters)
 
+    def test_auxiliary_encoding(self):
+        G = nx.complete_graph(5)
+        F = CliqueFormula(G,3,encoding='auxiliary')
+        self.checkFormula(sys.stdin,F, ["cnfgen","-q","kclique",3,
+                                        "--complete",5,
+                                        "--encoding","auxiliary"])
+
 # class TestBinaryPigeonholePrincipleCommandline(TestCommandline):
 #     def test_parameters(self):
 #         for pigeons in range(2,5):
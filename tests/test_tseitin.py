@@ -1,11 +1,16 @@
 from cnfformula import TseitinFormula
+from cnfformula import cnfgen
+from cnfformula.families.tseitin import random_charges
 
 from . import TestCNFBase
 from test_commandline_helper import TestCommandline
+from test_commandline_helper import stdout_redirector
 
+import random
 import sys
 import unittest
 import networkx as nx
+from cStringIO import StringIO
 
 class TestTseitin(TestCNFBase):
     def test_null(self):
@@ -88,3 +93,37 @@ class TestTseitinCommandline(TestCommandline):
             graph=nx.complete_graph(sz)
             F = TseitinFormula(graph)
             self.checkFormula(sys.stdin,F, parameters)
+
+
+class TestRandomCharges(unittest.TestCase):
+    def test_parity(self):
+        for parity in (0, 1):
+            for seed in range(10):
+                charges = random_charges(7, parity, rng=random.Random(seed))
+                self.assertEqual(len(charges), 7)
+                self.assertEqual(sum(charges) % 2, parity)
+
+    def test_global_state(self):
+        random.seed(1)
+        charges = random_charges(20, rng=random.Random(5))
+        random.seed(2)
+        self.assertListEqual(charges, random_charges(20, rng=random.Random(5)))
+
+    def test_command_line_global_state(self):
+        """The output depends on the seed, not on the global generator"""
+        args = ["cnfgen", "-q", "-S", "7", "tseitin", "--charge", "randomodd",
+                "--gnp", "12", "0.4"]
+        outputs = []
+        seed = random.seed
+        try:
+            # cnfgen cannot reset the global generator
+            random.seed = lambda *args: None
+            for state in (1, 2):
+                random.setstate(random.Random(state).getstate())
+                f = StringIO()
+                with stdout_redirector(f):
+                    cnfgen(args)
+                outputs.append(f.getvalue())
+        finally:
+            random.seed = seed
+        self.assertEqual(outputs[0], outputs[1])